@@ -2,7 +2,6 @@ import abc
 import math as pymath
 import threading, time
 
-import matplotlib.pyplot as plt
 import numpy as np
 
 from demo import *
@@ -116,12 +115,15 @@ class AngleCanvas:
     """
     Represents the canvas for the angle model
     """
-    def __init__(self, angle: Angle, plot: Plot, width=600, height=200, L=2):
+    def __init__(self, angle: Angle, plot: Plot, width=600, height=200, L=2, blit=True):
         super().__init__()
         self.angle = angle
         self.plot = plot
         self.plot.grid()
         self.line = self.plot.add_line(0, color='red')
+        if blit:
+            # only the curve, the time line and the x-axis move while oscillating
+            self.plot.use_blit(scroll=True)
         self.canvas = Canvas(width=width, height=height)
         self.ctrl_btn = SwitchClickButton(
             descriptions=["Schwingung starten", "Schwingung stoppen"],
@@ -168,7 +170,6 @@ class AngleCanvas:
         max_t = self.angle.duration().real()
         self.oscilating = True
         vals = np.linspace(0, max_t * 15, 500)
-        plt.ioff()
         i = 0
         t = vals[i]
         while not (not self.oscilating and -0.01 < t % max_t < 0.01):
@@ -188,7 +189,6 @@ class AngleCanvas:
         self.plot.set_xlim([-max_t, max_t])
         self.plot.update_line(self.line, [0])
         self.plot.flush()
-        plt.ion()
 
     def pl_thr(self):
         """
@@ -1,9 +1,11 @@
+import threading
 import time
 from abc import ABC
 import abc
 import math as pymath
 
 import ipycanvas
+from ipycanvas import hold_canvas
 
 from demo import *
 
@@ -11,6 +13,12 @@ ROW_START = "<div class='row'>"
 COLUMN_START = "<div class='column'>"
 DIV_END = "</div>"
 G_CONSTANT = 9.81
+WATER_VISCOSITY = 1.0e-6
+LAMINAR_LIMIT = 2300
+TURBULENT_LIMIT = 4000
+REGIMES = ("laminar", "transitional", "turbulent")
+REGIME_COLORS = ((194, 229, 242), (242, 196, 128), (7, 120, 217))
+PIPE_LOD_LEVELS = ((64, 24), (32, 12), (16, 6), (8, 2))
 
 class IntersectionForm(ABC):
     """
@@ -172,6 +180,728 @@ class Rect(IntersectionForm):
         canvas.dash_style = "solid"
 
 
+SHAPES = ("Circle", "Rectangle")
+CIRCLE = 0
+RECTANGLE = 1
+
+
+class SectionArray:
+    """
+    Compact, array-backed collection of pipe cross-sections. Instead of one IntersectionForm object per section, the
+    type code, diameter, width, height and elevation of all sections are stored in contiguous numpy arrays, so a whole
+    pipeline can be evaluated without per-object overhead. Unused entries (e.g. w and h of circles) are NaN
+    """
+
+    def __init__(self, kind, d=np.nan, w=np.nan, h=np.nan, z=0.):
+        """
+        Initializes the collection, all params are broadcast to the same length
+
+        :param kind: type codes of the sections (CIRCLE or RECTANGLE) or shape names ("Circle", "Rectangle")
+        :param d: diameters of the circular sections [m]
+        :param w: widths of the rectangular sections [m]
+        :param h: heights of the rectangular sections [m]
+        :param z: elevations of the sections [m, Default: 0]
+        """
+        kind = np.atleast_1d(kind)
+        if kind.dtype.kind in 'US':
+            kind = (kind == SHAPES[RECTANGLE]).astype(np.uint8)
+        kind, d, w, h, z = np.broadcast_arrays(kind.astype(np.uint8), np.asarray(d, dtype=float),
+                                               np.asarray(w, dtype=float), np.asarray(h, dtype=float),
+                                               np.asarray(z, dtype=float))
+        self.kind = np.ascontiguousarray(kind)
+        self.d = np.array(d)
+        self.w = np.array(w)
+        self.h = np.array(h)
+        self.z = np.array(z)
+
+    @classmethod
+    def from_forms(cls, forms, z=0.):
+        """
+        Creates the collection from a list of IntersectionForm objects. IntersectionForm.y is a drawing coordinate,
+        so the elevations have to be given explicitly
+
+        :param forms: list of Circle and Rect objects
+        :param z: the elevations of the sections, scalar or one per form [m, Default: 0]
+        :return: SectionArray object
+        """
+        return cls([CIRCLE if f.type == SHAPES[CIRCLE] else RECTANGLE for f in forms],
+                   [getattr(f, 'd', np.nan) for f in forms],
+                   [getattr(f, 'w', np.nan) for f in forms],
+                   [getattr(f, 'h', np.nan) for f in forms],
+                   z)
+
+    def to_forms(self, y=0):
+        """
+        Converts the collection back to IntersectionForm objects. The elevations are not part of the forms, see
+        from_forms()
+
+        :param y: the drawing coordinate of the forms [Default: 0]
+        :return: list of Circle and Rect objects
+        """
+        return [Circle(float(d), y) if k == CIRCLE else Rect(float(w), float(h), y)
+                for k, d, w, h in zip(self.kind, self.d, self.w, self.h)]
+
+    def __len__(self):
+        return len(self.kind)
+
+    def __getitem__(self, index):
+        """
+        Returns a sub-collection, index can be anything numpy arrays can be indexed with
+
+        :param index: int, slice, mask or index array
+        :return: SectionArray object
+        """
+        index = np.atleast_1d(np.arange(len(self))[index])
+        return SectionArray(self.kind[index], self.d[index], self.w[index], self.h[index], self.z[index])
+
+    def circles(self):
+        """
+        Returns a mask of the circular sections
+
+        :return: boolean numpy array
+        """
+        return self.kind == CIRCLE
+
+    def shapes(self):
+        """
+        Returns the shape names of the sections, e.g. for evaluate_pipe()
+
+        :return: numpy array of "Circle" and "Rectangle"
+        """
+        return np.array(SHAPES)[self.kind]
+
+    def area(self):
+        """
+        Calculates the areas of all sections
+
+        :return: numpy array of areas [m^2]
+        """
+        return np.where(self.circles(), (np.pi * self.d ** 2) / 4, self.h * self.w)
+
+    def wetted_perimeter(self):
+        """
+        Calculates the wetted perimeters of all (completely filled) sections
+
+        :return: numpy array of perimeters [m]
+        """
+        return np.where(self.circles(), np.pi * self.d, 2 * (self.w + self.h))
+
+    def hydraulic_radius(self):
+        """
+        Calculates the hydraulic radii (area / wetted perimeter) of all sections
+
+        :return: numpy array of hydraulic radii [m]
+        """
+        return self.area() / self.wetted_perimeter()
+
+    def hydraulic_diameter(self):
+        """
+        Calculates the hydraulic diameters (4 * hydraulic radius) of all sections, equal to d for circles
+
+        :return: numpy array of hydraulic diameters [m]
+        """
+        return 4 * self.hydraulic_radius()
+
+
+def section_area(shape, d=1, w=1, h=1):
+    """
+    Vectorized version of IntersectionForm::area(). All params may be scalars or numpy arrays, which are broadcast
+
+    :param shape: "Circle" or "Rectangle", or an array of those
+    :param d: the diameter of circular sections [Default: 1]
+    :param w: the width of rectangular sections [Default: 1]
+    :param h: the height of rectangular sections [Default: 1]
+    :return: the areas of the sections
+    """
+    d = np.asarray(d, dtype=float)
+    w = np.asarray(w, dtype=float)
+    h = np.asarray(h, dtype=float)
+    return np.where(np.asarray(shape) == "Circle", (np.pi * d ** 2) / 4, h * w)
+
+
+def section_hydraulic_diameter(shape, d=1, w=1, h=1):
+    """
+    Vectorized hydraulic diameter D_h = 4 * A / P. Equals d for circles and 2 * w * h / (w + h) for rectangles
+
+    :param shape: "Circle" or "Rectangle", or an array of those
+    :param d: the diameter of circular sections [Default: 1]
+    :param w: the width of rectangular sections [Default: 1]
+    :param h: the height of rectangular sections [Default: 1]
+    :return: the hydraulic diameters of the sections
+    """
+    d = np.asarray(d, dtype=float)
+    w = np.asarray(w, dtype=float)
+    h = np.asarray(h, dtype=float)
+    return np.where(np.asarray(shape) == "Circle", d, 2 * w * h / (w + h))
+
+
+def section_outline_radius(shape, d=1, w=1, h=1, cos=None, sin=None):
+    """
+    Returns the distance from the centre to the outline of a section along the directions (cos, sin). Circles have a
+    constant radius d / 2, rectangles the distance to the nearest edge min(w / 2|cos|, h / 2|sin|). Sampling both ends
+    of a pipe at the same angles gives corresponding outline points, which can be blended linearly
+
+    :param shape: "Circle" or "Rectangle"
+    :param d: the diameter of a circular section [Default: 1]
+    :param w: the width of a rectangular section [Default: 1]
+    :param h: the height of a rectangular section [Default: 1]
+    :param cos: the cosines of the sample angles
+    :param sin: the sines of the sample angles
+    :return: numpy array of the radii
+    """
+    if shape == "Circle":
+        return np.full(np.shape(cos), d / 2)
+    with np.errstate(divide='ignore'):
+        return np.minimum(w / 2 / np.abs(cos), h / 2 / np.abs(sin))
+
+
+def reynolds_number(u, dh, viscosity=WATER_VISCOSITY):
+    """
+    Calculates the Reynolds number Re = |U| * D_h / nu
+
+    :param u: the mean velocity [m/s]
+    :param dh: the hydraulic diameter [m]
+    :param viscosity: the kinematic viscosity nu [m^2/s, Default: water at 20 degrees]
+    :return: the Reynolds number
+    """
+    return np.abs(u) * dh / viscosity
+
+
+def colebrook(re, relative_roughness=0., iterations=3):
+    """
+    Solves the implicit Colebrook equation 1 / sqrt(f) = -2 log10(k / (3.7 D_h) + 2.51 / (Re sqrt(f))) for arrays of
+    turbulent Reynolds numbers, with a fixed number of Newton iterations on x = 1 / sqrt(f). The iteration starts from
+    the explicit Swamee-Jain approximation, which is already within a few percent, so three iterations reach machine
+    precision
+
+    :param re: the Reynolds number
+    :param relative_roughness: the relative roughness k / D_h [Default: 0, hydraulically smooth]
+    :param iterations: the number of Newton iterations [Default: 3]
+    :return: the friction factor f
+    """
+    re = np.asarray(re, dtype=float)
+    roughness = np.asarray(relative_roughness, dtype=float) / 3.7
+    x = -2 * np.log10(roughness + 5.74 / re ** 0.9)
+    for _ in range(iterations):
+        inner = roughness + 2.51 * x / re
+        residual = x + 2 * np.log10(inner)
+        x = x - residual / (1 + 2 / np.log(10) * 2.51 / (re * inner))
+    return 1 / x ** 2
+
+
+def friction_factor(re, relative_roughness=0., iterations=3):
+    """
+    Calculates the Darcy friction factor for arrays of Reynolds numbers: f = 64 / Re for laminar flow (Re < 2300),
+    colebrook() for turbulent flow (Re > 4000) and a linear blend of both in the transitional range, so the friction
+    factor stays continuous (iterative network solvers would otherwise oscillate around the transition)
+
+    :param re: the Reynolds number
+    :param relative_roughness: the relative roughness k / D_h [Default: 0, hydraulically smooth]
+    :param iterations: the number of Newton iterations of the Colebrook solver [Default: 3]
+    :return: the friction factor f
+    """
+    re = np.maximum(np.asarray(re, dtype=float), 1e-12)
+    turbulent = colebrook(np.maximum(re, TURBULENT_LIMIT), relative_roughness, iterations)
+    weight = np.clip((re - LAMINAR_LIMIT) / (TURBULENT_LIMIT - LAMINAR_LIMIT), 0, 1)
+    transitional = (1 - weight) * 64 / LAMINAR_LIMIT + weight * turbulent
+    return np.where(re < LAMINAR_LIMIT, 64 / re, np.where(re < TURBULENT_LIMIT, transitional, turbulent))
+
+
+def colebrook_gradient(re, relative_roughness=0., iterations=3):
+    """
+    Solves the Colebrook equation like colebrook() and differentiates the solution implicitly
+
+    :param re: the Reynolds number
+    :param relative_roughness: the relative roughness k / D_h [Default: 0]
+    :param iterations: the number of Newton iterations [Default: 3]
+    :return: tuple of the friction factor f and its derivatives df/dRe and df/d(k / D_h)
+    """
+    re = np.asarray(re, dtype=float)
+    f = colebrook(re, relative_roughness, iterations)
+    x = 1 / np.sqrt(f)
+    inner = np.asarray(relative_roughness, dtype=float) / 3.7 + 2.51 * x / re
+    factor = 2 / np.log(10) / inner
+    dx = -1 / (1 + factor * 2.51 / re)
+    df_dx = -2 / x ** 3
+    return f, df_dx * dx * factor * -2.51 * x / re ** 2, df_dx * dx * factor / 3.7
+
+
+def friction_factor_gradient(re, relative_roughness=0., iterations=3):
+    """
+    Calculates the friction factor like friction_factor() together with its derivatives
+
+    :param re: the Reynolds number
+    :param relative_roughness: the relative roughness k / D_h [Default: 0]
+    :param iterations: the number of Newton iterations of the Colebrook solver [Default: 3]
+    :return: tuple of the friction factor f and its derivatives df/dRe and df/d(k / D_h)
+    """
+    re = np.maximum(np.asarray(re, dtype=float), 1e-12)
+    turbulent, turbulent_re, turbulent_rr = colebrook_gradient(np.maximum(re, TURBULENT_LIMIT), relative_roughness,
+                                                               iterations)
+    width = TURBULENT_LIMIT - LAMINAR_LIMIT
+    weight = np.clip((re - LAMINAR_LIMIT) / width, 0, 1)
+    laminar = re < LAMINAR_LIMIT
+    transitional = ~laminar & (re < TURBULENT_LIMIT)
+    f = np.where(laminar, 64 / re, np.where(transitional, (1 - weight) * 64 / LAMINAR_LIMIT + weight * turbulent,
+                                            turbulent))
+    df_dre = np.where(laminar, -64 / re ** 2,
+                      np.where(transitional, (turbulent - 64 / LAMINAR_LIMIT) / width, turbulent_re))
+    df_drr = np.where(laminar, 0., np.where(transitional, weight * turbulent_rr, turbulent_rr))
+    return f, df_dre, df_drr
+
+
+def flow_regime(re):
+    """
+    Classifies a Reynolds number
+
+    :param re: the Reynolds number
+    :return: "laminar", "transitional" or "turbulent"
+    """
+    return "laminar" if re < LAMINAR_LIMIT else "transitional" if re < TURBULENT_LIMIT else "turbulent"
+
+
+def regime_code(re):
+    """
+    Vectorized version of flow_regime()
+
+    :param re: the Reynolds numbers (scalar or array)
+    :return: integer array of indices into REGIMES
+    """
+    return np.searchsorted([LAMINAR_LIMIT, TURBULENT_LIMIT], re, side='right')
+
+
+def froude_number(u, dh):
+    """
+    Calculates the Froude number Fr = |U| / sqrt(g * D_h), the ratio of the flow velocity to the speed of a gravity wave
+    with the hydraulic diameter as length scale
+
+    :param u: the mean velocity [m/s]
+    :param dh: the hydraulic diameter [m]
+    :return: the Froude number
+    """
+    return np.abs(u) / np.sqrt(G_CONSTANT * np.asarray(dh, dtype=float))
+
+
+def darcy_weisbach(u, dh, length, roughness=0., viscosity=WATER_VISCOSITY):
+    """
+    Calculates the friction losses of a straight pipe with the Darcy-Weisbach equation h_f = f * L / D_h * U^2 / (2 g).
+    Rectangular sections are handled through their hydraulic diameter. All params may be numpy arrays
+
+    :param u: the mean velocity [m/s]
+    :param dh: the hydraulic diameter [m]
+    :param length: the length of the pipe [m]
+    :param roughness: the absolute roughness k of the wall [m, Default: 0]
+    :param viscosity: the kinematic viscosity nu [m^2/s, Default: water at 20 degrees]
+    :return: dict of numpy arrays with the Reynolds number 're', the friction factor 'f' and the head loss 'hf'
+    """
+    re = reynolds_number(u, dh, viscosity)
+    f = friction_factor(re, np.asarray(roughness, dtype=float) / dh)
+    return {'re': re, 'f': f, 'hf': f * np.asarray(length, dtype=float) / dh * np.asarray(u) ** 2 / (2 * G_CONSTANT)}
+
+
+def evaluate_pipe(q, d1=1, d2=1, w1=1, h1=1, w2=1, h2=1, z1=0, z2=0, shape1="Circle", shape2="Circle",
+                  length=None, roughness=0., viscosity=WATER_VISCOSITY):
+    """
+    Evaluates the AdvancedPipe equations for whole arrays of operating points at once, independent of any widget.
+    All params may be scalars or numpy arrays, which are broadcast against each other. The results are identical to
+    AdvancedPipe::u1(), u2(), q1(), q2() and dp() for the same state.
+    If a length is given, friction is included: the head loss is the mean of the Darcy-Weisbach losses evaluated with
+    the velocity and hydraulic diameter of either end
+
+    :param q: the discharge Q [m^3/s]
+    :param d1: the diameter of side 1, if it is circular [m]
+    :param d2: the diameter of side 2, if it is circular [m]
+    :param w1: the width of side 1, if it is rectangular [m]
+    :param h1: the height of side 1, if it is rectangular [m]
+    :param w2: the width of side 2, if it is rectangular [m]
+    :param h2: the height of side 2, if it is rectangular [m]
+    :param z1: the elevation of side 1 [m]
+    :param z2: the elevation of side 2 [m]
+    :param shape1: the shape of side 1, "Circle" or "Rectangle" (or an array of those) [Default: "Circle"]
+    :param shape2: the shape of side 2, "Circle" or "Rectangle" (or an array of those) [Default: "Circle"]
+    :param length: the length of the pipe [m, Default: None, frictionless flow]
+    :param roughness: the absolute roughness of the wall [m, Default: 0]
+    :param viscosity: the kinematic viscosity [m^2/s, Default: water at 20 degrees]
+    :return: dict of numpy arrays with the areas 'a1', 'a2', velocities 'u1', 'u2', discharges 'q1', 'q2' and the
+             pressure head difference 'dp'. With friction also the Reynolds numbers 're1', 're2', friction factors
+             'f1', 'f2' and the head loss 'hf', which is already subtracted from 'dp'
+    """
+    a1 = section_area(shape1, d1, w1, h1)
+    a2 = section_area(shape2, d2, w2, h2)
+    u1 = np.asarray(q, dtype=float) / a1
+    u2 = a1 / a2 * u1
+    dp = (u1 ** 2 - u2 ** 2) / (2 * G_CONSTANT) + np.asarray(z1, dtype=float) - np.asarray(z2, dtype=float)
+    result = {'a1': a1, 'a2': a2, 'u1': u1, 'u2': u2, 'q1': a1 * u1, 'q2': a2 * u2, 'dp': dp}
+    if length is not None:
+        loss1 = darcy_weisbach(u1, section_hydraulic_diameter(shape1, d1, w1, h1), length, roughness, viscosity)
+        loss2 = darcy_weisbach(u2, section_hydraulic_diameter(shape2, d2, w2, h2), length, roughness, viscosity)
+        hf = (loss1['hf'] + loss2['hf']) / 2
+        result.update({'re1': loss1['re'], 're2': loss2['re'], 'f1': loss1['f'], 'f2': loss2['f'], 'hf': hf,
+                       'dp': dp - hf})
+    return result
+
+
+PIPE_PARAMETERS = ('q', 'd1', 'w1', 'h1', 'z1', 'd2', 'w2', 'h2', 'z2', 'length', 'roughness', 'viscosity')
+
+
+def pipe_jacobian(q, d1=1, d2=1, w1=1, h1=1, w2=1, h2=1, z1=0, z2=0, shape1="Circle", shape2="Circle",
+                  length=None, roughness=0., viscosity=WATER_VISCOSITY):
+    """
+    Evaluates the pipe like evaluate_pipe() and differentiates u1, u2 and dp analytically with respect to every
+    parameter in PIPE_PARAMETERS. The params are the same as for evaluate_pipe() and may be scalars or numpy arrays,
+    which are broadcast against each other. Parameters a result does not depend on (e.g. the diameter of a rectangular
+    side) have a derivative of 0
+
+    :return: dict of evaluate_pipe() with an additional entry 'jacobian', which maps each of 'u1', 'u2' and 'dp' to a
+             dict of the derivatives {parameter: numpy array}
+    """
+    result = evaluate_pipe(q, d1, d2, w1, h1, w2, h2, z1, z2, shape1, shape2, length, roughness, viscosity)
+    shape = np.broadcast(*(np.asarray(arg) for arg in (q, d1, d2, w1, h1, w2, h2, z1, z2, shape1, shape2, length,
+                                                       roughness, viscosity))).shape
+    zero = np.zeros(shape)
+    jacobian = {key: {parameter: zero for parameter in PIPE_PARAMETERS} for key in ('u1', 'u2', 'dp')}
+
+    # derivatives of the velocities, u_i = q / a_i
+    sides = []
+    for side, form, d, w, h in ((1, shape1, d1, w1, h1), (2, shape2, d2, w2, h2)):
+        circle = np.asarray(form) == "Circle"
+        d, w, h = (np.asarray(v, dtype=float) for v in (d, w, h))
+        a = result[f'a{side}']
+        u = result[f'u{side}']
+        da = {f'd{side}': np.where(circle, np.pi * d / 2, 0.), f'w{side}': np.where(circle, 0., h),
+              f'h{side}': np.where(circle, 0., w)}
+        du = {'q': 1 / a + zero, **{parameter: -u / a * value for parameter, value in da.items()}}
+        jacobian[f'u{side}'] = {**jacobian[f'u{side}'], **du}
+        ddh = {f'd{side}': np.where(circle, 1., 0.), f'w{side}': np.where(circle, 0., 2 * h ** 2 / (w + h) ** 2),
+               f'h{side}': np.where(circle, 0., 2 * w ** 2 / (w + h) ** 2)}
+        sides.append((u, du, section_hydraulic_diameter(form, d, w, h), ddh))
+
+    (u1, du1, dh1, ddh1), (u2, du2, dh2, ddh2) = sides
+    dp = {parameter: (u1 * du1.get(parameter, 0) - u2 * du2.get(parameter, 0)) / G_CONSTANT + zero
+          for parameter in PIPE_PARAMETERS}
+    dp['z1'] = 1 + zero
+    dp['z2'] = -1 + zero
+
+    if length is not None:
+        length = np.asarray(length, dtype=float)
+        roughness = np.asarray(roughness, dtype=float)
+        viscosity = np.asarray(viscosity, dtype=float)
+        c = length / (4 * G_CONSTANT)
+        for u, du, dh, ddh in sides:
+            re = reynolds_number(u, dh, viscosity)
+            f, df_dre, df_drr = friction_factor_gradient(re, roughness / dh)
+            loss = c * f * u ** 2 / dh
+            # partial derivatives of this side's loss with respect to u, D_h, k, nu and L
+            loss_u = c * (df_dre * np.sign(u) * dh / viscosity * u ** 2 + 2 * f * u) / dh
+            loss_dh = c * ((df_dre * np.abs(u) / viscosity - df_drr * roughness / dh ** 2) * u ** 2 / dh
+                           - f * u ** 2 / dh ** 2)
+            for parameter in PIPE_PARAMETERS:
+                dp[parameter] = dp[parameter] - loss_u * du.get(parameter, 0) - loss_dh * ddh.get(parameter, 0)
+            dp['roughness'] = dp['roughness'] - c * df_drr / dh * u ** 2 / dh
+            dp['viscosity'] = dp['viscosity'] + c * df_dre * re / viscosity * u ** 2 / dh
+            dp['length'] = dp['length'] - loss / length
+    jacobian['dp'] = dp
+    result['jacobian'] = jacobian
+    return result
+
+
+DESIGN_BRACKETS = {'q': (0., 1000.), 'd1': (1e-3, 100.), 'd2': (1e-3, 100.), 'w1': (1e-3, 100.), 'h1': (1e-3, 100.),
+                   'w2': (1e-3, 100.), 'h2': (1e-3, 100.), 'z1': (-1000., 1000.), 'z2': (-1000., 1000.)}
+
+
+def solve_pipe(unknown, target, bracket=None, tol=1e-10, max_iter=60, **params):
+    """
+    Inverse of evaluate_pipe(): finds the value of one parameter, so that the pressure head difference 'dp' matches the
+    target. Whole arrays of targets (and of the other params) are solved at once with a bracketed Newton method:
+    every iteration takes a Newton step with a finite difference derivative and falls back to bisection whenever the
+    step would leave the current bracket, so every element converges as long as its bracket contains a root
+
+    :param unknown: the name of the parameter to solve for, one of 'q', 'd1', 'd2', 'w1', 'h1', 'w2', 'h2', 'z1', 'z2'
+    :param target: the requested pressure head difference dp [m], scalar or numpy array
+    :param bracket: tuple of the lower and upper bound of the unknown, scalars or arrays
+                    [Default: None, see DESIGN_BRACKETS]
+    :param tol: the tolerance on the residual, relative to 1 + |target| [Default: 1e-10]
+    :param max_iter: the maximum number of iterations [Default: 60]
+    :param params: the remaining keyword arguments of evaluate_pipe(), scalars or numpy arrays
+    :return: dict of numpy arrays with the solution 'x' (NaN for infeasible targets), the mask 'feasible' of targets,
+             for which the residual changes its sign over the bracket, the mask 'converged', the remaining 'residual'
+             and the number of 'iterations' used
+    """
+    if unknown not in DESIGN_BRACKETS:
+        raise ValueError(f'Cannot solve for "{unknown}", choose one of {", ".join(DESIGN_BRACKETS)}')
+    params.pop(unknown, None)
+    target = np.asarray(target, dtype=float)
+    lo, hi = DESIGN_BRACKETS[unknown] if bracket is None else bracket
+
+    def residual(x):
+        return evaluate_pipe(**{**params, unknown: x})['dp'] - target
+
+    f_lo = residual(lo)
+    shape = f_lo.shape
+    lo = np.broadcast_to(np.asarray(lo, dtype=float), shape).copy()
+    hi = np.broadcast_to(np.asarray(hi, dtype=float), shape).copy()
+    f_lo = f_lo.copy()
+    f_hi = np.broadcast_to(residual(hi), shape).copy()
+    feasible = np.isfinite(f_lo) & np.isfinite(f_hi) & (np.sign(f_lo) * np.sign(f_hi) <= 0)
+
+    x = np.where(feasible, (lo + hi) / 2, np.nan)
+    f_x = np.broadcast_to(residual(x), shape).copy()
+    converged = feasible & (np.abs(f_x) <= tol * (1 + np.abs(target)))
+    iterations = 0
+    while iterations < max_iter and not (converged | ~feasible).all():
+        iterations += 1
+        lower = np.sign(f_x) == np.sign(f_lo)
+        lo = np.where(lower, x, lo)
+        f_lo = np.where(lower, f_x, f_lo)
+        hi = np.where(lower, hi, x)
+        f_hi = np.where(lower, f_hi, f_x)
+
+        step = np.sqrt(np.finfo(float).eps) * np.maximum(np.abs(x), 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = (residual(x + step) - f_x) / step
+            newton = x - f_x / slope
+        bisect = ~np.isfinite(newton) | (newton <= np.minimum(lo, hi)) | (newton >= np.maximum(lo, hi))
+        active = feasible & ~converged
+        x = np.where(active, np.where(bisect, (lo + hi) / 2, newton), x)
+        f_x = np.where(active, residual(x), f_x)
+        converged = feasible & (np.abs(f_x) <= tol * (1 + np.abs(target)))
+
+    return {'x': np.where(feasible, x, np.nan), 'feasible': feasible, 'converged': converged,
+            'residual': np.where(feasible, f_x, np.nan), 'iterations': iterations}
+
+
+def sample_distribution(spec, rng, size):
+    """
+    Draws samples of an uncertain parameter
+
+    :param spec: the distribution, one of ('normal', mean, std), ('uniform', low, high), ('triangular', low, mode, high),
+                 a constant, or a function (rng, size) -> numpy array
+    :param rng: the numpy random Generator
+    :param size: the number of samples
+    :return: numpy array of samples
+    """
+    if callable(spec):
+        return spec(rng, size)
+    if not isinstance(spec, tuple):
+        return np.full(size, spec, dtype=float)
+    kind, *args = spec
+    if kind == 'normal':
+        return rng.normal(*args, size)
+    if kind == 'uniform':
+        return rng.uniform(*args, size)
+    if kind == 'triangular':
+        return rng.triangular(*args, size)
+    raise ValueError(f'Unknown distribution "{kind}", choose one of normal, uniform, triangular')
+
+
+def monte_carlo_pipe(distributions, n=10 ** 6, chunk=10 ** 6, seed=None, bins=256, output='dp', callback=None,
+                     **params):
+    """
+    Propagates parameter uncertainties through evaluate_pipe() by Monte Carlo sampling. The samples are drawn and
+    evaluated in chunks and only streaming statistics are kept (RunningMoments, StreamingHistogram), so the memory
+    depends on the chunk size, not on n
+
+    :param distributions: dict of {parameter: distribution}, see sample_distribution()
+    :param n: the total number of samples [Default: 10^6]
+    :param chunk: the number of samples evaluated at once [Default: 10^6]
+    :param seed: the seed of the random generator [Default: None]
+    :param bins: the number of histogram bins [Default: 256]
+    :param output: the result of evaluate_pipe() to analyse [Default: 'dp']
+    :param callback: function (moments, histogram, done) called after every chunk, e.g. to report progress
+                     [Default: None]
+    :param params: the fixed keyword arguments of evaluate_pipe()
+    :return: tuple of the RunningMoments and the StreamingHistogram of the output
+    """
+    rng = np.random.default_rng(seed)
+    moments = RunningMoments()
+    histogram = StreamingHistogram(bins)
+    done = 0
+    while done < n:
+        size = min(chunk, n - done)
+        samples = {parameter: sample_distribution(spec, rng, size) for parameter, spec in distributions.items()}
+        values = evaluate_pipe(**{**params, **samples})[output]
+        moments.update(values)
+        histogram.update(values)
+        done += size
+        if callback is not None:
+            callback(moments, histogram, done)
+    return moments, histogram
+
+
+def pipe_profile(q, resolution=128, **params):
+    """
+    Evaluates velocity, pressure head, hydraulic grade line and energy line along the axis of an AdvancedPipe at
+    `resolution` equally spaced points. The area and the elevation change linearly between both ends, friction losses
+    (if a length is given) grow linearly along the pipe. The pressure head is relative to side 1
+
+    :param q: the discharge Q [m^3/s]
+    :param resolution: the number of points along the axis [Default: 128]
+    :param params: the remaining keyword arguments of evaluate_pipe(), all scalars
+    :return: dict of numpy arrays of length resolution: the relative position 's' (0 at side 1, 1 at side 2), area 'a',
+             velocity 'u', elevation 'z', pressure head 'p', hydraulic grade line 'hgl' and energy line 'energy'
+    """
+    ends = evaluate_pipe(q, **params)
+    s = np.linspace(0, 1, resolution)
+    z1 = params.get('z1', 0)
+    a = (1 - s) * ends['a1'] + s * ends['a2']
+    z = (1 - s) * z1 + s * params.get('z2', 0)
+    u = q / a
+    kinetic = u ** 2 / (2 * G_CONSTANT)
+    energy = z1 + kinetic[0] - ends.get('hf', 0) * s
+    p = energy - z - kinetic
+    return {'s': s, 'a': a, 'u': u, 'z': z, 'p': p, 'hgl': z + p, 'energy': np.broadcast_to(energy, s.shape)}
+
+
+def dimensionless_numbers(q, resolution=128, profile=None, **params):
+    """
+    Evaluates the dimensionless numbers along the axis of an AdvancedPipe, see pipe_profile(). The hydraulic diameter
+    changes linearly between both ends like the area
+
+    :param q: the discharge Q [m^3/s]
+    :param resolution: the number of points along the axis [Default: 128]
+    :param profile: the result of pipe_profile() for the same arguments, it is evaluated if not given [Default: None]
+    :param params: the remaining keyword arguments of evaluate_pipe(), all scalars
+    :return: dict of numpy arrays of length resolution: the relative position 's', hydraulic diameter 'dh', Reynolds
+             number 're', Froude number 'fr', relative roughness 'relative_roughness', friction factor 'f' and the
+             index of the flow regime 'regime' (see REGIMES)
+    """
+    s = np.linspace(0, 1, resolution)
+    dh1 = section_hydraulic_diameter(params.get('shape1', "Circle"), params.get('d1', 1), params.get('w1', 1),
+                                     params.get('h1', 1))
+    dh2 = section_hydraulic_diameter(params.get('shape2', "Circle"), params.get('d2', 1), params.get('w2', 1),
+                                     params.get('h2', 1))
+    dh = (1 - s) * dh1 + s * dh2
+    u = (profile if profile is not None else pipe_profile(q, resolution, **params))['u']
+    re = reynolds_number(u, dh, params.get('viscosity', WATER_VISCOSITY))
+    relative_roughness = (params.get('roughness') or 0.) / dh
+    return {'s': s, 'dh': dh, 're': re, 'fr': froude_number(u, dh), 'relative_roughness': relative_roughness,
+            'f': friction_factor(re, relative_roughness), 'regime': regime_code(re)}
+
+
+def regime_map(q, d, viscosity=WATER_VISCOSITY):
+    """
+    Classifies the flow of a circular pipe for a whole grid of discharges and diameters, Re = 4 * Q / (pi * D * nu)
+
+    :param q: the discharges, array of length nq [m^3/s]
+    :param d: the diameters, array of length nd [m]
+    :param viscosity: the kinematic viscosity [m^2/s, Default: water at 20 degrees]
+    :return: integer array of shape (nd, nq) of indices into REGIMES
+    """
+    re = 4 * np.asarray(q, dtype=float)[np.newaxis, :] / (np.pi * np.asarray(d, dtype=float)[:, np.newaxis] * viscosity)
+    return regime_code(re)
+
+
+def evaluate_series(sections, q, p1=0.):
+    """
+    Evaluates the Bernoulli chain of a frictionless series pipe in one vectorized pass. The energy head is constant along
+    the pipe, so the pressure head at every section follows from the inlet state:
+    p_i / (rho * g) = p_1 / (rho * g) + (U_1^2 - U_i^2) / (2 * g) + z_1 - z_i
+
+    :param sections: SectionArray of the N sections
+    :param q: the discharge Q [m^3/s], scalar or array (results then get an additional last axis of length N)
+    :param p1: the pressure head p_1 / (rho * g) at the first section [m, Default: 0]
+    :return: dict of numpy arrays with areas 'a', velocities 'u', velocity heads 'kinetic', pressure heads 'p',
+             hydraulic grade line 'hgl' (z + p) and energy line 'energy' (z + p + U^2 / 2g)
+    """
+    a = sections.area()
+    u = np.asarray(q, dtype=float)[..., np.newaxis] / a
+    kinetic = u ** 2 / (2 * G_CONSTANT)
+    energy = sections.z[0] + np.asarray(p1, dtype=float)[..., np.newaxis] + kinetic[..., :1]
+    p = energy - sections.z - kinetic
+    return {'a': a, 'u': u, 'kinetic': kinetic, 'p': p, 'hgl': sections.z + p,
+            'energy': np.broadcast_to(energy, p.shape)}
+
+
+class PipeLoft:
+    """
+    Tube mesh, which is lofted between two arbitrary section outlines (circle or rectangle) with an elevation offset.
+    The pipe axis is the x-axis, the elevation the y-axis. The topology is fixed, so the index is built once and every
+    update only overwrites the preallocated position and normal arrays in place before they are sent to the client
+    """
+
+    def __init__(self, segments=64, rings=24, length=15.):
+        """
+        Initializes the mesh arrays and the pythreejs geometry
+
+        :param segments: the number of vertices around the outline [Default: 64]
+        :param rings: the number of segments along the pipe [Default: 24]
+        :param length: the length of the mesh [Default: 15]
+        """
+        self.segments = segments
+        self.rings = rings
+        self.length = length
+        angle = np.linspace(0, 2 * np.pi, segments, endpoint=False)
+        self.cos = np.cos(angle)
+        self.sin = np.sin(angle)
+        self.s = np.linspace(0, 1, rings + 1)[:, np.newaxis]
+        # smoothstep of the elevation, so that both ends stay horizontal
+        self.rise = 3 * self.s ** 2 - 2 * self.s ** 3
+        self.positions = np.zeros((rings + 1, segments, 3), dtype=np.float32)
+        self.positions[..., 0] = self.s * length - length / 2
+        self.normals = np.zeros((rings + 1, segments, 3), dtype=np.float32)
+        self.radius = np.empty((rings + 1, segments))
+        self.along = np.empty((rings + 1, segments, 3))
+        self.around = np.empty((rings + 1, segments, 3))
+        self.norm = np.empty((rings + 1, segments, 1))
+
+        ring = np.arange(rings)[:, np.newaxis] * segments
+        j = np.arange(segments)
+        a = ring + j
+        b = ring + (j + 1) % segments
+        index = np.stack((a, a + segments, b, b, a + segments, b + segments), axis=-1)
+        dtype = np.uint16 if (rings + 1) * segments <= 65536 else np.uint32
+        self.geometry = BufferGeometry(index=BufferAttribute(array=index.astype(dtype).ravel()), attributes={
+            'position': BufferAttribute(array=self.positions.reshape(-1, 3)),
+            'normal': BufferAttribute(array=self.normals.reshape(-1, 3)),
+        })
+
+    def update(self, shape1="Circle", d1=1, w1=1, h1=1, z1=0, shape2="Circle", d2=1, w2=1, h2=1, z2=0, **kwargs):
+        """
+        Recomputes the vertices and normals for new end sections and sends them to the client
+
+        :param shape1: the shape of side 1, "Circle" or "Rectangle"
+        :param d1: the diameter of side 1, if it is circular [m]
+        :param w1: the width of side 1, if it is rectangular [m]
+        :param h1: the height of side 1, if it is rectangular [m]
+        :param z1: the elevation of side 1 [m]
+        :param shape2: the shape of side 2, "Circle" or "Rectangle"
+        :param d2: the diameter of side 2, if it is circular [m]
+        :param w2: the width of side 2, if it is rectangular [m]
+        :param h2: the height of side 2, if it is rectangular [m]
+        :param z2: the elevation of side 2 [m]
+        :param kwargs: further keyword arguments (e.g. of AdvancedPipe::operating_point()) are ignored
+        :return: None
+        """
+        r1 = section_outline_radius(shape1, d1, w1, h1, self.cos, self.sin)
+        r2 = section_outline_radius(shape2, d2, w2, h2, self.cos, self.sin)
+        np.multiply(self.s, r2 - r1, out=self.radius)
+        self.radius += r1
+        np.multiply(self.radius, self.sin, out=self.positions[..., 1])
+        self.positions[..., 1] += z1 + (z2 - z1) * self.rise
+        np.multiply(self.radius, self.cos, out=self.positions[..., 2])
+
+        # normals are the cross product of the tangents along the pipe and around the outline
+        p = self.positions
+        np.subtract(np.roll(p, -1, axis=1), np.roll(p, 1, axis=1), out=self.around)
+        np.subtract(p[2:], p[:-2], out=self.along[1:-1])
+        np.subtract(p[1], p[0], out=self.along[0])
+        np.subtract(p[-1], p[-2], out=self.along[-1])
+        t, a = self.along, self.around
+        np.multiply(t[..., 1], a[..., 2], out=self.normals[..., 0])
+        self.normals[..., 0] -= t[..., 2] * a[..., 1]
+        np.multiply(t[..., 2], a[..., 0], out=self.normals[..., 1])
+        self.normals[..., 1] -= t[..., 0] * a[..., 2]
+        np.multiply(t[..., 0], a[..., 1], out=self.normals[..., 2])
+        self.normals[..., 2] -= t[..., 1] * a[..., 0]
+        np.sqrt(np.einsum('ijk,ijk->ij', self.normals, self.normals), out=self.norm[..., 0])
+        np.maximum(self.norm, 1e-12, out=self.norm)
+        np.divide(self.normals, self.norm, out=self.normals, casting='unsafe')
+
+        # the arrays are modified in place, so the traits do not notice the change by themselves
+        self.geometry.attributes['position'].send_state('array')
+        self.geometry.attributes['normal'].send_state('array')
+
+
 class SimplePipe(Model):
     """
     Concrete implementation of Model, which represents a simple pipe with two circular endings.
@@ -231,7 +961,6 @@ class AdvancedPipe(Model):
 
     def update(self, args):
         #self.u1 = self.u1Param.real()
-        cur_q = self.q
         self.q = self.qParam.real()
 
         i1Type = self.i1.type
@@ -248,7 +977,13 @@ class AdvancedPipe(Model):
         self.i2wParam.set_active(self.i2.type == "Rectangle")
         self.i2hParam.set_active(self.i2.type == "Rectangle")
 
-        if i1Type != self.i1.type or i2Type != self.i2.type:
+        friction = self.frictionGroup.value == "Darcy-Weisbach"
+        self.lengthParam.set_active(friction)
+        self.roughnessParam.set_active(friction)
+        self.viscosityParam.set_active(friction)
+
+        if i1Type != self.i1.type or i2Type != self.i2.type or friction != self.friction:
+            self.friction = friction
             self.callback.update_input()
 
         if self.i1.type == "Circle":
@@ -266,15 +1001,20 @@ class AdvancedPipe(Model):
         self.i2.y = self.i2yParam.widget.max - self.i2yParam.real() + 75
 
         super().update(args)
-        if cur_q == self.q:
-            self.draw()
-
-       # self.rendering.geometry = CylinderBufferGeometry(self.i1.d / 2, self.i2.d / 2, 5, 16, 1)
+        self.draw()
+        self.update_rendering()
 
-    def __init__(self, i1: IntersectionForm, i2: IntersectionForm, u1, canvas=None, margin_left=50, margin_right=50):
-        if canvas is not None:
+    def __init__(self, i1: IntersectionForm, i2: IntersectionForm, u1, canvas=None, margin_left=50, margin_right=50,
+                 resolution=128, camera=camera, detail=None):
+        if isinstance(canvas, MultiCanvas):
+            # the pipe is drawn on the lowest layer, the layers above are left to e.g. a ParticleTracer
+            canvas.layout.width = 'auto'
+            canvas.layout.height = '40%'
+            canvas = canvas[0]
+        elif canvas is not None:
             canvas.layout.width = 'auto'
             canvas.layout.height = '40%'
+        if canvas is not None:
             self.scale = canvas.width / canvas.height * 2.5
             #self.scale = 1
             #canvas.font = f'{self.scale * 2}px serif'
@@ -284,6 +1024,16 @@ class AdvancedPipe(Model):
 
         self.margin_left = margin_left
         self.margin_right = margin_right
+        self.resolution = resolution
+        self.callback = None
+        self.profile_key = None
+        self.profile_cache = None
+        self.tracer = None
+        self.regime_map = None
+        self.drawing = None
+        self.threejs_scene = None
+        self.geometry_key = None
+        self.style_cache = {}
 
         self.i1Circ = i1 if i1.type == "Circle" else Circle(1, 0)
         self.i2Circ = i2 if i2.type == "Circle" else Circle(1, 0)
@@ -296,12 +1046,14 @@ class AdvancedPipe(Model):
         self.i1.display(0)
         self.i2.display(0)
 
+        self.camera = camera
+        self.detail = detail if detail is not None else SceneDetail(camera)
+        self.loft_lod = LevelOfDetail(PipeLoft, PIPE_LOD_LEVELS, lambda segments, rings: 2 * segments * rings)
+        self.loft = self.loft_lod.get(0)
         self.rendering = Mesh(
-            CylinderBufferGeometry(self.i1.d / 2, self.i2.d / 2, 5, 16, 1),
+            self.loft.geometry,
             position=[0, 0, 0],
-            rotation=[0, 0, pymath.pi / 2, 'XYZ'],
-            scale=[1, 3, 1],
-            material=MeshLambertMaterial(color='red')
+            material=MeshLambertMaterial(color='red', side='DoubleSide')
         )
 
         self.u1Param = FloatChangeable(u1, _min=u1, _max=u1 * 5, desc="$U_1$: ", unit="ms^{-1}")
@@ -347,18 +1099,61 @@ class AdvancedPipe(Model):
         self.i2yParam = FloatChangeable(self.i2.y, _min=-25, _max=25, desc="Z Position $~~z_2$", unit="m",
                                       width='100px')
 
+        self.friction = False
+        self.frictionGroup = DropDownGroup(['Frictionless', 'Darcy-Weisbach'],
+                                           ['Neglect friction losses', 'Include Darcy-Weisbach friction losses'])
+        self.frictionWidget = BoxHorizontal([widgets.HTML(f"Flow model"), self.frictionGroup.display])
+        self.lengthParam = FloatChangeable(10, _min=1, _max=1000, desc="Length $~~L$", unit="m", step=1,
+                                           width='100px')
+        self.roughnessParam = FloatChangeable(0.05, base=-3, _min=0, _max=5, desc="Roughness $~~k$", unit="mm",
+                                              step=0.01, width='100px')
+        self.viscosityParam = FloatChangeable(1, base=-6, _min=0.1, _max=10, desc="Viscosity $~~\\nu$",
+                                              unit="10^{-6} m^2s^{-1}", step=0.01, width='100px')
+        self.lengthParam.set_active(False)
+        self.roughnessParam.set_active(False)
+        self.viscosityParam.set_active(False)
+
         self.params = [
             ChangeableContainer(
                 [self.i1ChoiceWidget, self.i1dParam, self.i1wParam, self.i1hParam, self.i1yParam]),
             ChangeableContainer([self.i2ChoiceWidget, self.i2dParam, self.i2wParam, self.i2hParam, self.i2yParam]),
-            ChangeableContainer([self.qParam])
+            ChangeableContainer([self.qParam, self.frictionWidget, self.lengthParam, self.roughnessParam,
+                                 self.viscosityParam])
         ]
         self.i1.y = self.i1yParam.widget.max - self.i1yParam.real() + 75
         self.i2.y = self.i2yParam.widget.max - self.i2yParam.real() + 75
+        self.update_rendering()
         #if self.canvas is not None:
             #self.canvas.layout.width = "100%"
         #    self.canvas.on_client_ready(self.draw)
 
+    def update_rendering(self):
+        """
+        Registers the 3D pipe with the triangle budget of its scene (self.detail) and lets the scene choose the
+        resolution of all its objects, see SceneDetail
+
+        :return: None
+        """
+        point = self.operating_point()
+        radius = max(self.loft.length, point['z2'] - point['z1']) / 2
+        centre = [0, (point['z1'] + point['z2']) / 2, 0]
+        self.detail.set_group('pipe', self.loft_lod, radius, [centre], lambda levels: self.set_loft(levels[0], point))
+        self.detail.select()
+
+    def set_loft(self, level, point):
+        """
+        Updates the vertices of the given resolution of the 3D pipe and shows it
+
+        :param level: the level of self.loft_lod
+        :param point: the operating point, see operating_point()
+        :return: None
+        """
+        loft = self.loft_lod.get(level)
+        loft.update(**point)
+        if loft is not self.loft:
+            self.loft = loft
+            self.rendering.geometry = loft.geometry
+
     def q1(self):
         """
         Calculates the pressure of the water flowing in the pipe
@@ -414,12 +1209,145 @@ class AdvancedPipe(Model):
 
     def dp(self):
         """
-        Calculates the change of pressure in this pipe, depending on the height change
+        Calculates the change of pressure in this pipe, depending on the height change and the friction losses
         :return: the change of pressure
         """
         if self.i1 is None or self.i2 is None:
             return 0
-        return (self.u1() ** 2 - self.u2() ** 2) / (2 * G_CONSTANT) + self.i1yParam.real() - self.i2yParam.real()
+        return (self.u1() ** 2 - self.u2() ** 2) / (2 * G_CONSTANT) + self.i1yParam.real() - self.i2yParam.real() \
+            - self.hf()
+
+    def losses(self):
+        """
+        Calculates Reynolds numbers, friction factors and the friction head loss, see evaluate_pipe()
+
+        :return: dict of 're1', 're2', 'f1', 'f2' and 'hf', or None for frictionless flow
+        """
+        if not self.friction:
+            return None
+        result = self.evaluate()
+        return {key: float(result[key]) for key in ('re1', 're2', 'f1', 'f2', 'hf')}
+
+    def hf(self):
+        """
+        Calculates the friction head loss between the two ends
+
+        :return: the head loss, 0 for frictionless flow
+        """
+        return self.losses()['hf'] if self.friction else 0
+
+    def operating_point(self):
+        """
+        Returns the current state of the pipe as keyword arguments for evaluate_pipe()
+
+        :return: dict of the current discharge, geometry and elevations
+        """
+        return {'q': self.q, 'shape1': self.i1.type, 'shape2': self.i2.type,
+                'd1': self.i1Circ.d, 'w1': self.i1Rect.w, 'h1': self.i1Rect.h, 'z1': self.i1yParam.real(),
+                'd2': self.i2Circ.d, 'w2': self.i2Rect.w, 'h2': self.i2Rect.h, 'z2': self.i2yParam.real(),
+                'length': self.lengthParam.real() if self.friction else None,
+                'roughness': self.roughnessParam.real(), 'viscosity': self.viscosityParam.real()}
+
+    def evaluate(self, **params):
+        """
+        Evaluates the pipe for arrays of operating points, see evaluate_pipe().
+        Params that are not given are taken from the current state of the pipe
+
+        :param params: keyword arguments of evaluate_pipe(), scalars or numpy arrays
+        :return: dict of numpy arrays, see evaluate_pipe()
+        """
+        return evaluate_pipe(**{**self.operating_point(), **params})
+
+    def jacobian(self, **params):
+        """
+        Evaluates the pipe and the derivatives of u1, u2 and dp with respect to all parameters, see pipe_jacobian().
+        Params that are not given are taken from the current state of the pipe
+
+        :param params: keyword arguments of evaluate_pipe(), scalars or numpy arrays
+        :return: dict of numpy arrays, see pipe_jacobian()
+        """
+        return pipe_jacobian(**{**self.operating_point(), **params})
+
+    def uncertainty(self, distributions, n=10 ** 6, chunk=10 ** 6, seed=None, output='dp', **params):
+        """
+        Runs a Monte Carlo uncertainty analysis around the current state of the pipe, see monte_carlo_pipe().
+        Progress and the statistics accumulated so far are shown in the output of the Demo after every chunk
+
+        :param distributions: dict of {parameter: distribution}, e.g. {'d2': ('normal', 0.5, 0.01)}
+        :param n: the total number of samples [Default: 10^6]
+        :param chunk: the number of samples evaluated at once [Default: 10^6]
+        :param seed: the seed of the random generator [Default: None]
+        :param output: the result of evaluate_pipe() to analyse [Default: 'dp']
+        :param params: further fixed keyword arguments of evaluate_pipe()
+        :return: tuple of the RunningMoments and the StreamingHistogram of the output
+        """
+
+        def report(moments, histogram, done):
+            if self.callback is not None:
+                self.callback.report(self.uncertainty_table(moments, histogram, done, n, output))
+
+        return monte_carlo_pipe(distributions, n, chunk, seed, output=output, callback=report,
+                                **{**self.operating_point(), **params})
+
+    def uncertainty_table(self, moments, histogram, done, n, output='dp'):
+        """
+        Returns the statistics of an uncertainty analysis as HTML table
+
+        :param moments: the RunningMoments of the output
+        :param histogram: the StreamingHistogram of the output
+        :param done: the number of evaluated samples
+        :param n: the total number of samples
+        :param output: the name of the analysed output [Default: 'dp']
+        :return: HTML string
+        """
+        unit = {'u1': 'ms^{-1}', 'u2': 'ms^{-1}', 'q1': 'm^3s^{-1}', 'q2': 'm^3s^{-1}', 'a1': 'm^2', 'a2': 'm^2'}
+        unit = Variable(0, unit=unit.get(output, 'm')).rmunit()
+        q05, q50, q95 = histogram.quantile([0.05, 0.5, 0.95])
+        table = Table(["Uncertainty", "Value"], 2)
+        table.add_rows([
+            [f'Samples', f'${done} / {n} ~~ ({100 * done / n:.0f} \\%)$'],
+            [f'Mean $\\mu$', f'${moments.mean:.4f} ~~ {unit}$'],
+            [f'Standard deviation $\\sigma$', f'${moments.std():.4f} ~~ {unit}$'],
+            [f'Median', f'${q50:.4f} ~~ {unit}$'],
+            [f'90 \\% interval', f'$[{q05:.4f}, {q95:.4f}] ~~ {unit}$'],
+            [f'Range', f'$[{moments.min:.4f}, {moments.max:.4f}] ~~ {unit}$'],
+        ])
+        if moments.nonfinite > 0:
+            table.add_row([f'Non-finite samples', f'${moments.nonfinite}$ - e.g. a sampled cross section without area, '
+                                                  f'left out of the statistics'])
+        return table.show()
+
+    def solve_for(self, unknown, target, **params):
+        """
+        Finds the value of one parameter for arrays of target pressure head differences, see solve_pipe().
+        Params that are not given are taken from the current state of the pipe
+
+        :param unknown: the name of the parameter to solve for, e.g. 'd2' or 'q'
+        :param target: the requested pressure head difference dp [m], scalar or numpy array
+        :param params: keyword arguments of solve_pipe() and evaluate_pipe()
+        :return: dict of numpy arrays, see solve_pipe()
+        """
+        return solve_pipe(unknown, target, **{**self.operating_point(), **params})
+
+    def profile(self):
+        """
+        Returns velocity, pressure head and energy line along the pipe axis, see pipe_profile(), together with the
+        colour stops of the pressure shading. Both are only recomputed when the geometry, Q or the resolution changed
+
+        :return: dict of numpy arrays, see pipe_profile(), and the list of colour stops 'stops'
+        """
+        point = self.operating_point()
+        key = (tuple(point.items()), self.resolution)
+        if key != self.profile_key:
+            profile = pipe_profile(resolution=self.resolution, **point)
+            p = profile['p']
+            t = (p - p.min()) / max(p.max() - p.min(), 1e-12)
+            low, high = np.array([194, 229, 242]), np.array([7, 120, 217])
+            colors = (low + t[:, np.newaxis] * (high - low)).astype(int)
+            profile['stops'] = [(pos, hexcode(tuple(color))) for pos, color in zip(profile['s'], colors.tolist())]
+            self.profile_key = key
+            self.profile_cache = profile
+        return self.profile_cache
 
     def calculate(self):
         if self.i1 is None or self.i2 is None:
@@ -460,18 +1388,39 @@ class AdvancedPipe(Model):
         #q2 = Variable(self.q2(), unit='m^3s^{-1}')
         u2 = Variable(self.u2(), unit='ms^{-1}')
         dp = Variable(self.dp(), unit='m')
+        losses = self.losses()
+        if losses is None:
+            return f'{self.table()}<br />' \
+                   f'<table class="tg" width="100%" height="100%" margin-right="15%">' \
+                   f'<thead><tr><th class="tg-0gzz"><h1>Difference in Pressure</h1></th></tr></thead>' \
+                   f'<tbody><tr><td class="tg-tdqd">$\Delta E = \Delta h + \\frac{{\Delta p}}{{\\rho \cdot g}} + \\frac{{\Delta U^2}}{{2 \cdot g}}$</td></tr>' \
+                   f'<tr><td class="tg-tdqd">$\Delta E = 0$ - energy conservation, because of frictionless flow</td></tr>' \
+                   f'<tr><td class="tg-tdqd">$\\rightarrow 0 = (z_1 - z_2) + \\frac{{\Delta p}}{{\\rho \cdot g}} + \\frac{{(U_1^2 - U_2^2)}}{{2 \cdot g}}$</td></tr>' \
+                   f'<tr><td class="tg-tdqd">$\\Rightarrow \\frac{{\Delta p}}{{\\rho \cdot g}} = ' \
+                   f'\\frac{{({u1.real()**2:.3f} - {u2.real()**2:.3f})}}{{2 \cdot g}} {dp.rmunit()}' \
+                   f' + ({self.i1yParam.real():.3f} - {self.i2yParam.real():.3f}) {dp.rmunit()}$</td></tr>' \
+                   f'<tr><td class="tg-tdqd">$\\frac{{\Delta p}}{{\\rho \cdot g}} = {(u1.real()**2 - u2.real()**2) / (2 * G_CONSTANT):.3f} + {self.i1yParam.real() - self.i2yParam.real():.3f} = {dp.rounded_latex(3)}$</td></tr>' \
+                   f'</tbody></table>'
+        hf = Variable(losses['hf'], unit='m')
         return f'{self.table()}<br />' \
+               f'<table class="tg" width="100%" height="100%" margin-right="15%">' \
+               f'<thead><tr><th class="tg-0gzz"><h1>Friction Losses</h1></th></tr></thead>' \
+               f'<tbody><tr><td class="tg-tdqd">$Re = \\frac{{U \cdot D_h}}{{\\nu}}$ - ' \
+               f'$Re_1 = {losses["re1"]:.0f}, ~~ Re_2 = {losses["re2"]:.0f}$' \
+               f' ({flow_regime(max(losses["re1"], losses["re2"]))})</td></tr>' \
+               f'<tr><td class="tg-tdqd">$\\frac{{1}}{{\\sqrt{{f}}}} = -2 \log_{{10}}\\left(\\frac{{k}}{{3.7 D_h}} + \\frac{{2.51}}{{Re \\sqrt{{f}}}}\\right)$ - ' \
+               f'$f_1 = {losses["f1"]:.4f}, ~~ f_2 = {losses["f2"]:.4f}$</td></tr>' \
+               f'<tr><td class="tg-tdqd">$h_f = \\frac{{L}}{{2}} \\left(\\frac{{f_1 U_1^2}}{{D_{{h,1}} 2 g}} + \\frac{{f_2 U_2^2}}{{D_{{h,2}} 2 g}}\\right) = {hf.rounded_latex(3)}$</td></tr>' \
+               f'</tbody></table><br />' \
                f'<table class="tg" width="100%" height="100%" margin-right="15%">' \
                f'<thead><tr><th class="tg-0gzz"><h1>Difference in Pressure</h1></th></tr></thead>' \
                f'<tbody><tr><td class="tg-tdqd">$\Delta E = \Delta h + \\frac{{\Delta p}}{{\\rho \cdot g}} + \\frac{{\Delta U^2}}{{2 \cdot g}}$</td></tr>' \
-               f'<tr><td class="tg-tdqd">$\Delta E = 0$ - energy conservation, because of frictionless flow</td></tr>' \
-               f'<tr><td class="tg-tdqd">$\\rightarrow 0 = (z_1 - z_2) + \\frac{{\Delta p}}{{\\rho \cdot g}} + \\frac{{(U_1^2 - U_2^2)}}{{2 \cdot g}}$</td></tr>' \
+               f'<tr><td class="tg-tdqd">$\Delta E = h_f$ - the energy lost to friction</td></tr>' \
                f'<tr><td class="tg-tdqd">$\\Rightarrow \\frac{{\Delta p}}{{\\rho \cdot g}} = ' \
                f'\\frac{{({u1.real()**2:.3f} - {u2.real()**2:.3f})}}{{2 \cdot g}} {dp.rmunit()}' \
-               f' + ({self.i1yParam.real():.3f} - {self.i2yParam.real():.3f}) {dp.rmunit()}$</td></tr>' \
-               f'<tr><td class="tg-tdqd">$\\frac{{\Delta p}}{{\\rho \cdot g}} = {(u1.real()**2 - u2.real()**2) / (2 * G_CONSTANT):.3f} + {self.i1yParam.real() - self.i2yParam.real():.3f} = {dp.rounded_latex(3)}$</td></tr>' \
-               f'</tbody></table>' \
-
+               f' + ({self.i1yParam.real():.3f} - {self.i2yParam.real():.3f}) {dp.rmunit()} - {losses["hf"]:.3f} {dp.rmunit()}$</td></tr>' \
+               f'<tr><td class="tg-tdqd">$\\frac{{\Delta p}}{{\\rho \cdot g}} = {(u1.real()**2 - u2.real()**2) / (2 * G_CONSTANT):.3f} + {self.i1yParam.real() - self.i2yParam.real():.3f} - {losses["hf"]:.3f} = {dp.rounded_latex(3)}$</td></tr>' \
+               f'</tbody></table>'
 
     def lines(self):
         """
@@ -532,6 +1481,7 @@ class AdvancedPipe(Model):
         self.canvas.scale(self.scale, self.scale)
         argsi1 = self.i1.display(self.margin_left / self.scale)
         argsi2 = self.i2.display(self.margin / self.scale)
+        self.update_geometry_key()
         #argsi1 = [arg / self.scale for arg in argsi1]
         #argsi2 = [arg / self.scale for arg in argsi2]
         #self.canvas.stroke_line(0, 0, self.canvas.width, 0)
@@ -542,54 +1492,17 @@ class AdvancedPipe(Model):
 
         connectors = self.direct_lines()
         #connectors = [[arg / self.scale for arg in connector] for connector in connectors]
-        self.canvas.begin_path()
-        self.canvas.move_to(connectors[0][0], connectors[0][1])
-        for connector in connectors:
-            self.canvas.line_to(connector[0], connector[1])
-            self.canvas.line_to(connector[2], connector[3])
-
-        gradient = self.canvas.create_linear_gradient(
-            connectors[0][0],
-            connectors[1][3],  # End position (x1, y1)
-            connectors[1][2],
-            connectors[0][1],  # Start position (x0, y0)
-            # List of color stops
-            [
-                (0, hexcode((225, 225, 225))),
-                #(0.2, hexcode((158, 144, 153))),
-                (1, hexcode((100, 94, 97))),
-            ],
-        )
+        outline = self.cached_style('outline', lambda: ipycanvas.Path2D(
+            "M {} {} L {} {} L {} {} L {} {} Z".format(*connectors[0], *connectors[1])))
 
-        if self.i1yParam.real() < self.i2yParam.real():
-            gradient = self.canvas.create_linear_gradient(
-            connectors[0][0],
-            connectors[0][3],  # End position (x1, y1)
-            connectors[1][2],
-            connectors[0][1],  # Start position (x0, y0)
-            # List of color stops
-            [
-                (0, hexcode((225, 225, 225))),
-                #(0.2, hexcode((158, 144, 153))),
-                (1, hexcode((100, 94, 97))),
-            ],
-            )
-        if self.i1yParam.real() > self.i2yParam.real():
-            gradient = self.canvas.create_linear_gradient(
-            connectors[1][2],
-            connectors[0][1],  # Start position (x0, y0)
-            connectors[0][0],
-            connectors[0][3],  # End position (x1, y1)
-            # List of color stops
-            [
-                (0, hexcode((225, 225, 225))),
-                #(0.2, hexcode((158, 144, 153))),
-                (1, hexcode((100, 94, 97))),
-            ],
-            )
+        # shade the pipe by the pressure head along its axis, high pressure is darker
+        profile = self.profile()
+        gradient = self.cached_style('gradient', lambda: self.canvas.create_linear_gradient(
+            connectors[0][0], connectors[0][1], connectors[0][2], connectors[0][1], profile['stops']),
+                                     version=tuple(profile['stops']))
 
         self.canvas.fill_style = gradient
-        self.canvas.fill()
+        self.canvas.fill(outline)
 
         for connector in connectors:
             self.canvas.stroke_line(*connector)
@@ -610,12 +1523,42 @@ class AdvancedPipe(Model):
             self.canvas.stroke_rect(*argsi2)
             self.canvas.fill_rect(*argsi2)
         self.draw_details()
+        self.draw_grade_lines(connectors[0][0], connectors[0][2], profile)
+        if self.tracer is not None:
+            self.tracer.sync(connectors, profile)
+        if self.regime_map is not None:
+            self.regime_map.sync()
         y_max = min(self.i1.y, self.i2.y)
         r_max = max(self.i1.ry, self.i2.ry)
         self.i1.describe(self.canvas, ["S₁"], 1, model=self, y=y_max - r_max / 2)
         self.i2.describe(self.canvas, ["S₂"], 1, model=self, y=y_max - r_max / 2)
         pass
 
+    def draw_grade_lines(self, x1, x2, profile):
+        """
+        Draws the energy line and the hydraulic grade line between the two ends, heads use the same vertical scale as
+        the z position of the ends
+
+        :param x1: the x-position of the first end
+        :param x2: the x-position of the second end
+        :param profile: the profile of the pipe, see profile()
+        :return: None
+        """
+        x = x1 + profile['s'] * (x2 - x1)
+        offset = self.i1yParam.widget.max + 75
+        self.canvas.stroke_style = hexcode((2, 115, 94))
+        self.canvas.stroke_lines(np.column_stack((x, offset - profile['hgl'])))
+        self.canvas.set_line_dash([4, 2])
+        self.canvas.stroke_style = hexcode((115, 23, 2))
+        self.canvas.stroke_lines(np.column_stack((x, offset - profile['energy'])))
+        self.canvas.set_line_dash([])
+        self.canvas.fill_style = hexcode((115, 23, 2))
+        self.canvas.fill_text("EL", x2 + 2, offset - profile['energy'][-1])
+        self.canvas.fill_style = hexcode((2, 115, 94))
+        self.canvas.fill_text("HGL", x2 + 2, offset - profile['hgl'][-1])
+        self.canvas.stroke_style = "black"
+        self.canvas.fill_style = "black"
+
     def draw_ellipse(self, x, y, rx, ry, fill_col="white", rot=0):
         """
         Draw an ellipse on the canvas
@@ -635,6 +1578,39 @@ class AdvancedPipe(Model):
         self.canvas.fill()
         # self.canvas.end_path()
 
+    def update_geometry_key(self):
+        """
+        Compares the drawn geometry of both ends with the last draw and drops the cached paths and gradients, if it
+        changed. Must be called after IntersectionForm::display() placed the ends
+
+        :return: None
+        """
+        key = (self.scale, self.margin_left, self.margin,
+               *((form.type, form.x, form.y, form.rx, form.ry) for form in (self.i1, self.i2)))
+        if key != self.geometry_key:
+            self.geometry_key = key
+            for version, style in self.style_cache.values():
+                style.close()
+            self.style_cache.clear()
+
+    def cached_style(self, key, factory, version=None):
+        """
+        Returns a Path2D or gradient of the current geometry, it is only created and sent to the client on first use
+        or when its version changed
+
+        :param key: the name of the object
+        :param factory: callable, which creates the object
+        :param version: everything the object depends on besides the geometry, e.g. the colour stops of a gradient
+                        [Default: None]
+        :return: the cached object
+        """
+        if key in self.style_cache and self.style_cache[key][0] == version:
+            return self.style_cache[key][1]
+        if key in self.style_cache:
+            self.style_cache[key][1].close()
+        self.style_cache[key] = (version, factory())
+        return self.style_cache[key][1]
+
     def dash_ellipse(self, x, y, rx, ry, fill_col="white", rot=0):
         """
         Draw an ellipse on the canvas with a dashed line
@@ -642,12 +1618,13 @@ class AdvancedPipe(Model):
 
         :return: None
         """
-        i = 0
-        while i <= 2:
-            self.canvas.begin_path()
-            self.canvas.ellipse(x, y, rx, ry, rot, i * pymath.pi, (i + 0.2) * pymath.pi)
-            i += 0.3
-            self.canvas.stroke()
+        # one dashed stroke instead of an arc per dash: dashes of 0.2 pi and gaps of 0.1 pi of the perimeter
+        perimeter = pymath.pi * (3 * (rx + ry) - pymath.sqrt((3 * rx + ry) * (rx + 3 * ry)))
+        self.canvas.set_line_dash([perimeter / 10, perimeter / 20])
+        self.canvas.begin_path()
+        self.canvas.ellipse(x, y, rx, ry, rot, 0, 2 * pymath.pi)
+        self.canvas.stroke()
+        self.canvas.set_line_dash([])
 
     def draw_details(self):
         """
@@ -766,12 +1743,78 @@ class AdvancedPipe(Model):
                 if p.should_update:
                     p.observe(func)
 
-    def get_drawing(self):
-        data = self.canvas.get_image_data()
-        dat_tex = DataTexture(data=data)
-        plane = PlaneGeometry()
-        planeMesh = Mesh(geometry=plane, material=MeshStandardMaterial(map=dat_tex), rotation=[pymath.pi, 0, 0, "XYZ"], position=[0, 0, -2])
-        return dat_tex
+    def dimensionless(self):
+        """
+        Evaluates the dimensionless numbers of the current state along the pipe from the cached profile, see
+        dimensionless_numbers() and profile()
+
+        :return: dict of numpy arrays
+        """
+        return dimensionless_numbers(resolution=self.resolution, profile=self.profile(), **self.operating_point())
+
+    def dimensionless_table(self, numbers=None):
+        """
+        Returns the dimensionless numbers at both ends and their range along the pipe as HTML table, the flow regimes
+        are coloured like the bands of the RegimeMap
+
+        :param numbers: the result of dimensionless() [Default: None, evaluated for the current state]
+        :return: HTML string
+        """
+        if numbers is None:
+            numbers = self.dimensionless()
+
+        def regime(i):
+            code = numbers['regime'][i]
+            return f'<span style="color:{hexcode(REGIME_COLORS[code])}">&#9632;</span> {REGIMES[code]}'
+
+        table = Table(["Dimensionless numbers", "Side 1", "Side 2", "Along the pipe"], 4)
+        table.add_rows([
+            [f'Reynolds number $Re = \\frac{{U \\cdot D_h}}{{\\nu}}$', f'${numbers["re"][0]:.0f}$',
+             f'${numbers["re"][-1]:.0f}$', f'$[{numbers["re"].min():.0f}, {numbers["re"].max():.0f}]$'],
+            [f'Flow regime', regime(0), regime(-1),
+             ", ".join(REGIMES[code] for code in np.unique(numbers['regime']))],
+            [f'Froude number $Fr = \\frac{{U}}{{\\sqrt{{g \\cdot D_h}}}}$', f'${numbers["fr"][0]:.3f}$',
+             f'${numbers["fr"][-1]:.3f}$', f'$[{numbers["fr"].min():.3f}, {numbers["fr"].max():.3f}]$'],
+            [f'Relative roughness $\\frac{{k}}{{D_h}}$', f'${numbers["relative_roughness"][0]:.2e}$',
+             f'${numbers["relative_roughness"][-1]:.2e}$', f''],
+            [f'Friction factor $f$', f'${numbers["f"][0]:.4f}$', f'${numbers["f"][-1]:.4f}$',
+             f'$[{numbers["f"].min():.4f}, {numbers["f"].max():.4f}]$'],
+        ])
+        return table.show()
+
+    def set_threejs_scene(self, scene, viewport_height=None):
+        """
+        Adds the 3D pipe to a pythreejs scene, which is seen through self.camera
+
+        :param scene: the pythreejs scene
+        :param viewport_height: the height of the renderer, used to choose the level of detail [px, Default: None, the
+                                height of self.detail]
+        :return: None
+        """
+        self.threejs_scene = scene
+        if viewport_height is not None:
+            self.detail.viewport_height = viewport_height
+        scene.add(self.rendering)
+        self.update_rendering()
+
+    def show_drawing(self, visible=True):
+        """
+        Shows or hides the 2D drawing as texture on a plane behind the 3D pipe. The texture is created once and follows
+        every change of the drawing, but the canvas only sends its image while the plane is shown
+
+        :param visible: whether the drawing should be shown [Default: True]
+        :return: None
+        """
+        if self.canvas is None or self.threejs_scene is None:
+            return
+        if self.drawing is None:
+            self.drawing = CanvasTexture(self.canvas)
+        if visible:
+            self.drawing.show(self.threejs_scene)
+            self.detail.add_fixed('drawing', 2)
+        else:
+            self.drawing.hide()
+            self.detail.remove('drawing')
 
     def dash_rect(self, x, y, sx, sy):
         """
@@ -789,6 +1832,273 @@ class AdvancedPipe(Model):
         c.set_line_dash([0, 0])
 
 
+class RegimeMap:
+    """
+    Regime map of an AdvancedPipe: the laminar, transitional and turbulent bands of a circular pipe over logarithmic
+    axes of discharge and diameter. The band image is computed as one grid per viscosity, cached and drawn on the lower
+    layer of a MultiCanvas. A change of the operating point only redraws the markers of both ends on the upper layer
+    and the table of dimensionless numbers next to the map, both are shown by self.dashboard
+    """
+
+    def __init__(self, model, canvas, q_range=(1e-7, 1e2), d_range=(1e-3, 10), margin=40, cache_size=16):
+        """
+        Initializes the map and attaches it to the model, which updates the markers whenever it is drawn
+
+        :param model: the AdvancedPipe to follow
+        :param canvas: MultiCanvas with at least two layers
+        :param q_range: the limits of the discharge axis [m^3/s, Default: (1e-7, 1e2)]
+        :param d_range: the limits of the diameter axis [m, Default: (1e-3, 10)]
+        :param margin: the margin for the axis labels [px, Default: 40]
+        :param cache_size: the maximum number of cached band images [Default: 16]
+        """
+        self.model = model
+        self.canvas = canvas
+        self.margin = margin
+        self.cache_size = cache_size
+        self.width = canvas.width - 2 * margin
+        self.height = canvas.height - 2 * margin
+        self.log_q = np.log10(q_range)
+        self.log_d = np.log10(d_range)
+        self.q = np.logspace(*self.log_q, self.width)
+        # the first image row is the top of the map, i.e. the largest diameter
+        self.d = np.logspace(*self.log_d, self.height)[::-1]
+        self.colors = np.array(REGIME_COLORS, dtype=np.uint8)
+        self.cache = {}
+        self.viscosity = None
+        self.table = widgets.HTMLMath(layout=widgets.Layout(width='100%'))
+        self.dashboard = widgets.HBox([canvas, self.table])
+
+        model.regime_map = self
+        if model.canvas is not None:
+            model.draw()
+
+    def image(self, viscosity):
+        """
+        Returns the RGB image of the regime bands for the given viscosity, it is computed on first use
+
+        :param viscosity: the kinematic viscosity [m^2/s]
+        :return: uint8 array of shape (height, width, 3)
+        """
+        if viscosity not in self.cache:
+            if len(self.cache) >= self.cache_size:
+                self.cache.pop(next(iter(self.cache)))
+            self.cache[viscosity] = np.take(self.colors, regime_map(self.q, self.d, viscosity), axis=0)
+        return self.cache[viscosity]
+
+    def to_pixels(self, q, d):
+        """
+        Transforms discharges and diameters to canvas pixels
+
+        :param q: the discharges [m^3/s]
+        :param d: the diameters [m]
+        :return: tuple of pixel coordinates (x, y)
+        """
+        x = self.margin + (np.log10(q) - self.log_q[0]) / (self.log_q[1] - self.log_q[0]) * self.width
+        y = self.margin + (self.log_d[1] - np.log10(d)) / (self.log_d[1] - self.log_d[0]) * self.height
+        return x, y
+
+    def draw_bands(self):
+        """
+        Draws the cached band image of the current viscosity with its axes on the lower layer
+
+        :return: None
+        """
+        layer = self.canvas[0]
+        with hold_canvas():
+            layer.clear()
+            layer.put_image_data(self.image(self.viscosity), self.margin, self.margin)
+            layer.stroke_style = 'black'
+            layer.stroke_rect(self.margin, self.margin, self.width, self.height)
+            layer.fill_style = 'black'
+            layer.font = '12px sans-serif'
+            for exponent in range(int(np.ceil(self.log_q[0])), int(np.floor(self.log_q[1])) + 1):
+                x, _ = self.to_pixels(10. ** exponent, 1)
+                layer.fill_text(f"1e{exponent}", x - 10, self.margin + self.height + 14)
+            for exponent in range(int(np.ceil(self.log_d[0])), int(np.floor(self.log_d[1])) + 1):
+                _, y = self.to_pixels(1, 10. ** exponent)
+                layer.fill_text(f"1e{exponent}", 2, y + 4)
+            layer.fill_text("Q [m^3/s]", self.margin + self.width - 50, self.margin + self.height + 30)
+            layer.fill_text("D [m]", 2, self.margin - 10)
+            for i, regime in enumerate(REGIMES):
+                layer.fill_style = hexcode(REGIME_COLORS[i])
+                layer.fill_rect(self.margin + 110 * i, 8, 12, 12)
+                layer.fill_style = 'black'
+                layer.fill_text(regime, self.margin + 110 * i + 16, 18)
+
+    def sync(self):
+        """
+        Redraws the bands if the viscosity changed, moves the markers to the current operating point and updates the
+        table of dimensionless numbers. Rectangular ends are placed at the diameter of the circular pipe with the same
+        Reynolds number, which is derived from the cached profile of the model
+
+        :return: None
+        """
+        viscosity = self.model.viscosityParam.real()
+        if viscosity != self.viscosity:
+            self.viscosity = viscosity
+            self.draw_bands()
+        numbers = self.model.dimensionless()
+        self.table.value = self.model.dimensionless_table(numbers)
+        q = max(self.model.q, 1e-12)
+        re = np.maximum(numbers['re'][[0, -1]], 1e-12)
+        d = 4 * q / (np.pi * viscosity * re)
+        x, y = self.to_pixels(np.full(2, q), d)
+        layer = self.canvas[1]
+        with hold_canvas():
+            layer.clear()
+            layer.fill_style = 'black'
+            layer.fill_styled_circles(x, y, 5, color=np.array([[100, 94, 97], [0, 0, 0]]))
+            layer.font = '12px sans-serif'
+            layer.fill_text("S₁", x[0] + 7, y[0] - 7)
+            layer.fill_text("S₂", x[1] + 7, y[1] - 7)
+
+
+class ParticleTracer:
+    """
+    Visualizes the flow through an AdvancedPipe with particles, which move with the local mean velocity U = Q / A(x),
+    so they speed up through contractions and slow down in expansions. All particle arrays are allocated once,
+    every frame is a fixed sequence of in-place numpy operations followed by one batched canvas call
+    """
+
+    def __init__(self, model, canvas, n=2000, speed=0.5, size=1.5, fps=30, seed=None):
+        """
+        Initializes the tracer and attaches it to the model, which updates the tracer's geometry whenever it is drawn
+
+        :param model: the AdvancedPipe to trace
+        :param canvas: the canvas to draw the particles on, usually a layer of a MultiCanvas on top of the pipe
+        :param n: the number of particles [Default: 2000]
+        :param speed: the fraction of the pipe length the fastest particles travel per second [Default: 0.5]
+        :param size: the size of the particles in pixels [Default: 1.5]
+        :param fps: the frames per second of the animation [Default: 30]
+        :param seed: the seed for the initial particle positions [Default: None]
+        """
+        self.model = model
+        self.canvas = canvas
+        self.n = n
+        self.speed = speed
+        self.size = size
+        self.fps = fps
+        self.running = False
+
+        rng = np.random.default_rng(seed)
+        self.s = rng.random(n)
+        self.t = rng.uniform(0.05, 0.95, n)
+        self.index = np.empty(n, dtype=np.intp)
+        self.work = np.empty(n)
+        self.velocity = np.empty(n)
+        self.points = np.empty((2, n))
+        self.x = self.points[0]
+        self.y = self.points[1]
+        self.velocity_table = np.zeros(1)
+        self.geometry = (0., 0., 0., 0., 0., 0.)
+        # the velocity table and the geometry are replaced on the main thread while the animation thread reads them
+        self.lock = threading.Lock()
+
+        model.tracer = self
+        if model.canvas is not None:
+            model.draw()
+
+    def sync(self, connectors, profile):
+        """
+        Updates the pipe outline and the velocity table after the geometry or the discharge changed. Both are built
+        anew and swapped in together, so a running frame keeps using the previous ones
+
+        :param connectors: the outline of the pipe, see AdvancedPipe::direct_lines()
+        :param profile: the profile of the pipe, see AdvancedPipe::profile()
+        :return: None
+        """
+        u = np.abs(profile['u'])
+        table = u * (self.speed / max(u.max(), 1e-12))
+        scale = self.model.scale
+        lower, upper = connectors
+        span = upper[3] - lower[1]
+        geometry = (lower[0] * scale, (lower[2] - lower[0]) * scale, lower[1] * scale,
+                    (lower[3] - lower[1]) * scale, span * scale, (upper[1] - lower[3] - span) * scale)
+        with self.lock:
+            self.velocity_table = table
+            self.geometry = geometry
+
+    def step(self, dt):
+        """
+        Advances all particles by dt seconds. Particles leaving the pipe re-enter at the first end
+
+        :param dt: the time step [s]
+        :return: None
+        """
+        with self.lock:
+            table = self.velocity_table
+        np.multiply(self.s, len(table) - 1, out=self.work)
+        np.copyto(self.index, self.work, casting='unsafe')
+        np.take(table, self.index, out=self.velocity, mode='clip')
+        self.velocity *= dt
+        self.s += self.velocity
+        np.mod(self.s, 1, out=self.s)
+
+    def positions(self):
+        """
+        Maps the particles into canvas coordinates, writing into the preallocated x and y arrays
+
+        :return: the x and y arrays
+        """
+        with self.lock:
+            x0, dx, y0, dy, span, dspan = self.geometry
+        np.multiply(self.s, dx, out=self.x)
+        self.x += x0
+        np.multiply(self.s, dspan, out=self.work)
+        self.work += span
+        self.work *= self.t
+        np.multiply(self.s, dy, out=self.y)
+        self.y += y0
+        self.y += self.work
+        return self.x, self.y
+
+    def draw(self):
+        """
+        Draws all particles with a single canvas call
+
+        :return: None
+        """
+        self.positions()
+        with hold_canvas():
+            self.canvas.clear()
+            self.canvas.fill_style = hexcode((2, 48, 89))
+            self.canvas.fill_rects(self.x, self.y, self.size)
+
+    def animate(self):
+        """
+        Steps and draws the particles until stop() is called. Runs in its own thread, see start()
+
+        :return: None
+        """
+        dt = 1 / self.fps
+        last = time.time()
+        while self.running:
+            now = time.time()
+            self.step(min(now - last, 5 * dt))
+            last = now
+            self.draw()
+            time.sleep(max(dt - (time.time() - now), 0))
+
+    def start(self):
+        """
+        Starts the animation thread
+
+        :return: None
+        """
+        if self.running:
+            return
+        self.running = True
+        threading.Thread(target=self.animate, daemon=True).start()
+
+    def stop(self):
+        """
+        Stops the animation thread
+
+        :return: None
+        """
+        self.running = False
+
+
 def get_lines(selected, i, margin=0, end=False):
     """
     Gets the lines of the selected Side
@@ -807,3 +2117,198 @@ def get_lines(selected, i, margin=0, end=False):
     px2 = margin - i.rx if end else margin + i.rx
 
     return [(px1, py1, px2, py1), (px1, py2, px2, py2)]
+
+
+class SeriesPipe(Model):
+    """
+    Concrete implementation of Model, representing a pipe made of N sections in series (contractions, expansions and
+    elevation changes). Calculation and drawing are vectorized over all sections
+    """
+
+    def __init__(self, sections, q=1., canvas=None, lengths=None, margin_left=50, margin_right=50, z=0.):
+        """
+        Initializes the series pipe
+
+        :param sections: list of IntersectionForm objects or a SectionArray, at least two sections
+        :param q: the initial discharge Q [m^3/s, Default: 1]
+        :param canvas: the canvas to draw on [Default: None]
+        :param lengths: the lengths of the N - 1 pipe segments between the sections [m, Default: 1 each]
+        :param margin_left: the margin to the left side of the canvas [Default: 50]
+        :param margin_right: the margin to the right side of the canvas [Default: 50]
+        :param z: the elevations of the sections, only used for a list of IntersectionForm objects, see
+                  SectionArray::from_forms() [m, Default: 0]
+        """
+        self.sections = sections if isinstance(sections, SectionArray) else SectionArray.from_forms(sections, z)
+        n = len(self.sections)
+        lengths = np.ones(n - 1) if lengths is None else np.asarray(lengths, dtype=float)
+        self.x = np.concatenate(([0.], np.cumsum(lengths)))
+        self.canvas = canvas
+        self.callback = None
+        self.margin_left = margin_left
+        self.margin_right = margin_right
+        self.loading = False
+
+        self.qParam = FloatChangeable(q, _min=0.01, _max=100, desc="Discharge $~~Q$", unit="m^3s^{-1}", step=0.01,
+                                      width='100px')
+        self.p1Param = FloatChangeable(0, _min=-50, _max=50, desc="Pressure head $~~p_1 / \\rho g$", unit="m",
+                                       width='100px')
+        self.selected = 0
+        self.sectionParam = IntChangeable(0, _min=0, _max=n - 1, desc="Section $~~i$", unit="~~", width='100px')
+        self.shapeGroup = DropDownGroup(['Circle', 'Rectangle'], ['Choose a circular section',
+                                                                  'Choose a rectangular section'])
+        self.shapeWidget = BoxHorizontal([widgets.HTML("Cross-sectional shape"), self.shapeGroup.display])
+        self.dParam = FloatChangeable(1, _min=0.1, _max=5, desc="Diameter $~~D_i$", unit="m", step=0.01,
+                                      width='100px')
+        self.wParam = FloatChangeable(1, _min=0.1, _max=5, desc="Width $~~W_i$", unit="m", step=0.01, width='100px')
+        self.hParam = FloatChangeable(1, _min=0.1, _max=5, desc="Height $~~H_i$", unit="m", step=0.01, width='100px')
+        self.zParam = FloatChangeable(0, _min=-25, _max=25, desc="Z Position $~~z_i$", unit="m", width='100px')
+        self.load_section()
+
+        self.params = [
+            ChangeableContainer([self.sectionParam, self.shapeWidget, self.dParam, self.wParam, self.hParam,
+                                 self.zParam]),
+            ChangeableContainer([self.qParam, self.p1Param])
+        ]
+
+    def load_section(self):
+        """
+        Shows the values of the selected section in the widgets
+
+        :return: None
+        """
+        i = self.selected
+        circle = self.sections.kind[i] == CIRCLE
+        self.loading = True
+        self.shapeGroup.widget.value = SHAPES[self.sections.kind[i]]
+        if circle:
+            self.dParam.widget.value = self.sections.d[i]
+        else:
+            self.wParam.widget.value = self.sections.w[i]
+            self.hParam.widget.value = self.sections.h[i]
+        self.zParam.widget.value = self.sections.z[i]
+        self.loading = False
+        self.dParam.set_active(circle)
+        self.wParam.set_active(not circle)
+        self.hParam.set_active(not circle)
+
+    def store_section(self):
+        """
+        Writes the widget values into the arrays of the selected section
+
+        :return: True, if the shape of the section changed, else False
+        """
+        i = self.selected
+        kind = SHAPES.index(self.shapeGroup.widget.value)
+        changed = kind != self.sections.kind[i]
+        self.sections.kind[i] = kind
+        if kind == CIRCLE:
+            self.sections.d[i] = self.dParam.widget.value
+        else:
+            self.sections.w[i] = self.wParam.widget.value
+            self.sections.h[i] = self.hParam.widget.value
+        self.sections.z[i] = self.zParam.widget.value
+        return changed
+
+    def update(self, args):
+        if self.loading:
+            return
+        if self.sectionParam.widget.value != self.selected:
+            self.selected = self.sectionParam.widget.value
+            self.load_section()
+            if self.callback is not None:
+                self.callback.update_input()
+        elif self.store_section():
+            self.load_section()
+            if self.callback is not None:
+                self.callback.update_input()
+        super().update(args)
+        self.draw()
+
+    def evaluate(self, q=None, p1=None):
+        """
+        Evaluates all sections at once, see evaluate_series()
+
+        :param q: the discharge [Default: None, the current value of the slider]
+        :param p1: the inlet pressure head [Default: None, the current value of the slider]
+        :return: dict of numpy arrays, see evaluate_series()
+        """
+        return evaluate_series(self.sections, self.qParam.real() if q is None else q,
+                               self.p1Param.real() if p1 is None else p1)
+
+    def calculate(self):
+        r = self.evaluate()
+        i = self.selected
+        table = Table(["Quantity", "Value"], 2)
+        table.add_rows([
+            [f'Discharge $Q$', f'${Variable(self.qParam.real(), unit="m^3s^{-1}").rounded_latex(3)}$'],
+            [f'Energy head $z + \\frac{{p}}{{\\rho g}} + \\frac{{U^2}}{{2g}}$',
+             f'${Variable(r["energy"][0], unit="m").rounded_latex(3)}$'],
+            [f'Velocity $U_{{min}}, U_{{max}}$',
+             f'${r["u"].min():.3f}, {r["u"].max():.3f} ~~ {Variable(0, unit="ms^{-1}").rmunit()}$'],
+            [f'Pressure head $\\frac{{p_{{min}}}}{{\\rho g}}, \\frac{{p_{{max}}}}{{\\rho g}}$',
+             f'${r["p"].min():.3f}, {r["p"].max():.3f} ~~ {Variable(0, unit="m").rmunit()}$'],
+            [f'Section {i}: Area $A_{{{i}}}$', f'${Variable(r["a"][i], unit="m^2").rounded_latex(3)}$'],
+            [f'Section {i}: Velocity $U_{{{i}}}$', f'${Variable(r["u"][i], unit="ms^{-1}").rounded_latex(3)}$'],
+            [f'Section {i}: Pressure head $\\frac{{p_{{{i}}}}}{{\\rho g}}$',
+             f'${Variable(r["p"][i], unit="m").rounded_latex(3)}$'],
+        ])
+        return table.show()
+
+    def draw(self, *args):
+        """
+        Draws the profile of the whole pipe: the segments coloured by velocity, the outline, the section lines, the
+        hydraulic grade line and the energy line. Every element is drawn with one vectorized canvas call
+
+        :return: None
+        """
+        if self.canvas is None:
+            return
+        r = self.evaluate()
+        s = self.sections
+        half = np.where(s.circles(), s.d, s.h) / 2
+        top = s.z + half
+        bottom = s.z - half
+        levels = np.concatenate((top, bottom, r['hgl'], r['energy']))
+        y_min, y_max = levels.min(), levels.max()
+        if y_max == y_min:
+            y_max += 1
+        width = self.canvas.width - self.margin_left - self.margin_right
+        height = self.canvas.height - 60
+        px = self.margin_left + (self.x - self.x[0]) / (self.x[-1] - self.x[0]) * width
+
+        def py(v):
+            return 30 + (y_max - v) / (y_max - y_min) * height
+
+        u_mid = (r['u'][:-1] + r['u'][1:]) / 2
+        t = (u_mid - r['u'].min()) / max(r['u'].max() - r['u'].min(), 1e-12)
+        slow, fast = np.array([194, 229, 242]), np.array([7, 120, 217])
+        colors = (slow + t[:, np.newaxis] * (fast - slow)).astype(int)
+        quads = np.stack((np.column_stack((px[:-1], py(top[:-1]))), np.column_stack((px[1:], py(top[1:]))),
+                          np.column_stack((px[1:], py(bottom[1:]))), np.column_stack((px[:-1], py(bottom[:-1])))),
+                         axis=1)
+        ticks = np.stack((np.column_stack((px, py(top))), np.column_stack((px, py(bottom)))), axis=1)
+
+        with hold_canvas():
+            self.canvas.clear()
+            self.canvas.fill_styled_polygons(quads, colors)
+            self.canvas.stroke_style = 'black'
+            self.canvas.line_width = 2
+            self.canvas.stroke_lines(np.column_stack((px, py(top))))
+            self.canvas.stroke_lines(np.column_stack((px, py(bottom))))
+            self.canvas.line_width = 0.5
+            self.canvas.stroke_line_segments(ticks)
+            self.canvas.line_width = 1.5
+            self.canvas.stroke_style = hexcode((2, 115, 94))
+            self.canvas.stroke_lines(np.column_stack((px, py(r['hgl']))))
+            self.canvas.set_line_dash([10, 5])
+            self.canvas.stroke_style = hexcode((115, 23, 2))
+            self.canvas.stroke_lines(np.column_stack((px, py(r['energy']))))
+            self.canvas.set_line_dash([])
+            self.canvas.stroke_style = 'red'
+            self.canvas.stroke_line(px[self.selected], py(top[self.selected]) - 10, px[self.selected],
+                                    py(bottom[self.selected]) + 10)
+            self.canvas.fill_style = 'black'
+            self.canvas.font = '12px sans-serif'
+            self.canvas.fill_text("Energy line", px[-1] + 5, py(r['energy'][-1]))
+            self.canvas.fill_text("Hydraulic grade line", px[-1] + 5, py(r['hgl'][-1]) + 12)
+            self.canvas.line_width = 1
@@ -0,0 +1,316 @@
+import numpy as np
+from scipy import sparse
+from scipy.sparse import linalg as splinalg
+
+from model import *
+
+
+def pipe_resistance(sections, lengths, friction=0.02):
+    """
+    Calculates the resistance r of every pipe, so that the head loss is h_f = r * Q * |Q|.
+    Uses the Darcy-Weisbach formula with a constant friction factor and the hydraulic diameter of the section:
+    h_f = f * L / D_h * U^2 / (2 * g)
+
+    :param sections: SectionArray of the pipe cross-sections
+    :param lengths: the lengths of the pipes [m]
+    :param friction: the Darcy friction factor f, scalar or one per pipe [Default: 0.02]
+    :return: numpy array of resistances [s^2/m^5]
+    """
+    a = sections.area()
+    return friction * np.asarray(lengths, dtype=float) / (sections.hydraulic_diameter() * 2 * G_CONSTANT * a ** 2)
+
+
+def solve_network(start, end, resistance, demand, head, q0=None, h0=None, tol=1e-8, max_iter=50, q_min=1e-6):
+    """
+    Solves the flows and heads of a (looped) pipe network with the global gradient algorithm (Todini & Pilati).
+    Every iteration linearizes the head losses around the current flows and solves one sparse symmetric system for the
+    heads of all junctions, so the cost grows roughly linearly with the number of pipes.
+
+    :param start: index of the start node of every pipe (positive flow runs from start to end)
+    :param end: index of the end node of every pipe
+    :param resistance: the resistance r of every pipe, see pipe_resistance(), or a function of the flows returning it,
+                       which is then re-evaluated every iteration (e.g. for Colebrook friction factors)
+    :param demand: the demand of every node [m^3/s], positive when water leaves the network. Ignored for fixed nodes
+    :param head: the fixed head of every node [m], nan for junctions (nodes with unknown head)
+    :param q0: the initial flows, e.g. the previous solution [Default: None, flows of 1 m/s in a 1 m^2 pipe]
+    :param h0: the initial junction heads, used only to report the heads when no iteration is needed [Default: None]
+    :param tol: the convergence tolerance on the largest flow change relative to the largest flow [Default: 1e-8]
+    :param max_iter: the maximum number of Newton iterations [Default: 50]
+    :param q_min: the flow below which the linearized resistance is held constant, avoids a singular system at Q = 0
+    :return: tuple of the flows of all pipes, the heads of all nodes and the number of iterations
+    """
+    start = np.asarray(start)
+    end = np.asarray(end)
+    variable = callable(resistance)
+    r = None if variable else np.asarray(resistance, dtype=float)
+    head = np.asarray(head, dtype=float)
+    n_pipes, n_nodes = len(start), len(head)
+    fixed = ~np.isnan(head)
+    junctions = np.flatnonzero(~fixed)
+    column = np.full(n_nodes, -1)
+    column[junctions] = np.arange(len(junctions))
+
+    # incidence matrix: -1 at the start node, +1 at the end node of every pipe
+    rows = np.concatenate((np.arange(n_pipes), np.arange(n_pipes)))
+    nodes = np.concatenate((start, end))
+    signs = np.concatenate((-np.ones(n_pipes), np.ones(n_pipes)))
+    free = ~fixed[nodes]
+    a12 = sparse.csr_matrix((signs[free], (rows[free], column[nodes[free]])), shape=(n_pipes, len(junctions)))
+    a21 = a12.T.tocsr()
+    # head difference over every pipe caused by the fixed nodes
+    fixed_head = np.zeros(n_pipes)
+    np.add.at(fixed_head, rows[~free], signs[~free] * head[nodes[~free]])
+    d = np.asarray(demand, dtype=float)[junctions]
+
+    q = np.ones(n_pipes) if q0 is None else np.array(q0, dtype=float)
+    h = np.zeros(len(junctions)) if h0 is None else np.asarray(h0, dtype=float)[junctions]
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        if variable:
+            r = resistance(q)
+        loss = r * q * np.abs(q)
+        slope = 2 * r * np.maximum(np.abs(q), q_min)
+        inverse = sparse.diags(1 / slope)
+        system = (a21 @ inverse @ a12).tocsc()
+        rhs = a21 @ q - d - a21 @ ((loss + fixed_head) / slope)
+        h = splinalg.spsolve(system, rhs) if len(junctions) else h
+        dq = (loss + a12 @ h + fixed_head) / slope
+        q = q - dq
+        if np.abs(dq).max(initial=0) <= tol * max(np.abs(q).max(initial=0), 1e-12):
+            break
+
+    heads = head.copy()
+    heads[junctions] = h
+    return q, heads, iterations
+
+
+class PipeNetwork(Model):
+    """
+    Concrete implementation of Model, representing a network of pipes between junctions and reservoirs.
+    Pipes can have circular or rectangular cross-sections, junctions can have demands, reservoirs have a fixed head
+    """
+
+    def __init__(self, start, end, sections, lengths, x, y, z=0., demand=0., head=None, friction=0.02,
+                 roughness=None, viscosity=WATER_VISCOSITY, canvas=None, margin=30):
+        """
+        Initializes the network
+
+        :param start: index of the start node of every pipe
+        :param end: index of the end node of every pipe
+        :param sections: SectionArray or list of IntersectionForm objects, one cross-section per pipe
+        :param lengths: the lengths of the pipes [m]
+        :param x: the horizontal position of every node, used for drawing [m]
+        :param y: the vertical position of every node in the plan view, used for drawing [m]
+        :param z: the elevation of every node [m, Default: 0]
+        :param demand: the demand of every node [m^3/s, Default: 0]
+        :param head: the fixed head of every node, nan for junctions [m, Default: None, the first node is a reservoir
+                     at 50 m]
+        :param friction: the Darcy friction factor of all pipes [Default: 0.02]
+        :param roughness: the absolute roughness of the pipe walls. If given, the friction factor of every pipe follows
+                          from the Colebrook equation instead of the friction factor slider [m, Default: None]
+        :param viscosity: the kinematic viscosity, only used with a roughness [m^2/s, Default: water at 20 degrees]
+        :param canvas: the canvas to draw on [Default: None]
+        :param margin: the margin around the network on the canvas [Default: 30]
+        """
+        self.start = np.asarray(start)
+        self.end = np.asarray(end)
+        self.sections = sections if isinstance(sections, SectionArray) else SectionArray.from_forms(sections)
+        self.lengths = np.asarray(lengths, dtype=float)
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        n = len(self.x)
+        self.z = np.broadcast_to(np.asarray(z, dtype=float), n).copy()
+        self.demand = np.broadcast_to(np.asarray(demand, dtype=float), n).copy()
+        if head is None:
+            head = np.full(n, np.nan)
+            head[0] = 50
+        self.head = np.asarray(head, dtype=float).copy()
+        self.reservoirs = np.flatnonzero(~np.isnan(self.head))
+        self.roughness = roughness
+        self.viscosity = viscosity
+        self.canvas = canvas
+        self.callback = None
+        self.margin = margin
+        self.loading = False
+        self.q = None
+        self.h = None
+        self.iterations = 0
+
+        self.demandParam = FloatChangeable(1, _min=0, _max=5, desc="Demand factor", unit="~~", step=0.01,
+                                           width='100px')
+        self.frictionParam = FloatChangeable(friction, _min=0.005, _max=0.1, desc="Friction factor $~~f$",
+                                             unit="~~", step=0.001, width='100px')
+        self.frictionParam.set_active(roughness is None)
+        self.headParam = FloatChangeable(self.head[self.reservoirs[0]], _min=0, _max=200,
+                                         desc="Reservoir head $~~H_R$", unit="m", width='100px')
+        self.selected = 0
+        self.pipeParam = IntChangeable(0, _min=0, _max=len(self.start) - 1, desc="Pipe $~~i$", unit="~~",
+                                       width='100px')
+        self.dParam = FloatChangeable(1, _min=0.05, _max=5, desc="Diameter $~~D_i$", unit="m", step=0.01,
+                                      width='100px')
+        self.wParam = FloatChangeable(1, _min=0.05, _max=5, desc="Width $~~W_i$", unit="m", step=0.01,
+                                      width='100px')
+        self.hParam = FloatChangeable(1, _min=0.05, _max=5, desc="Height $~~H_i$", unit="m", step=0.01,
+                                      width='100px')
+        self.load_pipe()
+
+        self.params = [
+            ChangeableContainer([self.pipeParam, self.dParam, self.wParam, self.hParam]),
+            ChangeableContainer([self.demandParam, self.frictionParam, self.headParam])
+        ]
+        self.solve()
+
+    @classmethod
+    def grid(cls, nx, ny, spacing=100., diameter=0.3, demand=1e-3, head=60., **kwargs):
+        """
+        Creates a rectangular, looped grid network of nx * ny junctions fed by one reservoir in a corner
+
+        :param nx: the number of junctions in x direction
+        :param ny: the number of junctions in y direction
+        :param spacing: the length of every pipe [m, Default: 100]
+        :param diameter: the diameter of every pipe [m, Default: 0.3]
+        :param demand: the demand of every junction [m^3/s, Default: 1e-3]
+        :param head: the head of the reservoir [m, Default: 60]
+        :return: the PipeNetwork
+        """
+        index = np.arange(nx * ny).reshape(ny, nx)
+        start = np.concatenate((index[:, :-1].ravel(), index[:-1, :].ravel()))
+        end = np.concatenate((index[:, 1:].ravel(), index[1:, :].ravel()))
+        # the reservoir is the last node, connected to the first junction
+        start = np.append(start, nx * ny)
+        end = np.append(end, 0)
+        x = np.append(np.tile(np.arange(nx), ny), -1) * spacing
+        y = np.append(np.repeat(np.arange(ny), nx), -1) * spacing
+        heads = np.full(nx * ny + 1, np.nan)
+        heads[-1] = head
+        demands = np.full(nx * ny + 1, demand)
+        demands[-1] = 0
+        n = len(start)
+        sections = SectionArray(np.full(n, CIRCLE), d=np.full(n, diameter))
+        return cls(start, end, sections, np.full(n, spacing), x, y, demand=demands, head=heads, **kwargs)
+
+    def load_pipe(self):
+        """
+        Shows the values of the selected pipe in the widgets
+
+        :return: None
+        """
+        i = self.selected
+        circle = self.sections.kind[i] == CIRCLE
+        self.loading = True
+        if circle:
+            self.dParam.widget.value = self.sections.d[i]
+        else:
+            self.wParam.widget.value = self.sections.w[i]
+            self.hParam.widget.value = self.sections.h[i]
+        self.loading = False
+        self.dParam.set_active(circle)
+        self.wParam.set_active(not circle)
+        self.hParam.set_active(not circle)
+
+    def store_pipe(self):
+        """
+        Writes the widget values into the arrays of the selected pipe
+
+        :return: None
+        """
+        i = self.selected
+        if self.sections.kind[i] == CIRCLE:
+            self.sections.d[i] = self.dParam.widget.value
+        else:
+            self.sections.w[i] = self.wParam.widget.value
+            self.sections.h[i] = self.hParam.widget.value
+
+    def solve(self):
+        """
+        Solves the network, starting from the previous solution if there is one
+
+        :return: None
+        """
+        self.head[self.reservoirs[0]] = self.headParam.real()
+        if self.roughness is None:
+            r = pipe_resistance(self.sections, self.lengths, self.frictionParam.real())
+        else:
+            a = self.sections.area()
+            dh = self.sections.hydraulic_diameter()
+
+            def r(q):
+                f = friction_factor(reynolds_number(q / a, dh, self.viscosity), self.roughness / dh)
+                return pipe_resistance(self.sections, self.lengths, f)
+        self.q, self.h, self.iterations = solve_network(self.start, self.end, r,
+                                                        self.demand * self.demandParam.real(), self.head,
+                                                        q0=self.q, h0=self.h)
+
+    def update(self, args):
+        if self.loading:
+            return
+        if self.pipeParam.widget.value != self.selected:
+            self.selected = self.pipeParam.widget.value
+            self.load_pipe()
+            if self.callback is not None:
+                self.callback.update_input()
+        else:
+            self.store_pipe()
+        self.solve()
+        super().update(args)
+        self.draw()
+
+    def calculate(self):
+        i = self.selected
+        u = self.q / self.sections.area()
+        pressure = self.h - self.z
+        junctions = np.isnan(self.head)
+        table = Table(["Quantity", "Value"], 2)
+        table.add_rows([
+            [f'Pipes, junctions', f'${len(self.start)}, {junctions.sum()}$'],
+            [f'Newton iterations', f'${self.iterations}$'],
+            [f'Total demand', f'${Variable((self.demand * self.demandParam.real())[junctions].sum(), unit="m^3s^{-1}").rounded_latex(4)}$'],
+            [f'Pressure head $\\frac{{p_{{min}}}}{{\\rho g}}, \\frac{{p_{{max}}}}{{\\rho g}}$',
+             f'${pressure[junctions].min():.3f}, {pressure[junctions].max():.3f} ~~ {Variable(0, unit="m").rmunit()}$'],
+            [f'Pipe {i}: Discharge $Q_{{{i}}}$', f'${Variable(self.q[i], unit="m^3s^{-1}").rounded_latex(4)}$'],
+            [f'Pipe {i}: Velocity $U_{{{i}}}$', f'${Variable(u[i], unit="ms^{-1}").rounded_latex(3)}$'],
+            [f'Pipe {i}: Head loss $h_{{f,{i}}}$',
+             f'${Variable(self.h[self.start[i]] - self.h[self.end[i]], unit="m").rounded_latex(3)}$'],
+        ])
+        return table.show()
+
+    def draw(self, *args):
+        """
+        Draws the plan view of the network: pipes coloured by velocity, nodes coloured by pressure head and the
+        reservoirs as squares. Every element is drawn with one vectorized canvas call
+
+        :return: None
+        """
+        if self.canvas is None or self.q is None:
+            return
+        width = self.canvas.width - 2 * self.margin
+        height = self.canvas.height - 2 * self.margin
+        span = max(np.ptp(self.x), np.ptp(self.y), 1e-12)
+        scale = min(width, height) / span
+        px = self.margin + (self.x - self.x.min()) * scale
+        py = self.canvas.height - self.margin - (self.y - self.y.min()) * scale
+
+        u = np.abs(self.q) / self.sections.area()
+        t = u / max(u.max(), 1e-12)
+        slow, fast = np.array([194, 229, 242]), np.array([7, 120, 217])
+        pipe_colors = (slow + t[:, np.newaxis] * (fast - slow)).astype(int)
+        segments = np.stack((np.column_stack((px[self.start], py[self.start])),
+                             np.column_stack((px[self.end], py[self.end]))), axis=1)
+
+        pressure = self.h - self.z
+        t = (pressure - pressure.min()) / max(np.ptp(pressure), 1e-12)
+        low, high = np.array([217, 50, 7]), np.array([2, 115, 94])
+        node_colors = (low + t[:, np.newaxis] * (high - low)).astype(int)
+        junctions = np.isnan(self.head)
+
+        with hold_canvas():
+            self.canvas.clear()
+            self.canvas.line_width = 3
+            self.canvas.stroke_styled_line_segments(segments, pipe_colors)
+            self.canvas.fill_styled_circles(px[junctions], py[junctions], 4, node_colors[junctions])
+            self.canvas.fill_style = hexcode((7, 178, 217))
+            self.canvas.fill_rects(px[~junctions] - 8, py[~junctions] - 8, 16, 16)
+            self.canvas.stroke_style = 'red'
+            self.canvas.line_width = 5
+            self.canvas.stroke_line(*segments[self.selected].ravel())
+            self.canvas.line_width = 1
@@ -0,0 +1,340 @@
+import numpy as np
+
+from model import *
+
+ARRANGEMENTS = ['Single', 'Parallel', 'Series']
+
+
+class PumpCurve:
+    """
+    Head curve H0(Q) of a single pump at its nominal speed, given either as polynomial coefficients or as a table of
+    measured points. Other speeds and several identical pumps are derived with the affinity laws, so that
+    H(Q, s) = series * s^2 * H0(Q / (parallel * s)) for the relative speed s = n / n0
+    """
+
+    def __init__(self, coefficients=None, q_points=None, h_points=None):
+        """
+        Initializes the curve. Either the coefficients or the table have to be given
+
+        :param coefficients: the polynomial coefficients in increasing order, H0(Q) = c0 + c1 * Q + c2 * Q^2 + ...
+                             [Default: None]
+        :param q_points: the increasing discharges of the table [m^3/s, Default: None]
+        :param h_points: the heads of the table [m, Default: None]
+        """
+        if coefficients is None and q_points is None:
+            raise ValueError("Either coefficients or q_points and h_points are required")
+        self.coefficients = None if coefficients is None else np.asarray(coefficients, dtype=float)
+        self.q_points = None if q_points is None else np.asarray(q_points, dtype=float)
+        self.h_points = None if h_points is None else np.asarray(h_points, dtype=float)
+        self.q_max = self.zero_head_flow()
+
+    @classmethod
+    def from_points(cls, shutoff, q_design, h_design):
+        """
+        Creates the parabolic curve H0(Q) = H_0 - k * Q^2 through the shutoff head and a design point
+
+        :param shutoff: the head at Q = 0 [m]
+        :param q_design: the discharge of the design point [m^3/s]
+        :param h_design: the head of the design point [m]
+        :return: PumpCurve object
+        """
+        return cls([shutoff, 0., (h_design - shutoff) / q_design ** 2])
+
+    def base_head(self, q):
+        """
+        Evaluates the curve at nominal speed. A table is interpolated linearly and extrapolated with its last segments
+
+        :param q: the discharge of a single pump (scalar or array) [m^3/s]
+        :return: the head [m]
+        """
+        q = np.asarray(q, dtype=float)
+        if self.coefficients is not None:
+            return np.polynomial.polynomial.polyval(q, self.coefficients)
+        qp, hp = self.q_points, self.h_points
+        h = np.interp(q, qp, hp)
+        low = q < qp[0]
+        high = q > qp[-1]
+        h = np.where(low, hp[0] + (q - qp[0]) * (hp[1] - hp[0]) / (qp[1] - qp[0]), h)
+        return np.where(high, hp[-1] + (q - qp[-1]) * (hp[-1] - hp[-2]) / (qp[-1] - qp[-2]), h)
+
+    def zero_head_flow(self):
+        """
+        Finds the smallest positive discharge, at which the curve at nominal speed has no head left
+
+        :return: the discharge [m^3/s]
+        """
+        if self.coefficients is not None:
+            roots = np.roots(self.coefficients[::-1]) if len(self.coefficients) > 1 else np.array([])
+            roots = roots[(abs(roots.imag) < 1e-12) & (roots.real > 0)].real
+            if len(roots) == 0:
+                raise ValueError("The pump curve never reaches zero head")
+            return roots.min()
+        q = np.linspace(0, 2 * self.q_points[-1], 1025)
+        h = self.base_head(q)
+        below = np.flatnonzero(h <= 0)
+        if len(below) == 0 or below[0] == 0:
+            raise ValueError("The pump curve never reaches zero head")
+        i = below[0]
+        return q[i - 1] + h[i - 1] / (h[i - 1] - h[i]) * (q[i] - q[i - 1])
+
+    def head(self, q, speed=1., parallel=1, series=1):
+        """
+        Evaluates the curve with the affinity laws. All params may be arrays, which are broadcast against each other,
+        e.g. q[None, :] and speed[:, None] evaluate the whole family of curves in one call
+
+        :param q: the total discharge [m^3/s]
+        :param speed: the relative speed n / n0 [Default: 1]
+        :param parallel: the number of pumps in parallel [Default: 1]
+        :param series: the number of pumps in series [Default: 1]
+        :return: the total head [m]
+        """
+        speed = np.asarray(speed, dtype=float)
+        return series * speed ** 2 * self.base_head(np.asarray(q, dtype=float) / (parallel * speed))
+
+    def max_flow(self, speed=1., parallel=1):
+        """
+        Returns the discharge of zero head with the affinity laws
+
+        :param speed: the relative speed n / n0 (scalar or array) [Default: 1]
+        :param parallel: the number of pumps in parallel [Default: 1]
+        :return: the discharge [m^3/s]
+        """
+        return parallel * np.asarray(speed, dtype=float) * self.q_max
+
+
+def system_head(q, **params):
+    """
+    Returns the head the pump has to deliver for the discharge q through the pipe, if the pressure at both ends is the
+    same: the static lift, the change of the velocity head and the friction losses
+
+    :param q: the discharge (scalar or array) [m^3/s]
+    :param params: keyword arguments of evaluate_pipe() except q
+    :return: the system head [m]
+    """
+    return -evaluate_pipe(q, **params)['dp']
+
+
+def operating_points(pump, speed=1., parallel=1, series=1, tol=1e-10, max_iter=100, **params):
+    """
+    Finds the intersections of the pump curve and the system curve for whole arrays of speeds at once. Each root is
+    bracketed in [0, Q_max(s)], where the pump has no head left, and refined with the Illinois variant of regula falsi.
+    All brackets are updated together with masked array operations, members stop as soon as their bracket is tight
+
+    :param pump: PumpCurve object
+    :param speed: the relative speeds (scalar or array) [Default: 1]
+    :param parallel: the number of pumps in parallel (scalar or array) [Default: 1]
+    :param series: the number of pumps in series (scalar or array) [Default: 1]
+    :param tol: the relative tolerance of the discharge [Default: 1e-10]
+    :param max_iter: the maximum number of iterations [Default: 100]
+    :param params: keyword arguments of evaluate_pipe() except q, scalars only
+    :return: dict of numpy arrays with the discharges 'q', heads 'h', whether the pump delivers at all 'feasible' and
+             whether the bracket converged 'converged', and the number of iterations 'iterations'
+    """
+    speed, parallel, series = np.broadcast_arrays(np.asarray(speed, dtype=float), parallel, series)
+    speed = speed.ravel()
+    parallel = parallel.ravel()
+    series = series.ravel()
+
+    def residual(q, index=slice(None)):
+        return pump.head(q, speed[index], parallel[index], series[index]) - system_head(q, **params)
+
+    lo = np.zeros(speed.shape)
+    hi = pump.max_flow(speed, parallel)
+    r_lo = residual(lo)
+    r_hi = residual(hi)
+    # a falling static head may still drive flow at zero pump head, widen those brackets
+    for _ in range(60):
+        open_ = r_hi > 0
+        if not open_.any():
+            break
+        hi[open_] *= 2
+        r_hi[open_] = residual(hi[open_], open_)
+    feasible = (r_lo > 0) & (r_hi <= 0) & (speed > 0)
+    active = feasible.copy()
+    side = np.zeros(speed.shape, dtype=np.int8)
+    q = np.zeros(speed.shape)
+    iterations = 0
+    while active.any() and iterations < max_iter:
+        iterations += 1
+        i = np.flatnonzero(active)
+        qi = (lo[i] * r_hi[i] - hi[i] * r_lo[i]) / (r_hi[i] - r_lo[i])
+        ri = residual(qi, i)
+        q[i] = qi
+        right = ri < 0
+        # Illinois: halve the residual of the end that was kept twice in a row
+        keep_lo = right & (side[i] == 1)
+        keep_hi = ~right & (side[i] == -1)
+        r_lo[i[keep_lo]] /= 2
+        r_hi[i[keep_hi]] /= 2
+        hi[i[right]] = qi[right]
+        r_hi[i[right]] = ri[right]
+        lo[i[~right]] = qi[~right]
+        r_lo[i[~right]] = ri[~right]
+        side[i] = np.where(right, 1, -1)
+        done = (hi[i] - lo[i] <= tol * np.maximum(hi[i], 1e-12)) | (ri == 0)
+        active[i[done]] = False
+    h = np.where(feasible, system_head(q, **params), np.nan)
+    return {'q': np.where(feasible, q, 0.), 'h': h, 'feasible': feasible, 'converged': feasible & ~active,
+            'iterations': iterations}
+
+
+class PumpSystem(Model):
+    """
+    Concrete implementation of Model, representing one or several identical pumps, which lift water through a pipe
+    between the IntersectionForm ends. The operating point is the intersection of the pump curve and the system curve,
+    the locus of the operating points over the whole speed range is solved in one vectorized call and cached until the
+    pipe or the arrangement changes, so that moving the speed slider only redraws the data layer of the plot
+    """
+
+    def __init__(self, i1: IntersectionForm, i2: IntersectionForm, pump: PumpCurve = None, plot=None, resolution=200,
+                 speeds=None):
+        """
+        Initializes the model
+
+        :param i1: the end at the suction side
+        :param i2: the end at the delivery side
+        :param pump: the curve of a single pump [Default: None, a parabola with 40 m shutoff head and 30 m at 1 m^3/s]
+        :param plot: the CanvasPlot to draw the curves on [Default: None, a new one is created]
+        :param resolution: the number of points of every curve [Default: 200]
+        :param speeds: the relative speeds of the operating point locus [Default: None, 131 speeds from 0.2 to 1.5]
+        """
+        self.i1 = i1
+        self.i2 = i2
+        self.pump = pump if pump is not None else PumpCurve.from_points(40, 1, 30)
+        self.callback = None
+        self.resolution = resolution
+        self.speeds = np.linspace(0.2, 1.5, 131) if speeds is None else np.asarray(speeds, dtype=float)
+        self.locus = None
+        self.locus_key = None
+
+        self.speedParam = FloatChangeable(1, _min=self.speeds[0], _max=self.speeds[-1], desc="Relative speed $~~n/n_0$",
+                                          unit="~~", step=0.01, width='100px')
+        self.arrangementGroup = DropDownGroup(ARRANGEMENTS, ['A single pump', 'Identical pumps in parallel',
+                                                             'Identical pumps in series'])
+        self.arrangementWidget = BoxHorizontal([widgets.HTML(f"Arrangement"), self.arrangementGroup.display])
+        self.countParam = IntChangeable(2, _min=1, _max=6, desc="Pumps $~~N$", unit="~~", width='100px')
+        self.countParam.set_active(False)
+        self.liftParam = FloatChangeable(10, _min=-20, _max=60, desc="Static lift $~~z_2 - z_1$", unit="m",
+                                         width='100px')
+        self.lengthParam = FloatChangeable(200, _min=1, _max=5000, desc="Length $~~L$", unit="m", step=1,
+                                           width='100px')
+        self.roughnessParam = FloatChangeable(0.05, base=-3, _min=0, _max=5, desc="Roughness $~~k$", unit="mm",
+                                              step=0.01, width='100px')
+        self.params = [
+            ChangeableContainer([self.speedParam, self.arrangementWidget, self.countParam]),
+            ChangeableContainer([self.liftParam, self.lengthParam, self.roughnessParam])
+        ]
+
+        self.plot = plot if plot is not None else CanvasPlot([0, 1], [0, 1], width=6, height=4,
+                                                            title="Pump and system curve", xlabel="Q [m^3/s]",
+                                                            ylabel="H [m]")
+        self.pumpCurve = self.plot.ax.add(CanvasCurve([0], [0], COLOR_CYCLE[2]))
+        self.locusCurve = self.plot.ax.add(CanvasCurve([0], [0], COLOR_CYCLE[3]))
+        self.draw()
+
+    def arrangement(self):
+        """
+        Returns the number of pumps in parallel and in series
+
+        :return: tuple (parallel, series)
+        """
+        n = self.countParam.real()
+        if self.arrangementGroup.value == 'Parallel':
+            return n, 1
+        if self.arrangementGroup.value == 'Series':
+            return 1, n
+        return 1, 1
+
+    def pipe_parameters(self):
+        """
+        Returns the pipe as keyword arguments for evaluate_pipe() without the discharge
+
+        :return: dict of the geometry, elevations and friction parameters
+        """
+        sections = SectionArray.from_forms([self.i1, self.i2])
+        return {'shape1': self.i1.type, 'shape2': self.i2.type,
+                'd1': float(sections.d[0]), 'w1': float(sections.w[0]), 'h1': float(sections.h[0]), 'z1': 0.,
+                'd2': float(sections.d[1]), 'w2': float(sections.w[1]), 'h2': float(sections.h[1]),
+                'z2': self.liftParam.real(), 'length': self.lengthParam.real(),
+                'roughness': self.roughnessParam.real()}
+
+    def solve_locus(self):
+        """
+        Solves the operating points of all speeds in self.speeds, if the pipe or the arrangement changed since the last
+        call, and sets the axes limits so that every speed fits without redrawing the axes
+
+        :return: dict of operating_points()
+        """
+        params = self.pipe_parameters()
+        parallel, series = self.arrangement()
+        # the dimensions, which do not apply to the shape of an end, are NaN and would never compare equal
+        key = (tuple((name, None if value != value else value) for name, value in sorted(params.items())),
+               parallel, series)
+        if key != self.locus_key:
+            self.locus = operating_points(self.pump, self.speeds, parallel, series, **params)
+            self.locus_key = key
+            q_max = self.pump.max_flow(self.speeds[-1], parallel)
+            q = np.linspace(0, q_max, self.resolution)
+            h_system = system_head(q, **params)
+            h_top = max(series * self.speeds[-1] ** 2 * self.pump.base_head(0.), h_system.max())
+            h_bottom = min(0., h_system.min())
+            self.plot.update_plot(q, h_system, xlim=(0, q_max), ylim=(h_bottom, 1.05 * h_top))
+        return self.locus
+
+    def operating_point(self):
+        """
+        Solves the operating point at the current speed
+
+        :return: dict of operating_points() with arrays of length 1
+        """
+        parallel, series = self.arrangement()
+        return operating_points(self.pump, self.speedParam.real(), parallel, series, **self.pipe_parameters())
+
+    def update(self, args):
+        self.countParam.set_active(self.arrangementGroup.value != 'Single')
+        self.draw()
+        super().update(args)
+
+    def calculate(self):
+        parallel, series = self.arrangement()
+        point = self.operating_point()
+        table = Table(["Quantity", "Value"], 2)
+        if not point['feasible'][0]:
+            table.add_rows([[f'Operating point', f'the shutoff head $H_0 \\cdot (n/n_0)^2$ does not reach the static '
+                                                 f'lift, no flow']])
+            return table.show()
+        q = point['q'][0]
+        h = point['h'][0]
+        result = evaluate_pipe(q, **self.pipe_parameters())
+        table.add_rows([
+            [f'Discharge $~~Q$', f'${Variable(q, unit="m^3s^{-1}").rounded_latex(3)}$'],
+            [f'Head $~~H = H_{{sys}}(Q)$', f'${Variable(h, unit="m").rounded_latex(3)}$'],
+            [f'Head loss $~~h_f$', f'${Variable(result["hf"], unit="m").rounded_latex(3)}$'],
+            [f'Discharge per pump $~~\\frac{{Q}}{{N_{{par}}}}$',
+             f'${Variable(q / parallel, unit="m^3s^{-1}").rounded_latex(3)}$'],
+            [f'Head per pump $~~\\frac{{H}}{{N_{{ser}}}}$', f'${Variable(h / series, unit="m").rounded_latex(3)}$'],
+            [f'Hydraulic power $~~P = \\rho g Q H$',
+             f'${Variable(1000 * G_CONSTANT * q * h / 1000, unit="kW").rounded_latex(3)}$'],
+        ])
+        return table.show()
+
+    def draw(self):
+        """
+        Draws the system curve, the pump curve at the current speed, the locus of the operating points over all speeds
+        and the current operating point. Only a change of the pipe or the arrangement redraws the axes
+
+        :return: None
+        """
+        parallel, series = self.arrangement()
+        with self.plot.batch():
+            locus = self.solve_locus()
+            speed = self.speedParam.real()
+            q = np.linspace(0, self.pump.max_flow(speed, parallel), self.resolution)
+            self.pumpCurve.set_data(q, self.pump.head(q, speed, parallel, series))
+            self.locusCurve.set_data(locus['q'][locus['feasible']], locus['h'][locus['feasible']])
+            point = self.operating_point()
+            if point['feasible'][0]:
+                self.plot.mark(point['q'][0], point['h'][0])
+            else:
+                self.plot.mark(0, self.pump.head(0, speed, parallel, series))
+            self.plot.mark_dirty(self.plot.ax)
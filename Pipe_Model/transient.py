@@ -0,0 +1,296 @@
+import threading
+import time
+
+import numpy as np
+from ipycanvas import hold_canvas
+
+from model import *
+
+# the bounds of the time steps and of reaches times time steps of one simulation, and the number of recorded samples
+# of the valve head
+MAX_STEPS = 50000
+MAX_NODE_STEPS = 2 * 10 ** 7
+HISTORY_SAMPLES = 4000
+
+
+class WaterHammer(Model):
+    """
+    Concrete implementation of Model, representing the transient flow in a pipe between a reservoir and a valve, which
+    is closed at t = 0. The pipe is discretized into reaches and solved with the method of characteristics, every time
+    step is a handful of whole-array numpy operations. The area changes linearly between the two IntersectionForm ends,
+    the elevation changes linearly between the given elevations of the ends
+    """
+
+    def __init__(self, i1: IntersectionForm, i2: IntersectionForm, q=1., canvas=None, reaches=1000, roughness=5e-5,
+                 frame_time=1 / 20, z=(0., 0.)):
+        """
+        Initializes the model
+
+        :param i1: the end at the reservoir
+        :param i2: the end at the valve
+        :param q: the steady discharge before the valve starts closing [m^3/s, Default: 1]
+        :param canvas: the canvas to stream the pressure wave to [Default: None]
+        :param reaches: the initial number of reaches [Default: 1000]
+        :param roughness: the absolute roughness of the pipe wall [m, Default: 5e-5]
+        :param frame_time: the wall clock time between two frames while simulating [s, Default: 1/20]
+        :param z: the elevations of the reservoir end and the valve end [m, Default: (0, 0)]
+        """
+        self.i1 = i1
+        self.i2 = i2
+        self.canvas = canvas
+        self.callback = None
+        self.roughness = roughness
+        self.z = z
+        self.frame_time = frame_time
+        self.cancelled = False
+        self.thread = None
+        self.result = None
+
+        self.qParam = FloatChangeable(q, _min=0.01, _max=10, desc="Discharge $~~Q_0$", unit="m^3s^{-1}", step=0.01,
+                                      width='100px')
+        self.headParam = FloatChangeable(100, _min=10, _max=300, desc="Reservoir head $~~H_R$", unit="m",
+                                         width='100px')
+        self.lengthParam = FloatChangeable(1000, _min=10, _max=5000, desc="Length $~~L$", unit="m", step=10,
+                                           width='100px')
+        self.waveParam = FloatChangeable(1000, _min=100, _max=1400, desc="Wave speed $~~a$", unit="ms^{-1}", step=10,
+                                         width='100px')
+        self.closureParam = FloatChangeable(1, _min=0, _max=20, desc="Closure time $~~T_c$", unit="s", step=0.1,
+                                            width='100px')
+        self.durationParam = FloatChangeable(10, _min=1, _max=60, desc="Simulated time $~~T$", unit="s",
+                                             width='100px')
+        self.reachesParam = IntChangeable(reaches, _min=10, _max=5000, desc="Reaches $~~N$", unit="~~",
+                                          width='100px')
+        self.params = [
+            ChangeableContainer([self.qParam, self.headParam, self.lengthParam, self.waveParam]),
+            ChangeableContainer([self.closureParam, self.durationParam, self.reachesParam])
+        ]
+
+    def reaches(self):
+        """
+        Returns the number of reaches of the slider, reduced so that the time steps T * a * N / L stay within MAX_STEPS
+        and the reaches times the time steps T * a * N^2 / L stay within MAX_NODE_STEPS
+
+        :return: the number of reaches N
+        """
+        steps_per_reach = self.durationParam.real() * self.waveParam.real() / self.lengthParam.real()
+        limit = min(MAX_STEPS / steps_per_reach, np.sqrt(MAX_NODE_STEPS / steps_per_reach))
+        return max(min(self.reachesParam.real(), int(limit)), 1)
+
+    def setup(self):
+        """
+        Discretizes the pipe and sets up the steady state before the valve starts closing
+
+        :return: dict of the grid, the constants of the characteristics and the initial heads and flows
+        """
+        n = self.reaches()
+        length = self.lengthParam.real()
+        a = self.waveParam.real()
+        q0 = self.qParam.real()
+        s = np.linspace(0, 1, n + 1)
+        sections = SectionArray.from_forms([self.i1, self.i2], self.z)
+        area = (1 - s) * sections.area()[0] + s * sections.area()[1]
+        dh = (1 - s) * sections.hydraulic_diameter()[0] + s * sections.hydraulic_diameter()[1]
+        z = (1 - s) * sections.z[0] + s * sections.z[1]
+        dx = length / n
+        # impedance B and friction coefficient R of every reach, evaluated with its mean area
+        reach_area = (area[:-1] + area[1:]) / 2
+        reach_dh = (dh[:-1] + dh[1:]) / 2
+        f = friction_factor(reynolds_number(q0 / reach_area, reach_dh), self.roughness / reach_dh)
+        b = a / (G_CONSTANT * reach_area)
+        r = f * dx / (2 * G_CONSTANT * reach_dh * reach_area ** 2)
+        h = self.headParam.real() - np.concatenate(([0], np.cumsum(r * q0 * abs(q0))))
+        return {'x': s * length, 'z': z, 'dt': dx / a, 'b': b, 'r': r, 'h': h, 'q': np.full(n + 1, q0),
+                'valve_head': h[-1] - z[-1]}
+
+    def valve_opening(self, t):
+        """
+        Returns the relative opening of the valve, which closes with tau = (1 - t / T_c)^1.5
+
+        :param t: the time since the valve started closing [s]
+        :return: the relative opening tau in [0, 1]
+        """
+        closure = self.closureParam.real()
+        if closure <= 0 or t >= closure:
+            return 0.
+        return (1 - t / closure) ** 1.5
+
+    def simulate(self, frame=None):
+        """
+        Runs the method of characteristics until the simulated time is reached or stop() is called.
+        All arrays are allocated once, every time step only updates them in place
+
+        :param frame: function (t, result) called about every frame_time seconds and at the end, e.g. to stream the
+                      current state to the canvas [Default: None]
+        :return: dict of the heads 'h', flows 'q', the head envelope 'h_max', 'h_min', the valve head over time
+                 'history' recorded every 'stride' steps (at most HISTORY_SAMPLES samples), the number of computed
+                 'steps' and the grid 'x', 'z', 'dt'
+        """
+        state = self.setup()
+        h, q, b, r = state['h'], state['q'], state['b'], state['r']
+        h_max, h_min = h.copy(), h.copy()
+        cp = np.empty(len(h) - 1)
+        cm = np.empty(len(h) - 1)
+        interior = 1 / (b[:-1] + b[1:])
+        # a single reach may still need more steps, then the simulated time is shortened
+        steps = min(int(np.ceil(self.durationParam.real() / state['dt'])), MAX_STEPS)
+        stride = max(int(np.ceil(steps / HISTORY_SAMPLES)), 1)
+        history = np.full((2, steps // stride + 1), np.nan)
+        history[0] = np.arange(history.shape[1]) * stride * state['dt']
+        history[1, 0] = h[-1]
+        q0, valve_head, z_valve = q[-1], max(state['valve_head'], 1e-9), state['z'][-1]
+        reservoir = h[0]
+        result = {**state, 'h_max': h_max, 'h_min': h_min, 'history': history, 'stride': stride, 'steps': 0}
+        last_frame = time.time()
+        for step in range(1, steps + 1):
+            # C+ characteristic arriving at nodes 1..N, C- characteristic arriving at nodes 0..N-1
+            np.multiply(r, np.abs(q[:-1]), out=cp)
+            cp -= b
+            cp *= -q[:-1]
+            cp += h[:-1]
+            np.multiply(r, np.abs(q[1:]), out=cm)
+            cm -= b
+            cm *= q[1:]
+            cm += h[1:]
+            # interior nodes, then the reservoir and the valve
+            np.subtract(cp[:-1], cm[1:], out=q[1:-1])
+            q[1:-1] *= interior
+            h[1:-1] = cp[:-1] - b[:-1] * q[1:-1]
+            h[0] = reservoir
+            q[0] = (reservoir - cm[0]) / b[0]
+            cv = (q0 * self.valve_opening(step * state['dt'])) ** 2 / (2 * valve_head)
+            q[-1] = -b[-1] * cv + np.sqrt((b[-1] * cv) ** 2 + 2 * cv * max(cp[-1] - z_valve, 0))
+            h[-1] = cp[-1] - b[-1] * q[-1]
+            np.maximum(h_max, h, out=h_max)
+            np.minimum(h_min, h, out=h_min)
+            if step % stride == 0:
+                history[1, step // stride] = h[-1]
+            result['steps'] = step
+            if self.cancelled:
+                break
+            if frame is not None and time.time() - last_frame >= self.frame_time:
+                frame(step * state['dt'], result)
+                last_frame = time.time()
+        if frame is not None:
+            frame(result['steps'] * state['dt'], result)
+        self.result = result
+        return result
+
+    def run(self):
+        """
+        Simulates and streams the frames to the canvas, reports the extreme heads to the demo when finished.
+        Runs in its own thread, see update()
+
+        :return: None
+        """
+        result = self.simulate(self.draw if self.canvas is not None else None)
+        if not self.cancelled and self.callback is not None:
+            self.callback.report(self.result_table(result))
+
+    def stop(self):
+        """
+        Stops a running simulation and waits for its thread
+
+        :return: None
+        """
+        self.cancelled = True
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+
+    def update(self, args):
+        self.stop()
+        super().update(args)
+        self.cancelled = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def joukowsky(self):
+        """
+        Calculates the surge of an instantaneous closure dH = a * U / g at the valve
+
+        :return: the head surge [m]
+        """
+        return self.waveParam.real() * self.qParam.real() / self.i2.area() / G_CONSTANT
+
+    def calculate(self):
+        a = self.waveParam.real()
+        reflection = 2 * self.lengthParam.real() / a
+        rapid = self.closureParam.real() <= reflection
+        relation = "\\leq" if rapid else ">"
+        table = Table(["Quantity", "Value"], 2)
+        table.add_rows([
+            [f'Wave reflection time $\\frac{{2 L}}{{a}}$', f'${Variable(reflection, unit="s").rounded_latex(3)}$'],
+            [f'Closure', f'{"rapid" if rapid else "slow"} ($T_c {relation} \\frac{{2 L}}{{a}}$)'],
+            [f'Joukowsky surge $\\Delta H = \\frac{{a \\cdot U_2}}{{g}}$',
+             f'${Variable(self.joukowsky(), unit="m").rounded_latex(3)}$'],
+            [f'Time step $\\Delta t = \\frac{{\\Delta x}}{{a}}$',
+             f'${Variable(self.lengthParam.real() / self.reaches() / a, unit="s").rounded_latex(5)}$'],
+        ])
+        if self.reaches() < self.reachesParam.real():
+            table.add_row([f'Reaches', f'${self.reaches()}$ - reduced to bound the work of the simulation'])
+        return table.show()
+
+    def result_table(self, result):
+        """
+        Returns the extreme heads of a finished simulation as HTML table
+
+        :param result: the result of simulate()
+        :return: HTML string
+        """
+        pressure_max = result['h_max'] - result['z']
+        pressure_min = result['h_min'] - result['z']
+        table = Table(["Simulation", "Value"], 2)
+        table.add_rows([
+            [f'Time steps', f'${result["steps"]}$'],
+            [f'Maximum head at the valve $H_{{max}}$', f'${Variable(result["h_max"][-1], unit="m").rounded_latex(3)}$'],
+            [f'Maximum pressure head $\\frac{{p_{{max}}}}{{\\rho g}}$',
+             f'${Variable(pressure_max.max(), unit="m").rounded_latex(3)}$'],
+            [f'Minimum pressure head $\\frac{{p_{{min}}}}{{\\rho g}}$',
+             f'${Variable(pressure_min.min(), unit="m").rounded_latex(3)}$'
+             f'{" - cavitation possible" if pressure_min.min() < -10 else ""}'],
+        ])
+        return table.show()
+
+    def draw(self, t, result):
+        """
+        Draws the current state: the head along the pipe with its envelope in the upper half and the head at the valve
+        over time in the lower half of the canvas. Every curve is one stroke_lines call
+
+        :param t: the simulated time [s]
+        :param result: the current state, see simulate()
+        :return: None
+        """
+        width = self.canvas.width - 90
+        height = self.canvas.height / 2 - 40
+        h_lo = min(result['h_min'].min(), result['z'].min())
+        h_hi = max(result['h_max'].max(), self.headParam.real() + self.joukowsky())
+        span = max(h_hi - h_lo, 1e-9)
+        duration = self.durationParam.real()
+        x = 60 + result['x'] / result['x'][-1] * width
+        samples = result['steps'] // result['stride'] + 1
+        time_x, valve_h = decimate(result['history'][0, :samples], result['history'][1, :samples], n=int(width))
+        with hold_canvas():
+            self.canvas.clear()
+            self.canvas.font = '12px sans-serif'
+            self.canvas.fill_style = 'black'
+            self.canvas.fill_text(f"t = {t:.3f} s", 60, 15)
+            for top, label in ((20, "Head along the pipe"), (self.canvas.height / 2 + 20, "Head at the valve")):
+                self.canvas.stroke_style = hexcode((150, 150, 150))
+                self.canvas.stroke_rect(60, top, width, height)
+                self.canvas.fill_text(label, 65, top + 14)
+                self.canvas.fill_text(f"{h_hi:.0f} m", 5, top + 10)
+                self.canvas.fill_text(f"{h_lo:.0f} m", 5, top + height)
+
+            def y(values, top):
+                return top + (h_hi - values) / span * height
+
+            self.canvas.stroke_style = hexcode((194, 229, 242))
+            self.canvas.stroke_lines(np.column_stack((x, y(result['h_max'], 20))))
+            self.canvas.stroke_lines(np.column_stack((x, y(result['h_min'], 20))))
+            self.canvas.stroke_style = hexcode((100, 94, 97))
+            self.canvas.stroke_lines(np.column_stack((x, y(result['z'], 20))))
+            self.canvas.stroke_style = hexcode((7, 120, 217))
+            self.canvas.line_width = 2
+            self.canvas.stroke_lines(np.column_stack((x, y(result['h'], 20))))
+            self.canvas.stroke_lines(np.column_stack((60 + time_x / duration * width,
+                                                      y(valve_h, self.canvas.height / 2 + 20))))
+            self.canvas.line_width = 1
@@ -0,0 +1,463 @@
+from tank import *
+
+TOPOLOGIES = ['Series', 'Tree']
+WATER_COLOR = '#07B2D9'
+STREAM_COLOR = '#C2E5F2'
+
+
+def cascade_downstream(n, topology='Series', branching=2):
+    """
+    Returns the tank every tank of a cascade drains into. The tanks are numbered in the direction of the flow, so every
+    tank drains into a tank with a larger index and the last tank drains into the outlet. In a tree the last tank is
+    the root and every tank collects the outflow of up to branching tanks
+
+    :param n: the number of tanks
+    :param topology: 'Series' or 'Tree' [Default: 'Series']
+    :param branching: the number of tanks draining into one tank of a tree [Default: 2]
+    :return: int array of length n with the index of the downstream tank, -1 for the outlet
+    """
+    index = np.arange(n)
+    if topology == 'Series':
+        return np.where(index < n - 1, index + 1, -1)
+    # j = n - 1 - i is the position in a heap with the root at j = 0
+    j = n - 1 - index
+    return np.where(j > 0, n - 1 - (j - 1) // branching, -1)
+
+
+def cascade_levels(downstream):
+    """
+    Returns the number of tanks between every tank and the outlet
+
+    :param downstream: the downstream tanks, see cascade_downstream()
+    :return: int array, 0 for the tank draining into the outlet
+    """
+    levels = np.zeros(len(downstream), dtype=int)
+    for i in range(len(downstream) - 1, -1, -1):
+        if downstream[i] >= 0:
+            levels[i] = levels[downstream[i]] + 1
+    return levels
+
+
+def cascade_layout(downstream, topology='Series'):
+    """
+    Places the tanks of a cascade on a grid of cells. A series is wrapped into rows, in which every tank sits a bit
+    lower than the one before, a tree is drawn in columns from the leaves on the left to the root on the right
+
+    :param downstream: the downstream tanks, see cascade_downstream()
+    :param topology: 'Series' or 'Tree' [Default: 'Series']
+    :return: tuple (columns, rows, number of columns, number of rows), the positions may be fractional
+    """
+    n = len(downstream)
+    if topology == 'Series':
+        per_row = int(np.ceil(np.sqrt(2 * n)))
+        index = np.arange(n)
+        steps = index % per_row
+        return steps.astype(float), index // per_row + 0.3 * steps / per_row, per_row, int(np.ceil(n / per_row))
+    levels = cascade_levels(downstream)
+    columns = levels.max() - levels
+    rows = np.zeros(n)
+    counts = np.bincount(levels)
+    for level, count in enumerate(counts):
+        members = np.flatnonzero(levels == level)
+        # center the smaller levels on the widest one
+        rows[members] = (np.arange(count) + 0.5) * counts.max() / count - 0.5
+    return columns.astype(float), rows, len(counts), int(counts.max())
+
+
+def cascade_rate(h, q_external, n_holes, d_holes, area, depth, drains, downstream):
+    """
+    Right hand side of the coupled tank ODEs dh_i/dt = (Q_ext,i + sum of Q_out,j of the upstream tanks j - Q_out,i) / A,
+    see tank_rate(). The whole cascade is one state vector, the outflows are scattered into their downstream tanks with
+    a single bincount
+
+    :param h: the water depths of all tanks [m]
+    :param q_external: the external discharge into every tank [m^3/s]
+    :param n_holes: the number of holes of every tank
+    :param d_holes: the diameter of the holes of every tank [m]
+    :param area: the plan area of the tanks [m^2]
+    :param depth: the depth of the tanks [m]
+    :param drains: the indices of the tanks, which drain into another tank
+    :param downstream: the downstream tanks of the tanks in drains
+    :return: the rates of change of the water depths [m/s]
+    """
+    q_out = hole_discharge(h, n_holes, d_holes)
+    q_in = q_external + np.bincount(downstream, weights=q_out[drains], minlength=len(h))
+    rate = (q_in - q_out) / area
+    return np.where(h >= depth, np.minimum(rate, 0), rate)
+
+
+class TankCascade(Model):
+    """
+    Concrete Implementation of demo::Model for simulating a cascade of tanks with holes in series or as a tree, in which
+    the outflow of every tank falls into the next one. The inflow Q_in is split equally between the tanks at the top of
+    the cascade. The tanks are not objects of their own, their holes and water depths are numpy arrays, which are
+    integrated as one coupled system with the Dormand-Prince method of the tank model
+    """
+
+    def __init__(self, holes, q: float, n_tanks=8, max_tanks=48, max_depth=1, area=2., canvas=None, max_holes=50):
+        """
+        Initializes the model, every tank starts empty with the given holes
+
+        :param holes: the holes of every tank, see create_holes()
+        :param q: the discharge into the cascade [m^3/s]
+        :param n_tanks: the initial number of tanks [Default: 8]
+        :param max_tanks: the maximum number of tanks [Default: 48]
+        :param max_depth: the depth of the tanks [m, Default: 1]
+        :param area: the plan area of every tank [m^2, Default: 2]
+        :param canvas: MultiCanvas with at least two layers, the tanks are drawn on the lower and the water on the
+                       upper one [Default: None]
+        :param max_holes: the maximum number of holes of a tank [Default: 50]
+        """
+        self.canvas = canvas
+        self.callback = None
+        self.area = area
+        self.max_tanks = max_tanks
+        self.n_holes = np.full(max_tanks, float(len(holes)))
+        self.d_holes = np.full(max_tanks, holes[0].d * 10 ** (-2))
+        self.h = np.zeros(max_tanks)
+        self.transient = None
+        self.cancelled = False
+        self.animation = None
+        self.loading = False
+        self.topology_key = None
+        self.downstream = None
+        self.layout = None
+        self.background_key = None
+        self.frame = None
+
+        self.q = FloatChangeable(q, _min=0.01, _max=1.0, desc="Discharge $~~Q_{in}~~$", unit="m³s⁻¹", step=0.01, width='150px')
+        self.depth = FloatChangeable(max_depth, _min=0.5, _max=5.0, desc="Tank depth $~~D$", unit="m", width='150px')
+        self.nTanks = IntChangeable(n_tanks, _min=1, _max=max_tanks, desc="Number of tanks $~~N$", unit="~~", width='150px')
+        self.topologyGroup = DropDownGroup(TOPOLOGIES, ['Every tank drains into the next one',
+                                                        'Two tanks drain into one, down to a single tank'])
+        self.topologyWidget = BoxHorizontal([widgets.HTML(f"Topology"), self.topologyGroup.display])
+        self.tankSelect = IntChangeable(0, _min=0, _max=n_tanks, desc="Edited tank (0 = all) $~~i$", unit="~~", width='150px')
+        self.nHoles = IntChangeable(len(holes), _min=5, _max=max_holes, desc="Number of holes $~~n_{holes,i}$", unit="~~", width='150px')
+        self.dHoles = FloatChangeable(holes[0].d * 10 ** (-2), unit="m", base=0, _min=0.005, _max=0.1,
+                                      desc="Diameter $~~d_{holes,i}$", step=0.001, width='150px')
+        self.params = [
+            ChangeableContainer([self.q, self.depth, self.nTanks, self.topologyWidget]),
+            ChangeableContainer([HorizontalSpace(10)]),
+            ChangeableContainer([self.tankSelect, self.nHoles, self.dHoles], alignment="flex-end"),
+        ]
+
+        if self.canvas is not None:
+            self.canvas.on_client_ready(self.draw)
+
+    def tanks(self):
+        """
+        Returns the current number of tanks
+
+        :return: N
+        """
+        return self.nTanks.real()
+
+    def selection(self):
+        """
+        Returns the tanks edited by the hole sliders
+
+        :return: slice of all tanks or of the selected one
+        """
+        i = self.tankSelect.real()
+        return slice(0, self.tanks()) if i == 0 else slice(i - 1, i)
+
+    def connect(self):
+        """
+        Updates the downstream tanks and the layout, when the number of tanks or the topology changed
+
+        :return: the downstream tanks, see cascade_downstream()
+        """
+        key = (self.tanks(), self.topologyGroup.value)
+        if key != self.topology_key:
+            self.downstream = cascade_downstream(*key)
+            self.layout = cascade_layout(self.downstream, key[1])
+            self.topology_key = key
+        return self.downstream
+
+    def external_inflow(self):
+        """
+        Splits the discharge Q_in equally between the tanks, which are not fed by another tank
+
+        :return: the external discharge into every tank [m^3/s]
+        """
+        downstream = self.connect()
+        fed = np.zeros(len(downstream), dtype=bool)
+        fed[downstream[downstream >= 0]] = True
+        return np.where(fed, 0., self.q.real() / np.count_nonzero(~fed))
+
+    def steady_state(self):
+        """
+        Calculates the equilibrium of the cascade tank by tank in the direction of the flow with the depth formula of
+        the tank model. An overflowing tank is full and only passes on the discharge through its holes
+
+        :return: dict of the discharge into every tank 'q', its equilibrium depth 'h', the discharge through its holes
+                 'q_out' and whether it 'overflow's
+        """
+        n = self.tanks()
+        depth = self.depth.real()
+        downstream = self.connect()
+        q = self.external_inflow()
+        q_full = hole_discharge(depth, self.n_holes[:n], self.d_holes[:n])
+        q_out = np.zeros(n)
+        for i in range(n):
+            q_out[i] = min(q[i], q_full[i])
+            if downstream[i] >= 0:
+                q[downstream[i]] += q_out[i]
+        h = equilibrium_depth(q, self.n_holes[:n], self.d_holes[:n])
+        return {'q': q, 'h': np.minimum(h, depth), 'q_out': q_out, 'overflow': h > depth}
+
+    def simulate(self, h0, max_time=None, rtol=1e-6):
+        """
+        Integrates the water depths of all tanks from h0 as one state vector until every tank is within
+        EQUILIBRIUM_TOLERANCE of its equilibrium, see Tank::simulate()
+
+        :param h0: the initial water depths, clipped to the depth of the tanks [m]
+        :param max_time: the end of the integration [s, Default: None, estimated from the time constants of the tanks]
+        :param rtol: the relative tolerance of a step [Default: 1e-6]
+        :return: dict of the times 't' of all steps, the depths 'h' with one column per tank, the equilibrium depths
+                 'h_equilibrium', the time the equilibrium was reached 't_equilibrium' (None if it was not reached) and
+                 the steady state, see steady_state()
+        """
+        n = self.tanks()
+        depth = self.depth.real()
+        n_holes = self.n_holes[:n].copy()
+        d_holes = self.d_holes[:n].copy()
+        downstream = self.connect()
+        drains = np.flatnonzero(downstream >= 0)
+        targets = downstream[drains]
+        q_external = self.external_inflow()
+        steady = self.steady_state()
+        h_equilibrium = steady['h']
+        h0 = np.clip(h0, 0., depth)
+        if max_time is None:
+            # summed over the cascade, as the tanks fill one after the other
+            max_time = float(np.sum(integration_time(steady['q'], n_holes, d_holes, self.area, depth, h0,
+                                                     h_equilibrium)))
+
+        def rate(t, h):
+            return cascade_rate(h, q_external, n_holes, d_holes, self.area, depth, drains, targets)
+
+        def reached(t, h):
+            return bool(np.all(at_equilibrium(h, h_equilibrium, depth)))
+
+        t, h = dormand_prince(rate, h0, max_time, rtol=rtol, stop=reached)
+        h = np.clip(h, 0., depth)
+        return {'t': t, 'h': h, 'h_equilibrium': h_equilibrium,
+                't_equilibrium': t[-1] if reached(t[-1], h[-1]) else None, 'steady': steady}
+
+    def depths_at(self, result, t):
+        """
+        Interpolates the depths of all tanks of a simulation linearly in time
+
+        :param result: the result of simulate()
+        :param t: the time [s]
+        :return: the water depths [m]
+        """
+        k = int(np.clip(np.searchsorted(result['t'], t), 1, len(result['t']) - 1))
+        t0, t1 = result['t'][k - 1], result['t'][k]
+        w = min(max((t - t0) / (t1 - t0), 0.), 1.)
+        return (1 - w) * result['h'][k - 1] + w * result['h'][k]
+
+    def animate(self, result, duration=5., fps=30):
+        """
+        Plays a simulated transient, compressed to the given duration. The depths of the tanks follow the animation,
+        so a change of the parameters can restart the integration from them
+
+        :param result: the result of simulate()
+        :param duration: the wall clock time of the whole animation [s, Default: 5]
+        :param fps: the frames per second [Default: 30]
+        :return: None
+        """
+        n = result['h'].shape[1]
+        start_time = time.time()
+        t_end = result['t'][-1]
+        while not self.cancelled:
+            elapsed = min((time.time() - start_time) / duration, 1.)
+            self.h[:n] = self.depths_at(result, elapsed * t_end)
+            self.draw(elapsed * t_end)
+            if elapsed >= 1:
+                break
+            time.sleep(1 / fps)
+
+    def stop(self):
+        """
+        Stops a running animation
+
+        :return: None
+        """
+        self.cancelled = True
+        if self.animation is not None and self.animation is not threading.current_thread():
+            self.animation.join()
+        self.animation = None
+
+    def update(self, args):
+        """
+        Applies the hole sliders to the edited tanks, or loads the holes of a newly selected tank into the sliders, and
+        restarts the integration from the current depths
+
+        :param args: the change of the widget
+        :return: None
+        """
+        if self.loading:
+            return
+        self.stop()
+        owner = args['owner'] if isinstance(args, dict) else None
+        self.loading = True
+        try:
+            self.tankSelect.widget.max = self.tanks()
+            selected = self.selection()
+            if owner is self.tankSelect.widget and self.tankSelect.real() > 0:
+                self.nHoles.widget.value = int(self.n_holes[selected][0])
+                self.dHoles.widget.value = float(self.d_holes[selected][0])
+            elif owner is self.nHoles.widget or owner is self.dHoles.widget:
+                self.n_holes[selected] = self.nHoles.real()
+                self.d_holes[selected] = self.dHoles.real()
+        finally:
+            self.loading = False
+
+        n = self.tanks()
+        self.transient = self.simulate(self.h[:n])
+        if self.canvas is not None:
+            self.cancelled = False
+            self.animation = threading.Thread(target=self.animate, args=[self.transient], daemon=True)
+            self.animation.start()
+        else:
+            self.h[:n] = self.transient['h'][-1]
+
+        super().update(args)
+
+    def calculate(self):
+        """
+        Summarizes the cascade as HTML table: the steady depth of the selected tank, the discharge at the outlets and
+        over the rims, the overflowing tanks and when the running transient reaches the equilibrium. The transient is
+        only integrated here, if no animation has computed it yet
+
+        :return: HTML string
+        """
+        n = self.tanks()
+        result = self.transient if self.transient is not None else self.simulate(self.h[:n])
+        steady = result['steady']
+        downstream = self.connect()
+        outflow = steady['q_out'][downstream < 0].sum()
+        overflowing = np.flatnonzero(steady['overflow']) + 1
+        i = max(self.tankSelect.real(), 1)
+        if result['t_equilibrium'] is None:
+            reached = f'not reached within ${Variable(result["t"][-1], unit="s").rounded_latex(cut=1)}$'
+        else:
+            reached = f'${{t_{{eq}} = {Variable(result["t_equilibrium"], unit="s").rounded_latex(cut=1)}}}$'
+        table = Table(["Quantity", "Value"], 2)
+        table.add_rows([
+            [f'Cascade', f'{n} tank{"s" if n > 1 else ""} {"in series" if self.topologyGroup.value == "Series" else "as a binary tree"}, '
+                         f'$A = {self.area:.2f} ~m^2$'],
+            [f'Depth of tank {i} $h_{{{i}}} = \\frac{{1}}{{2g}} \\cdot \\left( \\frac{{4 \\cdot Q_{{{i}}}}}'
+             f'{{n_{{holes,{i}}} \\cdot \\pi \\cdot d^2_{{holes,{i}}}}} \\right)^2$',
+             f'${Variable(steady["h"][i - 1], unit="m").rounded_latex(cut=3)}$ with '
+             f'$Q_{{{i}}} = {Variable(steady["q"][i - 1], unit="m^3s^{-1}").rounded_latex(cut=3)}$'],
+            [f'Discharge at the outlet', f'${Variable(outflow, unit="m^3s^{-1}").rounded_latex(cut=3)}$'],
+            [f'Spilled over the rims', f'${Variable(self.q.real() - outflow, unit="m^3s^{-1}").rounded_latex(cut=3)}$'],
+            [f'Overflowing tanks', ', '.join(str(k) for k in overflowing) if len(overflowing) else 'none'],
+            [f'Equilibrium', f'{reached} after {len(result["t"]) - 1} adaptive steps'],
+        ])
+        return table.show()
+
+    def draw_background(self):
+        """
+        Draws the tanks, their holes and the connections between them on the lower layer of the canvas. The tanks are
+        drawn with a few batched calls and only when the cascade or the selection changed
+
+        :return: the pixel coordinates of the tanks, dict of arrays 'x0', 'y0', 'x1', 'y1'
+        """
+        n = self.tanks()
+        downstream = self.connect()
+        key = (self.topology_key, self.tankSelect.real(), self.n_holes[:n].tobytes(), self.d_holes[:n].tobytes())
+        if key == self.background_key:
+            return self.frame
+        columns, rows, n_columns, n_rows = self.layout
+        canvas = self.canvas[0]
+        cell_width = (canvas.width - 40) / n_columns
+        cell_height = (canvas.height - 40) / n_rows
+        x0 = 20 + (columns + 0.2) * cell_width
+        x1 = x0 + 0.6 * cell_width
+        y0 = 30 + (rows + 0.15) * cell_height
+        y1 = y0 + 0.5 * cell_height
+        self.frame = {'x0': x0, 'y0': y0, 'x1': x1, 'y1': y1, 'cell_width': cell_width, 'cell_height': cell_height}
+
+        drains = np.flatnonzero(downstream >= 0)
+        targets = downstream[drains]
+        center = (x0 + x1) / 2
+        # the area of the holes n * d^2 relative to the widest tank
+        holes = self.n_holes[:n] * self.d_holes[:n] ** 2
+        hole_width = 0.5 * (x1 - x0) * np.sqrt(holes / holes.max())
+        with hold_canvas():
+            canvas.clear()
+            canvas.stroke_style = hexcode((150, 150, 150))
+            canvas.line_width = 1.0
+            canvas.stroke_line_segments(np.stack((
+                np.column_stack((center[drains], y1[drains] + 0.1 * cell_height)),
+                np.column_stack((center[targets], y0[targets] - 0.05 * cell_height))), axis=1))
+            canvas.fill_style = 'black'
+            canvas.fill_rects(center - hole_width / 2, y1, hole_width, 0.05 * cell_height)
+            canvas.stroke_style = 'black'
+            canvas.line_width = 3.0 if cell_width > 40 else 2.0
+            canvas.stroke_line_segments(np.stack((
+                np.column_stack((x0, y0)), np.column_stack((x0, y1)),
+                np.column_stack((x0, y1)), np.column_stack((x1, y1)),
+                np.column_stack((x1, y1)), np.column_stack((x1, y0))), axis=1).reshape(-1, 2, 2))
+            canvas.line_width = 1.0
+            canvas.font = '10px sans-serif'
+            canvas.fill_style = hexcode((20, 20, 20))
+            for i in range(n):
+                canvas.fill_text(str(i + 1), x0[i], y0[i] - 3)
+            if self.tankSelect.real() > 0:
+                i = self.tankSelect.real() - 1
+                canvas.stroke_style = 'red'
+                canvas.stroke_rect(x0[i] - 0.1 * cell_width, y0[i] - 0.12 * cell_height, 0.8 * cell_width,
+                                   0.8 * cell_height)
+        self.background_key = key
+        return self.frame
+
+    def draw(self, t=None):
+        """
+        Draws the 2D-Visualization of the cascade: the water in all tanks, the streams through the holes and the
+        spilling water of full tanks are one fill_rects call each on the upper layer of the canvas
+
+        :param t: the simulated time to show [s, Default: None, no time]
+        :return: None
+        """
+        n = self.tanks()
+        depth = self.depth.real()
+        frame = self.draw_background()
+        x0, y0, x1, y1 = frame['x0'], frame['y0'], frame['x1'], frame['y1']
+        h = self.h[:n]
+        partial = np.clip(h / depth, 0, 1)
+        wy0 = y1 - partial * (y1 - y0)
+        q_out = hole_discharge(h, self.n_holes[:n], self.d_holes[:n])
+        q_external = self.external_inflow()
+        stream_width = 0.3 * (x1 - x0) / self.q.real()
+        center = (x0 + x1) / 2
+        sources = np.flatnonzero(q_external > 0)
+        full = np.flatnonzero(h >= depth - EQUILIBRIUM_TOLERANCE)
+        canvas = self.canvas[1]
+        with hold_canvas():
+            canvas.clear()
+            canvas.global_alpha = 0.75
+            canvas.fill_style = STREAM_COLOR
+            out_width = np.minimum(q_out * stream_width, x1 - x0)
+            canvas.fill_rects(center - out_width / 2, y1 + 0.05 * frame['cell_height'], out_width,
+                              0.1 * frame['cell_height'] * (q_out > 0))
+            source_width = q_external[sources] * stream_width[sources]
+            canvas.fill_rects(center[sources] - source_width / 2, y0[sources] - 0.1 * frame['cell_height'],
+                              source_width, wy0[sources] - y0[sources] + 0.1 * frame['cell_height'])
+            canvas.fill_style = WATER_COLOR
+            canvas.fill_rects(x0 + 1, wy0, x1 - x0 - 1.5, y1 - wy0 - 1)
+            if len(full):
+                canvas.fill_rects(np.concatenate((x0[full] - 3, x1[full])), np.tile(y0[full], 2), 3,
+                                  np.tile(y1[full] - y0[full], 2))
+            canvas.global_alpha = 1
+            canvas.font = '12px sans-serif'
+            canvas.fill_style = 'black'
+            if t is not None:
+                canvas.fill_text(f"t = {t:.1f} s", 20, 15)
+            if len(full):
+                canvas.fill_style = 'red'
+                canvas.fill_text(f"OVERFLOW! {len(full)} full tank{'s' if len(full) > 1 else ''}", 120, 15)
@@ -8,6 +8,23 @@ from demo import *
 
 G = 9.81
 M_TO_PIXELS = 100
+HOLE_LOD_LEVELS = ((16, 4), (8, 4), (8, 1), (6, 1))
+TANK_DEPTH = 1
+EQUILIBRIUM_TOLERANCE = 0.001
+
+# Butcher tableau of the Dormand-Prince 5(4) pair, the last row of A is the 5th order solution
+DP_C = np.array([0, 1 / 5, 3 / 10, 4 / 5, 8 / 9, 1, 1])
+DP_A = [
+    [],
+    [1 / 5],
+    [3 / 40, 9 / 40],
+    [44 / 45, -56 / 15, 32 / 9],
+    [19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729],
+    [9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656],
+    [35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84],
+]
+DP_E = np.array([35 / 384 - 5179 / 57600, 0, 500 / 1113 - 7571 / 16695, 125 / 192 - 393 / 640,
+                 -2187 / 6784 + 92097 / 339200, 11 / 84 - 187 / 2100, -1 / 40])
 
 THEME = {
     'slider': "#F27405",
@@ -20,6 +37,287 @@ THEME = {
 }
 
 
+def hole_discharge(h, n_holes, d_holes):
+    """
+    Returns the discharge through the holes at the bottom of a tank Q_out = n * a * sqrt(2 g h) with the hole area
+    a = pi * d^2 / 4. All params may be numpy arrays
+
+    :param h: the water depth, negative depths are treated as an empty tank [m]
+    :param n_holes: the number of holes
+    :param d_holes: the diameter of the holes [m]
+    :return: the discharge [m^3/s]
+    """
+    return n_holes * pymath.pi * d_holes ** 2 / 4 * np.sqrt(2 * G * np.maximum(h, 0))
+
+
+def equilibrium_depth(q_in, n_holes, d_holes):
+    """
+    Returns the water depth h = 1 / (2g) * (4 * Q_in / (n * pi * d^2))^2, at which the discharge through the holes
+    balances the inflow. All params may be numpy arrays
+
+    :param q_in: the discharge into the tank [m^3/s]
+    :param n_holes: the number of holes
+    :param d_holes: the diameter of the holes [m]
+    :return: the equilibrium depth [m]
+    """
+    return (1 / (2 * G)) * ((4 * q_in) / (n_holes * pymath.pi * d_holes ** 2)) ** 2
+
+
+def tank_rate(h, q_in, n_holes, d_holes, area, depth):
+    """
+    Right hand side of the tank ODE dh/dt = (Q_in - n * a * sqrt(2 g h)) / A with the hole area a = pi * d^2 / 4.
+    Water above the depth of the tank overflows, so a full tank can only drain. All params may be numpy arrays, which
+    are broadcast against each other
+
+    :param h: the water depth [m]
+    :param q_in: the discharge into the tank [m^3/s]
+    :param n_holes: the number of holes
+    :param d_holes: the diameter of the holes [m]
+    :param area: the plan area of the tank [m^2]
+    :param depth: the depth of the tank [m]
+    :return: the rate of change of the water depth [m/s]
+    """
+    rate = (q_in - hole_discharge(h, n_holes, d_holes)) / area
+    return np.where(h >= depth, np.minimum(rate, 0), rate)
+
+
+def integration_time(q_in, n_holes, d_holes, area, depth, h0, h_equilibrium, tolerance=EQUILIBRIUM_TOLERANCE):
+    """
+    Estimates the time a tank needs to get within the tolerance of its equilibrium: 20 linearized time constants
+    A * dh/dQ_out = 2 * A * h / Q_out, twice the time to drain from h0 and twice the time to fill the empty tank.
+    All params may be numpy arrays
+
+    :param q_in: the discharge into the tank [m^3/s]
+    :param n_holes: the number of holes
+    :param d_holes: the diameter of the holes [m]
+    :param area: the plan area of the tank [m^2]
+    :param depth: the depth of the tank [m]
+    :param h0: the initial water depth [m]
+    :param h_equilibrium: the equilibrium depth, clipped to the depth of the tank [m]
+    :param tolerance: the distance to the equilibrium depth, at which the tank is settled [m, Default: 0.001]
+    :return: the end of the integration [s]
+    """
+    q_hole = hole_discharge(1., n_holes, d_holes)
+    tau = 2 * area * np.sqrt(np.maximum(h_equilibrium, tolerance)) / q_hole
+    drain = 2 * area * np.sqrt(np.maximum(h0, 0.)) / q_hole
+    return 20 * tau + 2 * drain + 2 * area * depth / np.maximum(q_in, 1e-9)
+
+
+def at_equilibrium(h, h_equilibrium, depth, tolerance=EQUILIBRIUM_TOLERANCE):
+    """
+    Returns whether water depths are within the tolerance of their equilibrium. The equilibrium of an overflowing tank
+    is the full tank, which counts as reached once the depth is at the rim, because a step may overshoot it
+
+    :param h: the water depth [m]
+    :param h_equilibrium: the equilibrium depth, clipped to the depth of the tank [m]
+    :param depth: the depth of the tank [m]
+    :param tolerance: the distance to the equilibrium depth, at which the tank is settled [m, Default: 0.001]
+    :return: boolean (array)
+    """
+    return (np.abs(h - h_equilibrium) <= tolerance) | ((h >= depth) & (h_equilibrium >= depth))
+
+
+def dormand_prince_step(f, t, y, dt, k1):
+    """
+    Performs one step of the Dormand-Prince 5(4) method. y and dt may be numpy arrays of the same shape, so that
+    independent members advance with their own step size
+
+    :param f: the right hand side f(t, y)
+    :param t: the current time
+    :param y: the current state
+    :param dt: the step size
+    :param k1: f(t, y), which is the last stage of the previous step
+    :return: tuple of the 5th order solution, its error estimate and f at the new state
+    """
+    k = [k1]
+    for i in range(1, 7):
+        yi = y + dt * sum(a * ki for a, ki in zip(DP_A[i], k) if a != 0)
+        k.append(f(t + DP_C[i] * dt, yi))
+    # yi of the last stage is the 5th order solution, its derivative is the first stage of the next step
+    error = dt * sum(e * ki for e, ki in zip(DP_E, k) if e != 0)
+    return yi, error, k[6]
+
+
+def dormand_prince(f, y0, t_end, rtol=1e-6, atol=1e-9, dt=None, max_steps=100000, stop=None):
+    """
+    Integrates y' = f(t, y) from t = 0 with adaptive steps of the Dormand-Prince 5(4) method. The state may be a
+    vector of coupled components, which share one step size controlled by the largest error
+
+    :param f: the right hand side f(t, y)
+    :param y0: the initial state (scalar or 1D array)
+    :param t_end: the end of the integration
+    :param rtol: the relative tolerance of a step [Default: 1e-6]
+    :param atol: the absolute tolerance of a step [Default: 1e-9]
+    :param dt: the initial step size [Default: None, 1e-3 * t_end]
+    :param max_steps: the maximum number of steps [Default: 100000]
+    :param stop: callable stop(t, y), which ends the integration after an accepted step when it returns True
+                 [Default: None]
+    :return: tuple of numpy arrays (t, y) of all accepted steps, y has an additional last axis for a vector state
+    """
+    t = 0.
+    y = np.array(y0, dtype=float)
+    dt = 1e-3 * t_end if dt is None else dt
+    k1 = f(t, y)
+    ts = [t]
+    ys = [y]
+    for _ in range(max_steps):
+        if t >= t_end or (stop is not None and stop(t, y)):
+            break
+        dt = min(dt, t_end - t)
+        y_new, error, k_new = dormand_prince_step(f, t, y, dt, k1)
+        norm = np.max(np.abs(error) / (atol + rtol * np.maximum(np.abs(y), np.abs(y_new))))
+        if norm <= 1:
+            t += dt
+            y = y_new
+            k1 = k_new
+            ts.append(t)
+            ys.append(y)
+        dt *= min(5., max(0.2, 0.9 * norm ** -0.2)) if norm > 0 else 5.
+    return np.array(ts), np.array(ys)
+
+
+def dormand_prince_ensemble(f, y0, t_end, args=(), rtol=1e-6, atol=1e-9, stop=None, times=None, max_steps=10000):
+    """
+    Integrates many independent scalar ODEs y' = f(t, y, *args) from t = 0 in lock-step. Every member has its own
+    adaptive step size, the Dormand-Prince steps of all active members are whole-array operations. Finished members
+    are dropped from the working arrays, so the cost follows the number of members that are still moving
+
+    :param f: the vectorized right hand side f(t, y, *args), called with the arrays of the active members
+    :param y0: the initial states, array of length m
+    :param t_end: the end of the integration, scalar or array of length m
+    :param args: tuple of arrays of length m with the parameters of every member [Default: ()]
+    :param rtol: the relative tolerance of a step [Default: 1e-6]
+    :param atol: the absolute tolerance of a step [Default: 1e-9]
+    :param stop: vectorized stop(t, y, *args), a member finishes after an accepted step, where it returns True
+                 [Default: None]
+    :param times: increasing output times, at which the states are interpolated with cubic Hermite polynomials. Members
+                  that stopped keep their final state for later output times [Default: None]
+    :param max_steps: the maximum number of iterations [Default: 10000]
+    :return: dict of arrays of length m: the final times 't', final states 'y', accepted steps 'steps', whether stop
+             ended the integration 'stopped', and the states at the output times 'output' (float32, shape (m, k)) or None
+    """
+    y0 = np.asarray(y0, dtype=float).ravel()
+    m = y0.size
+    t_final = np.zeros(m)
+    y_final = y0.copy()
+    steps = np.zeros(m, dtype=np.int32)
+    stopped = np.zeros(m, dtype=bool)
+    times = None if times is None else np.asarray(times, dtype=float)
+    output = None if times is None else np.full((m, len(times)), np.nan, dtype=np.float32)
+
+    # working arrays of the active members
+    index = np.arange(m)
+    t_end = np.broadcast_to(np.asarray(t_end, dtype=float), (m,)).copy()
+    args = tuple(np.broadcast_to(np.asarray(arg), (m,)).copy() for arg in args)
+    t = np.zeros(m)
+    y = y0.copy()
+    dt = 1e-3 * t_end
+    k1 = f(t, y, *args)
+    next_output = np.zeros(m, dtype=np.intp)
+    n_steps = np.zeros(m, dtype=np.int32)
+    if times is not None:
+        filled = times <= 0
+        output[:, filled] = y0[:, np.newaxis]
+        next_output[:] = filled.sum()
+
+    for _ in range(max_steps):
+        by_stop = stop(t, y, *args) if stop is not None else np.zeros(t.shape, dtype=bool)
+        finished = by_stop | (t >= t_end)
+        if finished.any():
+            done = index[finished]
+            t_final[done] = t[finished]
+            y_final[done] = y[finished]
+            steps[done] = n_steps[finished]
+            stopped[done] = by_stop[finished]
+            if output is not None:
+                later = np.arange(len(times)) >= next_output[finished][:, np.newaxis]
+                output[done] = np.where(later, y[finished][:, np.newaxis], output[done])
+            keep = ~finished
+            index, t, y, dt, k1, t_end, next_output, n_steps = (
+                array[keep] for array in (index, t, y, dt, k1, t_end, next_output, n_steps))
+            args = tuple(arg[keep] for arg in args)
+        if index.size == 0:
+            break
+
+        np.minimum(dt, t_end - t, out=dt)
+        y_new, error, k_new = dormand_prince_step(lambda ti, yi: f(ti, yi, *args), t, y, dt, k1)
+        norm = np.abs(error) / (atol + rtol * np.maximum(np.abs(y), np.abs(y_new)))
+        accept = norm <= 1
+        t_new = t + dt
+
+        if output is not None:
+            # cubic Hermite interpolation with the derivatives at both ends of the step
+            while True:
+                crossing = accept & (next_output < len(times))
+                crossing[crossing] = times[next_output[crossing]] <= t_new[crossing]
+                if not crossing.any():
+                    break
+                i = np.flatnonzero(crossing)
+                h = dt[i]
+                theta = (times[next_output[i]] - t[i]) / h
+                value = ((1 - theta) ** 2 * (1 + 2 * theta) * y[i] + theta ** 2 * (3 - 2 * theta) * y_new[i]
+                         + h * theta * (1 - theta) * ((1 - theta) * k1[i] - theta * k_new[i]))
+                output[index[i], next_output[i]] = value
+                next_output[i] += 1
+
+        t = np.where(accept, t_new, t)
+        y = np.where(accept, y_new, y)
+        k1 = np.where(accept, k_new, k1)
+        n_steps += accept
+        with np.errstate(divide='ignore'):
+            dt *= np.where(norm > 0, np.clip(0.9 * norm ** -0.2, 0.2, 5.), 5.)
+
+    # members, which ran out of iterations
+    t_final[index] = t
+    y_final[index] = y
+    steps[index] = n_steps
+    return {'t': t_final, 'y': y_final, 'steps': steps, 'stopped': stopped, 'output': output}
+
+
+def tank_ensemble(q, n_holes, d_holes, area, depth, h0=0., times=None, rtol=1e-6, tolerance=EQUILIBRIUM_TOLERANCE):
+    """
+    Simulates the filling or draining of a tank for every combination of the given discharges, numbers and diameters
+    of holes at once, see dormand_prince_ensemble(). Every member stops when it is within the tolerance of its
+    equilibrium, which is the full tank if it overflows
+
+    :param q: the discharges into the tank, array of length nq [m^3/s]
+    :param n_holes: the numbers of holes, array of length nn
+    :param d_holes: the diameters of the holes, array of length nd [m]
+    :param area: the plan area of the tank [m^2]
+    :param depth: the depth of the tank [m]
+    :param h0: the initial water depth [m, Default: 0]
+    :param times: the output times of the depth cube [s, Default: None, no depth cube]
+    :param rtol: the relative tolerance of a step [Default: 1e-6]
+    :param tolerance: the distance to the equilibrium depth, at which a member stops [m, Default: 0.001]
+    :return: dict of float32 cubes of shape (nq, nn, nd): the equilibrium depth 'h_equilibrium', the time it was
+             reached 't_equilibrium' (nan if it was not), whether the tank 'overflow's, the number of 'steps' (int32),
+             the depth 'h' at the output times with an additional last axis (or None) and the axes 'q', 'n', 'd',
+             'times'
+    """
+    q, n_holes, d_holes = (np.asarray(values, dtype=float) for values in (q, n_holes, d_holes))
+    grid = [array.ravel() for array in np.meshgrid(q, n_holes, d_holes, indexing='ij')]
+    h_steady = equilibrium_depth(*grid)
+    h_equilibrium = np.minimum(h_steady, depth)
+    h0 = min(max(h0, 0.), depth)
+    max_time = integration_time(*grid, area, depth, h0, h_equilibrium, tolerance)
+
+    def rate(t, h, q_in, n, d, target):
+        return tank_rate(h, q_in, n, d, area, depth)
+
+    def reached(t, h, q_in, n, d, target):
+        return at_equilibrium(h, target, depth, tolerance)
+
+    result = dormand_prince_ensemble(rate, np.full(grid[0].size, h0), max_time, (*grid, h_equilibrium), rtol=rtol,
+                                     stop=reached, times=times)
+    shape = (q.size, n_holes.size, d_holes.size)
+    return {'q': q, 'n': n_holes, 'd': d_holes, 'times': times,
+            'h_equilibrium': h_equilibrium.reshape(shape).astype(np.float32),
+            't_equilibrium': np.where(result['stopped'], result['t'], np.nan).reshape(shape).astype(np.float32),
+            'overflow': (h_steady > depth).reshape(shape),
+            'steps': result['steps'].reshape(shape),
+            'h': None if result['output'] is None else np.minimum(result['output'], depth).reshape(shape + (len(times),))}
+
+
 class Hole:
     """
     Represents a hole in the tank
@@ -44,7 +342,28 @@ class Tank(Model):
                                f'\cdot \pi \cdot d^2_{{holes}}}} \\right)^2 [m]$ - ' \
                                f'combination of Bernoulli equation and mass conservation</td></tr>' \
                f'<tr><td class="tg-tdqd">${{ h = \\frac{{1}}{{2 \cdot 9.81}} \cdot \left( \\frac{{4 \cdot {self.q.real()}}}{{{self.nHoles.real()} \cdot \pi \cdot {self.dHoles.real()}^2}}\\right)^2[m] }}$</td></tr>' \
-               f'<tr><td class="tg-tdqd">${{h = {self.get_depth().rounded_latex(cut=3)}}}$</td></tr></tbody></table>'
+               f'<tr><td class="tg-tdqd">${{h = {self.get_depth().rounded_latex(cut=3)}}}$</td></tr>' \
+               f'{self.transient_rows()}</tbody></table>'
+
+    def transient_rows(self):
+        """
+        Returns the table rows of the last transient simulation
+
+        :return: HTML string, empty in the steady mode
+        """
+        if self.transient is None:
+            return ''
+        result = self.transient
+        if result['t_equilibrium'] is None:
+            reached = f'not reached within ${Variable(result["t"][-1], unit="s").rounded_latex(cut=1)}$'
+        else:
+            reached = f'${{t_{{eq}} = {Variable(result["t_equilibrium"], unit="s").rounded_latex(cut=1)}}}$'
+        overflow = ' - the tank overflows' if result['overflow'] else ''
+        return f'<tr><td class="tg-tdqd">Transient from $h_0 = {result["h"][0]:.3f} ~m$ with ' \
+               f'$\\frac{{dh}}{{dt}} = \\frac{{Q_{{in}} - n_{{holes}} \\cdot \\frac{{\\pi d^2_{{holes}}}}{{4}} ' \
+               f'\\cdot \\sqrt{{2 g h}}}}{{A}}$, $A = {self.area():.2f} ~m^2$, ' \
+               f'{len(result["t"]) - 1} adaptive steps</td></tr>' \
+               f'<tr><td class="tg-tdqd">Equilibrium {reached}{overflow}</td></tr>'
 
     def update(self, args):
         """
@@ -53,25 +372,51 @@ class Tank(Model):
         :param args: not used
         :return: None
         """
-        if self.canvas is not None:
-            t = threading.Thread(target=self.lerp_water, args=[0.01])  # self.canvas.on_client_ready(self.draw)
-            t.start()
+        self.stop()
+        if self.modeGroup.value == 'Transient':
+            self.transient = self.simulate(self.current_water_depth.real())
+            if self.canvas is not None:
+                self.cancelled = False
+                self.animation = threading.Thread(target=self.animate_transient, args=[self.transient], daemon=True)
+                self.animation.start()
+            else:
+                # without an animation the next change starts from the end of this transient
+                self.current_water_depth = Variable(float(self.transient['h'][-1]), unit='m')
+        else:
+            self.transient = None
+            if self.canvas is not None:
+                t = threading.Thread(target=self.lerp_water, args=[0.01])  # self.canvas.on_client_ready(self.draw)
+                t.start()
 
         if self.threejs_scene is not None:
             self.draw_holes3D(self.threejs_scene)
 
         super().update(args)
 
-    def set_threejs_scene(self, scene):
+    def set_threejs_scene(self, scene, camera=None, detail=None, viewport_height=600):
         """
         Sets the pythreejs scene for the 3D visualization
 
         :param scene: the pythreejs scene
+        :param camera: the camera of the renderer, used to choose the level of detail of the holes [Default: None, the
+                       shared camera of demo]
+        :param detail: the triangle budget of the scene, which is shared with the other objects of the scene
+                       [Default: None, a new SceneDetail for the camera]
+        :param viewport_height: the height of the renderer, only used for a new SceneDetail [px, Default: 600]
         :return: None
         """
         self.threejs_scene = scene
-
-    def __init__(self, holes, q: float, max_depth=1, max_holes=50, width=200, c=None, height=150):
+        if camera is not None:
+            self.threejs_camera = camera
+        if self.detail is not None and self.detail_owned:
+            self.detail.close()
+        self.detail_owned = detail is None
+        self.detail = detail if detail is not None else SceneDetail(self.threejs_camera,
+                                                                     viewport_height=viewport_height)
+        # the tank and the water are boxes of 12 triangles each
+        self.detail.add_fixed('tank', 24)
+
+    def __init__(self, holes, q: float, max_depth=1, max_holes=50, width=200, c=None, height=150, plot_class=MultiPlot):
         self.holes = holes
         self.hole_callback = self.holes + create_holes(max_holes - len(self.holes), self.holes[0].d)
         self.canvas = c
@@ -89,8 +434,11 @@ class Tank(Model):
         self.dHoles.observe(self.update_plots)
         self.q.observe(self.update_plots)
 
+        self.modeGroup = DropDownGroup(['Steady', 'Transient'], ['Animate towards the equilibrium depth',
+                                                                  'Integrate the filling and draining of the tank'])
+        self.modeWidget = BoxHorizontal([widgets.HTML(f"Mode"), self.modeGroup.display])
         self.params = [
-            ChangeableContainer([self.q, self.depth]),
+            ChangeableContainer([self.q, self.depth, self.modeWidget]),
             ChangeableContainer([HorizontalSpace(10)]),
             ChangeableContainer([self.nHoles, self.dHoles], alignment="flex-end"),
         ]
@@ -121,8 +469,18 @@ class Tank(Model):
         self.current_water_depth = self.get_depth()
 
         self.hole_meshes = []
-
-        self.plot = MultiPlot(width=5, height=5)
+        self.transient = None
+        self.cancelled = False
+        self.animation = None
+        self.hole_material = MeshPhongMaterial(color='lightblue')
+        self.hole_lod = None
+        self.hole_lod_diameter = None
+        self.threejs_scene = None
+        self.threejs_camera = camera
+        self.detail = None
+        self.detail_owned = False
+
+        self.plot = plot_class(width=5, height=5, blit=True)
         self.q_vars = np.linspace(0, 1, 100)
         self.d_vars = np.linspace(0.5 * 10 ** (-2), 10 * 10 ** (-2), 100)
         self.n_vars = np.array(range(5, 51))
@@ -133,11 +491,12 @@ class Tank(Model):
                                        xlim=[0.5 * 10 ** (-2), 10 * 10 ** (-2)], xlabel="d [m]", ylabel="h [m]", title="Diameter d")
         self.n_plot = self.plot.add_scatter(self.n_vars, (1 / (2 * G)) * ((4 * self.q.real()) / (self.n_vars * pymath.pi * self.dHoles.real() ** 2)) ** 2, color='orange',
                                        xlim=[5, 50], xlabel="n [#]", ylabel="h [m]", title="Number of Holes N")
-        self.plot.set_visible(self.in_flow_plot)
+        with self.plot.batch():
+            self.plot.set_visible(self.in_flow_plot)
 
-        self.plot.grid(self.in_flow_plot)
-        self.plot.grid(self.d_plot)
-        self.plot.grid(self.n_plot)
+            self.plot.grid(self.in_flow_plot)
+            self.plot.grid(self.d_plot)
+            self.plot.grid(self.n_plot)
 
         self.plot_box = BoxVertical([self.plot_selection.widget, self.plot.widget]).widget
 
@@ -164,15 +523,13 @@ class Tank(Model):
         :param args: catcher param
         :return: None
         """
-        self.plot.set_data(self.in_flow_plot, self.q_vars, (1 / (2 * G)) * ((4 * self.q_vars) / (self.nHoles.real() * pymath.pi * self.dHoles.real() ** 2)) ** 2)
-        self.plot.set_data(self.d_plot, self.d_vars, (1 / (2 * G)) * ((4 * self.q.real()) / (self.nHoles.real() * pymath.pi * self.d_vars ** 2)) ** 2)
-        self.plot.set_data(self.n_plot, self.n_vars, (1 / (2 * G)) * ((4 * self.q.real()) / (self.n_vars * pymath.pi * self.dHoles.real() ** 2)) ** 2, scatter=True)
-        self.plot.grid(self.in_flow_plot)
-        self.plot.grid(self.d_plot)
-        self.plot.grid(self.n_plot)
-        self.plot.mark(self.d_plot, self.dHoles.real(), self.get_depth().real())
-        self.plot.mark(self.n_plot, self.nHoles.real(), self.get_depth().real())
-        self.plot.mark(self.in_flow_plot, self.q.real(), self.get_depth().real())
+        with self.plot.batch():
+            self.plot.set_data(self.in_flow_plot, self.q_vars, (1 / (2 * G)) * ((4 * self.q_vars) / (self.nHoles.real() * pymath.pi * self.dHoles.real() ** 2)) ** 2)
+            self.plot.set_data(self.d_plot, self.d_vars, (1 / (2 * G)) * ((4 * self.q.real()) / (self.nHoles.real() * pymath.pi * self.d_vars ** 2)) ** 2)
+            self.plot.set_data(self.n_plot, self.n_vars, (1 / (2 * G)) * ((4 * self.q.real()) / (self.n_vars * pymath.pi * self.dHoles.real() ** 2)) ** 2, scatter=True)
+            self.plot.mark(self.d_plot, self.dHoles.real(), self.get_depth().real())
+            self.plot.mark(self.n_plot, self.nHoles.real(), self.get_depth().real())
+            self.plot.mark(self.in_flow_plot, self.q.real(), self.get_depth().real())
 
     def add_hole(self):
         """
@@ -236,7 +593,96 @@ class Tank(Model):
         d_holes = self.dHoles.real()
         n_holes = self.nHoles.real()
 
-        return Variable((1 / (2 * G)) * (((4 * self.q.real()) / (n_holes * pymath.pi * (d_holes ** 2))) ** 2), unit="m")
+        return Variable(equilibrium_depth(self.q.real(), n_holes, d_holes), unit="m")
+
+    def area(self):
+        """
+        Returns the plan area of the tank, which is width / 100 wide and TANK_DEPTH deep like the 3D-Visualization
+
+        :return: the area [m^2]
+        """
+        return self.width / M_TO_PIXELS * TANK_DEPTH
+
+    def simulate(self, h0, max_time=None, rtol=1e-6):
+        """
+        Integrates the water depth from h0 with the Dormand-Prince method until it is within EQUILIBRIUM_TOLERANCE of
+        the equilibrium. If the equilibrium depth is above the depth of the tank, the tank overflows and the equilibrium
+        is the full tank
+
+        :param h0: the initial water depth, clipped to the depth of the tank [m]
+        :param max_time: the end of the integration [s, Default: None, estimated from the time constant of the tank]
+        :param rtol: the relative tolerance of a step [Default: 1e-6]
+        :return: dict of the times 't' and depths 'h' of all steps, the equilibrium depth 'h_equilibrium', the time the
+                 equilibrium was reached 't_equilibrium' (None if it was not reached) and whether the tank overflows
+        """
+        q_in = self.q.real()
+        n_holes = self.nHoles.real()
+        d_holes = self.dHoles.real()
+        area = self.area()
+        depth = self.depth.real()
+        h_equilibrium = min(self.get_depth().real(), depth)
+        # water above the rim spills over at once
+        h0 = min(max(h0, 0.), depth)
+        if max_time is None:
+            max_time = float(integration_time(q_in, n_holes, d_holes, area, depth, h0, h_equilibrium))
+
+        def rate(t, h):
+            return tank_rate(h, q_in, n_holes, d_holes, area, depth)
+
+        def reached(t, h):
+            return bool(at_equilibrium(h, h_equilibrium, depth))
+
+        t, h = dormand_prince(rate, h0, max_time, rtol=rtol, stop=reached)
+        h = np.minimum(h, depth)
+        return {'t': t, 'h': h, 'h_equilibrium': h_equilibrium,
+                't_equilibrium': t[-1] if reached(t[-1], h[-1]) else None,
+                'overflow': self.get_depth().real() > depth}
+
+    def ensemble(self, times=None, h0=0.):
+        """
+        Simulates the tank for every combination of the slider grids q_vars, n_vars and d_vars, see tank_ensemble()
+
+        :param times: the output times of the depth cube [s, Default: None, no depth cube]
+        :param h0: the initial water depth [m, Default: 0, an empty tank]
+        :return: dict of cubes of shape (len(q_vars), len(n_vars), len(d_vars)), see tank_ensemble()
+        """
+        return tank_ensemble(self.q_vars, self.n_vars, self.d_vars, self.area(), self.depth.real(), h0, times)
+
+    def animate_transient(self, result, duration=5., fps=30):
+        """
+        Plays a simulated transient, compressed to the given duration. The current depth follows the animation, so a
+        change of the parameters can restart the integration from it
+
+        :param result: the result of simulate()
+        :param duration: the wall clock time of the whole animation [s, Default: 5]
+        :param fps: the frames per second [Default: 30]
+        :return: None
+        """
+        start_time = time.time()
+        t_end = result['t'][-1]
+        while not self.cancelled:
+            elapsed = min((time.time() - start_time) / duration, 1.)
+            h = float(np.interp(elapsed * t_end, result['t'], result['h']))
+            self.current_water_depth = Variable(h, unit='m')
+            with hold_canvas(self.canvas):
+                self.draw(None, h)
+                self.canvas.font = '12px sans-serif'
+                self.canvas.fill_style = 'black'
+                self.canvas.fill_text(f"t = {elapsed * t_end:.1f} s", 70, 15)
+            if elapsed >= 1:
+                break
+            time.sleep(1 / fps)
+
+    def stop(self):
+        """
+        Stops a running transient animation
+
+        :return: None
+        """
+        self.cancelled = True
+        if self.animation is not None and self.animation is not threading.current_thread():
+            self.animation.join()
+        self.animation = None
 
     def get_dimensions(self, x, y):
         """
@@ -282,11 +728,12 @@ class Tank(Model):
         """
         self.draw(None)
 
-    def draw(self, args):
+    def draw(self, args, h=None):
         """
         Draws the 2D-Visualization of the tank
 
         :param args: catcher variable for ipywidgets observe method
+        :param h: the water depth to draw [m, Default: None, the equilibrium depth]
         :return: None
         """
         self.canvas.clear()
@@ -302,8 +749,8 @@ class Tank(Model):
 
         # self.canvas.height = y_1 + 50
 
-        partial = self.get_depth().real() / self.depth.real()
-        overflow = partial > 1
+        partial = (self.get_depth().real() if h is None else h) / self.depth.real()
+        overflow = partial > 1 or (h is not None and h >= self.depth.real() and self.get_depth().real() > h)
         if overflow:
             wy_0 = y_0 - 5
             self.canvas.stroke_style = 'red'
@@ -472,54 +919,56 @@ class Tank(Model):
 
     def draw_holes3D(self, scene):
         """
-        Draws the Holes of the tank in 3D-Visualization
+        Draws the Holes of the tank in 3D-Visualization. The holes are registered with the triangle budget of the scene
+        (self.detail), which chooses the resolution of every hole from its projected size, holes of the same level
+        share one geometry
 
         :param scene: The 3D-Scene
         :return: None
         """
-        for hole_mesh in self.hole_meshes:
-            scene.remove(hole_mesh)
-            hole_mesh.geometry.exec_three_obj_method("dispose")
-        self.hole_meshes.clear()
-
+        if self.detail is None:
+            self.set_threejs_scene(scene)
         diameter = self.dHoles.real() / 5
         tw = self.width / 100
-        ref_hole = CylinderBufferGeometry(diameter, diameter, 1, 8, 4)
+        if self.hole_lod_diameter != diameter:
+            if self.hole_lod is not None:
+                self.hole_lod.dispose()
+            self.hole_lod = LevelOfDetail(lambda segments, h_segments: CylinderBufferGeometry(
+                diameter, diameter, 1, segments, h_segments), HOLE_LOD_LEVELS)
+            self.hole_lod_diameter = diameter
         y = -1.5
 
         offset = 10 - self.dHoles.value * 100 / tw
 
         #print(offset, diameter, tw)
 
-        hole = Mesh(ref_hole, material=MeshPhongMaterial(color='lightblue'),
-                    position=[0, y, 0], rotation=[pymath.pi, 0, 0, 'XYZ'])
-        scene.add(hole)
-        self.hole_meshes.append(hole)
+        positions = [[0, y, 0]]
         for i in range(1, self.nHoles.value // 8):
             if diameter * offset * i >= self.tank_rendering.position[0] + tw / 2 or diameter * offset * i >= self.tank_rendering.position[2] + self.tank_rendering.geometry.depth / 2:
-                return
-            hole = Mesh(ref_hole, material=MeshPhongMaterial(color='lightblue'), position=[diameter * offset * i * (-1), y, 0], rotation=[pymath.pi, 0, 0, 'XYZ'])
-            scene.add(hole)
-            self.hole_meshes.append(hole)
-            hole = Mesh(ref_hole, material=MeshPhongMaterial(color='lightblue'), position=[0, y, diameter * offset * i * (-1)], rotation=[pymath.pi, 0, 0, 'XYZ'])
-            scene.add(hole)
-            self.hole_meshes.append(hole)
-            hole = Mesh(ref_hole, material=MeshPhongMaterial(color='lightblue'), position=[diameter * offset * i * (1), y, 0], rotation=[pymath.pi, 0, 0, 'XYZ'])
-            scene.add(hole)
-            self.hole_meshes.append(hole)
-            hole = Mesh(ref_hole, material=MeshPhongMaterial(color='lightblue'), position=[0, y, diameter * offset * i * (1)], rotation=[pymath.pi, 0, 0, 'XYZ'])
-            scene.add(hole)
-            self.hole_meshes.append(hole)
-            hole = Mesh(ref_hole, material=MeshPhongMaterial(color='lightblue'), position=[diameter * offset * i, y, diameter * offset * i], rotation=[pymath.pi, 0, 0, 'XYZ'])
-            scene.add(hole)
-            self.hole_meshes.append(hole)
-            hole = Mesh(ref_hole, material=MeshPhongMaterial(color='lightblue'), position=[-diameter * offset * i, y, diameter * offset * i], rotation=[pymath.pi, 0, 0, 'XYZ'])
-            scene.add(hole)
-            self.hole_meshes.append(hole)
-            hole = Mesh(ref_hole, material=MeshPhongMaterial(color='lightblue'), position=[diameter * offset * i, y, -diameter * offset * i], rotation=[pymath.pi, 0, 0, 'XYZ'])
-            scene.add(hole)
-            self.hole_meshes.append(hole)
-            hole = Mesh(ref_hole, material=MeshPhongMaterial(color='lightblue'), position=[-diameter * offset * i, y, -diameter * offset * i], rotation=[pymath.pi, 0, 0, 'XYZ'])
+                break
+            r = diameter * offset * i
+            # every ring holds 8 holes, 4 on the axes and 4 on the diagonals
+            positions += [[-r, y, 0], [0, y, -r], [r, y, 0], [0, y, r], [r, y, r], [-r, y, r], [r, y, -r], [-r, y, -r]]
+
+        self.detail.set_group('holes', self.hole_lod, diameter, positions,
+                              lambda levels: self.place_holes(scene, positions, levels))
+        self.detail.select()
+
+    def place_holes(self, scene, positions, levels):
+        """
+        Replaces the hole meshes of the scene
+
+        :param scene: The 3D-Scene
+        :param positions: the positions of the holes
+        :param levels: the level of self.hole_lod of every hole
+        :return: None
+        """
+        for hole_mesh in self.hole_meshes:
+            scene.remove(hole_mesh)
+        self.hole_meshes.clear()
+        for position, level in zip(positions, levels):
+            hole = Mesh(self.hole_lod.get(level), material=self.hole_material, position=position,
+                        rotation=[pymath.pi, 0, 0, 'XYZ'])
             scene.add(hole)
             self.hole_meshes.append(hole)
 
@@ -1,7 +1,13 @@
 import abc
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+
 import ipywidgets as widgets
 import numpy as np
 from IPython.display import display, Latex, HTML
+from ipycanvas import MultiCanvas, hold_canvas
 from pythreejs import *
 
 CSS = HTML("""
@@ -587,20 +593,29 @@ class Demo:
     Class for setting up a Jupyter interactive Demo of any given implementation of Model
     """
 
-    def __init__(self, model: Model, drawable=None, extra_output=None, params=None, custom_css=""):
+    def __init__(self, model: Model, drawable=None, extra_output=None, params=None, custom_css="", loop=None):
         """
         Initializes the demo object with the interactable params of the model and optionally a drawable widget
 
         :param params: the interactive changeable params (UI elements) of this specific model
         :param model: the specific model to calculate and draw
         :param drawable: [optional] a canvas or similar widget to draw on
-        """
+        :param loop: the event loop of the kernel, on which the redraws of the plots are coalesced, see
+                     set_redraw_loop() [Default: None, the running loop of the kernel]
+        """
+        if loop is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                pass
+        set_redraw_loop(loop)
         self.model = model
         self.params = self.model.params
         self.canvas = drawable
         self.model.set_callback(self)
         self.widget_output = widgets.Output()
         self.output = widgets.Output()
+        self.report_widget = None
         self.extra_output = extra_output
         self.css = custom_css
         for container in self.params:
@@ -645,6 +660,7 @@ class Demo:
         :return: None
         """
         self.output.clear_output(wait=True)
+        self.report_widget = None
         op = widgets.HTMLMath(self.model.calculate(), layout=widgets.Layout(width='100%'))
         if self.extra_output is not None:
             op = widgets.HBox(
@@ -652,14 +668,29 @@ class Demo:
         with self.output:
             display(op)
 
+    def report(self, html):
+        """
+        Shows intermediate results of a long running computation below the output of the model. The report widget is
+        created once and then only its value is replaced, until the next update_output() clears it
+
+        :param html: the HTML (with LaTeX) to show
+        :return: None
+        """
+        if self.report_widget is None:
+            self.report_widget = widgets.HTMLMath(html, layout=widgets.Layout(width='100%'))
+            with self.output:
+                display(self.report_widget)
+        else:
+            self.report_widget.value = html
+
 
 class PipeDemo(Demo):
     """
     Implementation of Demo specifically for Pipe Models
     """
 
-    def __init__(self, model: Model, drawable=None, extra_output=None, custom_css=""):
-        super().__init__(model, drawable=drawable, extra_output=extra_output, custom_css=custom_css)
+    def __init__(self, model: Model, drawable=None, extra_output=None, custom_css="", loop=None):
+        super().__init__(model, drawable=drawable, extra_output=extra_output, custom_css=custom_css, loop=loop)
 
     def show(self):
         """
@@ -679,15 +710,537 @@ class PipeDemo(Demo):
         self.update_output()
 
 
-import matplotlib.pyplot as plt
 
+def pyplot():
+    """
+    Imports matplotlib.pyplot on first use, so that models drawing on the canvas backend never load matplotlib
+
+    :return: the matplotlib.pyplot module
+    """
+    import matplotlib.pyplot as plt
+    return plt
+
+_pending_redraws = set()
+_redraw_lock = threading.Lock()
+_redraw_loop = None
+
+
+def set_redraw_loop(loop):
+    """
+    Sets the event loop, on which redraws are coalesced, usually the loop of the Jupyter kernel, see Demo
+
+    :param loop: the asyncio event loop or None
+    :return: None
+    """
+    global _redraw_loop
+    _redraw_loop = loop
+
+
+def schedule_redraw(plot):
+    """
+    Schedules the redraw of a plot wrapper at the end of the current event. Multiple requests for the same plot within
+    one event are coalesced into a single render. Redraws are only ever scheduled on the loop of the calling thread:
+    without a running event loop (e.g. outside of a Jupyter kernel) the main thread redraws immediately, while other
+    threads only leave the plot dirty and render it with their own flush()
+
+    :param plot: the DeferredRedraw object to redraw
+    :return: None
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    if loop is None or (_redraw_loop is not None and loop is not _redraw_loop):
+        if threading.current_thread() is threading.main_thread():
+            plot.redraw()
+        return
+    with _redraw_lock:
+        first = len(_pending_redraws) == 0
+        _pending_redraws.add(plot)
+    if first:
+        loop.call_soon(flush_redraws)
+
+
+def flush_redraws():
+    """
+    Redraws all plots with pending redraw requests
+
+    :return: None
+    """
+    with _redraw_lock:
+        plots = list(_pending_redraws)
+        _pending_redraws.clear()
+    for plot in plots:
+        plot.redraw()
+
+
+class DeferredRedraw:
+    """
+    Base class for the matplotlib wrappers, which coalesces redraws. Mutating calls only mark the figure as dirty and a
+    single render happens at the end of the current event or at the end of a batch() block
+    """
+
+    def __init__(self):
+        self.blitter = None
+        self.dirty = False
+        self.dirty_axes = set()
+        self.batch_depth = 0
+        # the figure may be changed by an animation thread and the event loop at the same time
+        self.redraw_lock = threading.RLock()
+
+    def mark_dirty(self, ax=None):
+        """
+        Marks the figure as dirty and schedules a redraw
+
+        :param ax: if given and the plot is blitting, only the animated artists of this axes are redrawn
+                   [Default: None, the whole figure is redrawn]
+        :return: None
+        """
+        with self.redraw_lock:
+            if ax is None or not self.partial_redraw():
+                self.dirty = True
+            else:
+                self.dirty_axes.add(ax)
+            batched = self.batch_depth > 0
+        if not batched:
+            schedule_redraw(self)
+
+    @contextmanager
+    def batch(self):
+        """
+        Context manager, which defers all redraws of the figure until the end of the with-block
+
+        :return: None
+        """
+        with self.redraw_lock:
+            self.batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self.redraw_lock:
+                self.batch_depth -= 1
+                done = self.batch_depth == 0
+            if done:
+                self.redraw()
+
+    def redraw(self):
+        """
+        Renders the pending changes of the figure, either by a full draw or by only redrawing the dirty axes
+
+        :return: None
+        """
+        with self.redraw_lock:
+            dirty, dirty_axes = self.dirty, self.dirty_axes
+            self.dirty, self.dirty_axes = False, set()
+            if dirty:
+                self.draw_figure()
+            elif dirty_axes:
+                self.draw_animated(dirty_axes)
+
+    def partial_redraw(self):
+        """
+        Returns whether single axes can be redrawn without rendering the whole figure
+
+        :return: True, if the plot is blitting, else False
+        """
+        return self.blitter is not None
+
+    def draw_figure(self):
+        """
+        Renders the whole figure
+
+        :return: None
+        """
+        self.widget.draw()
+        self.widget.flush_events()
+
+    def draw_animated(self, axes):
+        """
+        Redraws only the animated artists of the given axes
+
+        :param axes: the axes to redraw
+        :return: None
+        """
+        for ax in axes:
+            self.blitter.update(ax)
+
+
+class BlitManager:
+    """
+    Helper class for blitting matplotlib figures. The static background of every registered axes is cached after a
+    full draw, so that only the animated artists (markers, moving lines, updated curves) have to be redrawn
+    """
+
+    def __init__(self, canvas):
+        """
+        Initializes the manager for the given figure canvas and hooks it into the canvas' draw event
+
+        :param canvas: the matplotlib figure canvas to blit on
+        """
+        self.canvas = canvas
+        self.artists = {}
+        self.backgrounds = {}
+        self.scrolling = set()
+        self.cid = self.canvas.mpl_connect('draw_event', self.on_draw)
+
+    def add_artist(self, artist):
+        """
+        Registers an artist as animated, so it is left out of the cached background and redrawn on every update
+
+        :param artist: the matplotlib artist to animate, must already be added to an axes
+        :return: the artist
+        """
+        artist.set_animated(True)
+        artists = self.artists.setdefault(artist.axes, [])
+        if artist not in artists:
+            artists.append(artist)
+        return artist
+
+    def remove_artist(self, artist):
+        """
+        Unregisters an animated artist
+
+        :param artist: the artist to remove
+        :return: None
+        """
+        for artists in self.artists.values():
+            if artist in artists:
+                artists.remove(artist)
+
+    def set_scrolling(self, ax):
+        """
+        Sets the axes to scrolling-x mode. The x-axis (ticks, tick labels and vertical grid lines) is animated as well,
+        so the x-limits of the axes can change without invalidating the cached background
+
+        :param ax: the axes to scroll
+        :return: None
+        """
+        self.scrolling.add(ax)
+        self.add_artist(ax.xaxis)
+
+    def is_scrolling(self, ax):
+        """
+        Returns whether the given axes is in scrolling-x mode
+
+        :param ax: the axes to check
+        :return: True, if the axes is scrolling, else False
+        """
+        return ax in self.scrolling
+
+    def region(self, ax):
+        """
+        Returns the region of the canvas that has to be cached and blitted for the given axes
+
+        :param ax: the axes
+        :return: the bounding box of the region
+        """
+        if ax in self.scrolling:
+            return self.canvas.figure.bbox
+        return ax.bbox
+
+    def invalidate(self):
+        """
+        Drops the cached backgrounds, so the next update does a full draw
+
+        :return: None
+        """
+        self.backgrounds.clear()
+
+    def on_draw(self, event):
+        """
+        Callback for the canvas' draw event. Caches the fresh backgrounds and draws the animated artists on top of them
+
+        :param event: the matplotlib draw event
+        :return: None
+        """
+        self.backgrounds.clear()
+        for ax in self.artists:
+            if ax.get_visible():
+                self.backgrounds[ax] = self.canvas.copy_from_bbox(self.region(ax))
+                self.draw_animated(ax)
+
+    def draw_animated(self, ax):
+        """
+        Draws all animated artists of the given axes
+
+        :param ax: the axes
+        :return: None
+        """
+        for artist in self.artists[ax]:
+            self.canvas.figure.draw_artist(artist)
+
+    def update(self, ax=None):
+        """
+        Redraws the animated artists of the given axes (or all registered axes) on top of their cached background.
+        Falls back to a full draw if there is no valid background yet
+
+        :param ax: the axes to update [Default: None, updates all axes]
+        :return: None
+        """
+        axes = [ax] if ax is not None else list(self.artists)
+        axes = [a for a in axes if a in self.artists and a.get_visible()]
+        if any(a not in self.backgrounds for a in axes):
+            self.canvas.draw()
+        else:
+            for a in axes:
+                self.canvas.restore_region(self.backgrounds[a])
+                self.draw_animated(a)
+                self.canvas.blit(self.region(a))
+        self.canvas.flush_events()
+
+
+def lttb(x, y, n):
+    """
+    Downsamples a series to n points with the largest-triangle-three-buckets algorithm. The first and last point are
+    kept, every bucket in between contributes the point spanning the largest triangle with the centroids of its
+    neighbouring buckets. Anchoring the triangles at the previous centroid instead of the previously selected point
+    makes the buckets independent, so all of them are evaluated at once on a padded 2D view of the series
+
+    :param x: the x-values, sorted ascending
+    :param y: the y-values
+    :param n: the number of points to keep
+    :return: tuple of the downsampled x- and y-values
+    """
+    count = len(x)
+    if n >= count or n < 3:
+        return x, y
+    edges = np.linspace(1, count - 1, n - 1).astype(int)
+    starts, ends = edges[:-1], edges[1:]
+    sizes = ends - starts
+    # one row per bucket, padded to the largest bucket
+    idx = starts[:, np.newaxis] + np.arange(sizes.max())
+    valid = idx < ends[:, np.newaxis]
+    idx = np.where(valid, idx, starts[:, np.newaxis])
+    bx, by = x[idx], y[idx]
+    cx = np.where(valid, bx, 0).sum(axis=1) / sizes
+    cy = np.where(valid, by, 0).sum(axis=1) / sizes
+    ax = np.concatenate(([x[0]], cx[:-1]))[:, np.newaxis]
+    ay = np.concatenate(([y[0]], cy[:-1]))[:, np.newaxis]
+    nx = np.concatenate((cx[1:], [x[-1]]))[:, np.newaxis]
+    ny = np.concatenate((cy[1:], [y[-1]]))[:, np.newaxis]
+    area = np.abs((ax - nx) * (by - ay) - (ax - bx) * (ny - ay))
+    area[~valid] = -1
+    keep = np.empty(n, dtype=int)
+    keep[0] = 0
+    keep[-1] = count - 1
+    keep[1:-1] = idx[np.arange(len(starts)), np.argmax(area, axis=1)]
+    return x[keep], y[keep]
+
+
+def minmax_envelope(x, y, n):
+    """
+    Downsamples a series to about n points by keeping the minimum and maximum of n / 2 equally sized buckets.
+    Unlike lttb() every peak of the series is preserved
+
+    :param x: the x-values, sorted ascending
+    :param y: the y-values
+    :param n: the maximum number of points to keep
+    :return: tuple of the downsampled x- and y-values
+    """
+    count = len(x)
+    buckets = max(n // 2, 1)
+    if n >= count:
+        return x, y
+    size = int(np.ceil(count / buckets))
+    idx = np.minimum(np.arange(buckets * size).reshape(buckets, size), count - 1)
+    rows = np.arange(buckets)
+    imin = idx[rows, np.argmin(y[idx], axis=1)]
+    imax = idx[rows, np.argmax(y[idx], axis=1)]
+    keep = np.unique(np.concatenate(([0], imin, imax, [count - 1])))
+    return x[keep], y[keep]
+
+
+def decimate(x, y, xlim=None, n=1000, method='lttb'):
+    """
+    Reduces a series to the points needed for displaying it. Only the points inside the x-limits (plus one neighbour on
+    each side) are kept and downsampled to at most about n points, so the number of points is bounded by the pixel
+    width of the plot instead of the length of the series
+
+    :param x: the x-values, a series, which is not sorted ascending, is returned unchanged
+    :param y: the y-values
+    :param xlim: the visible x-limits [Default: None, the whole series is visible]
+    :param n: the maximum number of points, usually the pixel width of the plot [Default: 1000]
+    :param method: 'lttb' (see lttb()), 'minmax' (see minmax_envelope()) or None to disable downsampling
+                   [Default: 'lttb']
+    :return: tuple of the decimated x- and y-values
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if method is None or x.ndim != 1 or len(x) <= n:
+        return x, y
+    # searchsorted and the buckets of the downsampling are only valid for sorted x-values, e.g. not for a phase plot
+    if not np.all(x[1:] >= x[:-1]):
+        return x, y
+    if xlim is not None:
+        i0 = max(int(np.searchsorted(x, xlim[0])) - 1, 0)
+        i1 = min(int(np.searchsorted(x, xlim[1], side='right')) + 1, len(x))
+        x, y = x[i0:i1], y[i0:i1]
+    if method == 'minmax':
+        return minmax_envelope(x, y, n)
+    return lttb(x, y, n)
+
+
+class RunningMoments:
+    """
+    Streaming mean, variance, minimum and maximum of a sequence of chunks. Each chunk is reduced with numpy and merged
+    into the running totals with the parallel form of Welford's algorithm (Chan et al.), so the memory is constant and
+    the result does not suffer from the cancellation of the naive sum of squares
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.nonfinite = 0
+        self.mean = 0.
+        self.m2 = 0.
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        """
+        Merges a chunk of values into the running statistics. NaN and infinite values are only counted in nonfinite
+
+        :param values: numpy array of values
+        :return: None
+        """
+        values = np.asarray(values, dtype=float).ravel()
+        finite = np.isfinite(values)
+        self.nonfinite += len(values) - int(finite.sum())
+        values = values[finite]
+        n = len(values)
+        if n == 0:
+            return
+        mean = values.mean()
+        m2 = ((values - mean) ** 2).sum()
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta ** 2 * self.count * n / total
+        self.count = total
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+
+    def variance(self, ddof=1):
+        """
+        Returns the variance of all values seen so far
+
+        :param ddof: the delta degrees of freedom [Default: 1, the sample variance]
+        :return: the variance, NaN if there are not enough values
+        """
+        return self.m2 / (self.count - ddof) if self.count > ddof else np.nan
+
+    def std(self, ddof=1):
+        """
+        Returns the standard deviation of all values seen so far
+
+        :param ddof: the delta degrees of freedom [Default: 1]
+        :return: the standard deviation
+        """
+        return np.sqrt(self.variance(ddof))
+
+
+class StreamingHistogram:
+    """
+    Fixed-size histogram of a sequence of chunks, from which quantiles are interpolated. The range is taken from the
+    first chunk and doubled (by merging neighbouring bins) whenever later values fall outside, so the memory stays
+    bounded by the number of bins for any number of values. The number of doublings per chunk is bounded, values that
+    are still outside are counted in the outermost bins
+    """
+
+    def __init__(self, bins=256, max_doublings=64):
+        """
+        Initializes an empty histogram
+
+        :param bins: the number of bins, must be even [Default: 256]
+        :param max_doublings: the maximum number of doublings of the range per chunk [Default: 64]
+        """
+        self.bins = bins + bins % 2
+        self.max_doublings = max_doublings
+        self.counts = np.zeros(self.bins, dtype=np.int64)
+        self.nonfinite = 0
+        self.clipped = 0
+        self.lo = None
+        self.hi = None
+
+    def edges(self):
+        """
+        Returns the bin edges
+
+        :return: numpy array of bins + 1 edges
+        """
+        return np.linspace(self.lo, self.hi, self.bins + 1)
+
+    def grow(self, lo, hi):
+        """
+        Doubles the range of the histogram until it contains [lo, hi], at most max_doublings times and only as long as
+        the range stays finite
+
+        :param lo: the smallest value to cover
+        :param hi: the largest value to cover
+        :return: True, if the range contains [lo, hi]
+        """
+        half = self.bins // 2
+        for _ in range(self.max_doublings):
+            if lo >= self.lo and hi <= self.hi:
+                return True
+            width = self.hi - self.lo
+            if not np.isfinite(self.hi + width) or not np.isfinite(self.lo - width):
+                return False
+            merged = self.counts.reshape(half, 2).sum(axis=1)
+            self.counts = np.zeros(self.bins, dtype=np.int64)
+            if hi > self.hi:
+                self.counts[:half] = merged
+                self.hi += width
+            else:
+                self.counts[half:] = merged
+                self.lo -= width
+        return lo >= self.lo and hi <= self.hi
+
+    def update(self, values):
+        """
+        Adds a chunk of values to the histogram. NaN and infinite values are not binned but counted in nonfinite,
+        values beyond the bounded growth of the range are counted in clipped and in the outermost bins
 
-class Plot:
+        :param values: numpy array of values
+        :return: None
+        """
+        values = np.asarray(values, dtype=float).ravel()
+        finite = np.isfinite(values)
+        self.nonfinite += len(values) - int(finite.sum())
+        values = values[finite]
+        if len(values) == 0:
+            return
+        lo, hi = values.min(), values.max()
+        if self.lo is None:
+            margin = max(hi - lo, abs(hi), 1e-12) * 0.05
+            self.lo, self.hi = lo - margin, hi + margin
+        if not self.grow(lo, hi):
+            self.clipped += int(np.count_nonzero((values < self.lo) | (values > self.hi)))
+        with np.errstate(over='ignore', invalid='ignore'):
+            position = (values - self.lo) / (self.hi - self.lo) * self.bins
+        index = np.clip(position, 0, self.bins - 1).astype(np.intp)
+        self.counts += np.bincount(index, minlength=self.bins)
+
+    def quantile(self, p):
+        """
+        Interpolates quantiles from the cumulative histogram, the error is at most one bin width
+
+        :param p: the probability or a numpy array of probabilities in [0, 1]
+        :return: the quantile(s)
+        """
+        total = self.counts.sum()
+        if total == 0:
+            return np.full(np.shape(p), np.nan)
+        cumulative = np.concatenate(([0], np.cumsum(self.counts))) / total
+        return np.interp(p, cumulative, self.edges())
+
+
+class Plot(DeferredRedraw):
     """
     Wrapper class for matplotlib.pyplot
     """
 
-    def __init__(self, x, y, width=5, height=3.5, title="Plot", xlabel="x", ylabel="y", xlim=None, ylim=None):
+    def __init__(self, x, y, width=5, height=3.5, title="Plot", xlabel="x", ylabel="y", xlim=None, ylim=None,
+                 blit=False, scroll=False, decimation='lttb'):
         """
         Initializes the plot with given values
 
@@ -700,15 +1253,20 @@ class Plot:
         :param ylabel: The label of the y-axis [Default: "y"]
         :param xlim: The x-limits of the plot [Default: None]
         :param ylim: The y-limits of the plot [Default: None]
+        :param blit: Whether the plot should be updated by blitting, see Plot::use_blit() [Default: False]
+        :param scroll: Whether the x-axis should scroll while blitting, see Plot::use_blit() [Default: False]
+        :param decimation: The downsampling method for long series, see decimate() [Default: 'lttb']
         """
+        super().__init__()
         self.x = x
         self.y = y
+        self.decimation = decimation
         self.title = title
         self.xlabel = xlabel
         self.ylabel = ylabel
         self.xlim = xlim
         self.ylim = ylim
-        self.fig, self.ax = plt.subplots(figsize=(width, height))
+        self.fig, self.ax = pyplot().subplots(figsize=(width, height))
         self.ax.set_title(title)
         self.pl = self.ax.plot(x, y)[0]
         self.ax.set_xlabel(self.xlabel)
@@ -717,11 +1275,55 @@ class Plot:
         self.ax.set_ylim(ylim)
         self.widget = self.fig.canvas
         self.widget.header_visible = False
+        self.update_data()
+        if blit:
+            self.use_blit(scroll)
+
+    def update_data(self):
+        """
+        Hands the decimated data of the visible x-range to the line of the plot
+
+        :return: None
+        """
+        self.pl.set_data(*decimate(self.x, self.y, self.xlim, int(self.ax.bbox.width), self.decimation))
+
+    def use_blit(self, scroll=False):
+        """
+        Switches the plot to blitting mode. The static background is cached and flush() only redraws the lines of the
+        plot. In scrolling-x mode the x-axis is animated as well, so set_xlim() does not invalidate the background
+
+        :param scroll: Whether the x-axis should scroll [Default: False]
+        :return: None
+        """
+        if self.blitter is None:
+            self.blitter = BlitManager(self.widget)
+        for line in self.ax.lines:
+            self.blitter.add_artist(line)
+        if scroll:
+            self.blitter.set_scrolling(self.ax)
+            for text in self.ax.texts:
+                self.blitter.add_artist(text)
+        self.blitter.invalidate()
+        self.mark_dirty()
+
+    def scrolling(self):
+        """
+        Returns whether the x-axis of the plot scrolls without redrawing the background
+
+        :return: True, if the plot is blitting in scrolling-x mode, else False
+        """
+        return self.blitter is not None and self.blitter.is_scrolling(self.ax)
 
     def update_plot(self, x=None, y=None, title=None, xlabel=None, ylabel=None, xlim=None, ylim=None):
         """
         Updates the plot with given values, see further descriptions at Plot::__init__()
         """
+        if title is not None or xlabel is not None or ylabel is not None or ylim is not None:
+            self.mark_dirty()
+        elif xlim is not None and not self.scrolling():
+            self.mark_dirty()
+        else:
+            self.mark_dirty(self.ax)
         if x is not None:
             self.x = x
         if y is not None:
@@ -732,20 +1334,20 @@ class Plot:
         self.xlim = xlim if xlim is not None else self.xlim
         self.ylim = ylim if ylim is not None else self.ylim
         self.ax.set_title(self.title)
-        self.pl.set_data(self.x, self.y)
         self.ax.set_xlabel(self.xlabel)
         self.ax.set_ylabel(self.ylabel)
         self.ax.set_xlim(self.xlim)
         self.ax.set_ylim(self.ylim)
+        self.update_data()
 
     def flush(self):
         """
-        Flushes buffered events of the plot
+        Flushes buffered events of the plot, renders all pending changes immediately
 
         :return: None
         """
-        self.widget.draw()
-        # self.widget.flush_events()
+        with self.batch():
+            self.mark_dirty(self.ax)
 
     def set_data(self, x, y):
         """
@@ -755,7 +1357,10 @@ class Plot:
         :param y: the function of the plot
         :return: None
         """
-        self.ax.set_data(x, y)
+        self.x = x
+        self.y = y
+        self.update_data()
+        self.mark_dirty(self.ax)
 
     def set_xlim(self, xlim):
         """
@@ -766,6 +1371,8 @@ class Plot:
         """
         self.xlim = xlim
         self.ax.set_xlim(self.xlim)
+        self.update_data()
+        self.mark_dirty(self.ax if self.scrolling() else None)
 
     def grid(self):
         """
@@ -774,6 +1381,7 @@ class Plot:
         :return: None
         """
         self.ax.grid()
+        self.mark_dirty()
 
     def add_line(self, x, color='gray', label=None):
         """
@@ -783,8 +1391,14 @@ class Plot:
         :return: None
         """
         line = self.ax.axvline(x=x, color=color)
+        text = None
         if label is not None:
-            self.ax.text(x + 0.5, self.ax.get_ylim()[1] / 2, label)
+            text = self.ax.text(x + 0.5, self.ax.get_ylim()[1] / 2, label)
+        if self.blitter is not None:
+            self.blitter.add_artist(line)
+            if text is not None and self.scrolling():
+                self.blitter.add_artist(text)
+        self.mark_dirty()
         return line
 
     def update_line(self, line, x):
@@ -796,6 +1410,7 @@ class Plot:
         :return: None
         """
         line.set_xdata(x)
+        self.mark_dirty(self.ax)
 
     def plot(self, x, y):
         """
@@ -805,8 +1420,17 @@ class Plot:
         :param y: the function of the plot
         :return: None
         """
-        [l.remove() for l in self.ax.lines]
+        for l in list(self.ax.lines):
+            if self.blitter is not None:
+                self.blitter.remove_artist(l)
+            l.remove()
+        self.x = x
+        self.y = y
         self.pl = self.ax.plot(x, y)[0]
+        self.update_data()
+        if self.blitter is not None:
+            self.blitter.add_artist(self.pl)
+        self.mark_dirty()
 
     def sleep(self, seconds):
         """
@@ -815,28 +1439,34 @@ class Plot:
         :param seconds: the amount of seconds
         :return: None
         """
-        plt.pause(seconds)
+        if self.blitter is not None:
+            # plt.pause() would trigger a full redraw of the figure
+            time.sleep(seconds)
+            return
+        pyplot().pause(seconds)
         pass
 
 
-class MarkerPlot:
+class MarkerPlot(DeferredRedraw):
     """
     Helper Class for including a matplotlib Plot with a moveable marker
     """
 
-    def __init__(self, x, y, width=5, height=3.5, title="Plot", xlabel="x", ylabel="y"):
+    def __init__(self, x, y, width=5, height=3.5, title="Plot", xlabel="x", ylabel="y", blit=False):
+        super().__init__()
         self.x = x
         self.y = y
         self.title = title
         self.xlabel = xlabel
         self.ylabel = ylabel
-        self.fig, self.ax = plt.subplots(figsize=(width, height))
+        self.fig, self.ax = pyplot().subplots(figsize=(width, height))
         self.ax.set_title(title)
         self.ax.plot(x, y)
         self.ax.set_xlabel(self.xlabel)
         self.ax.set_ylabel(self.ylabel)
         self.ax.set_ylim([-0.25, 0.25])
         self.widget = self.fig.canvas
+        self.blitter = BlitManager(self.widget) if blit else None
         self.marker = None
         self.mark(0, 0)
 
@@ -859,9 +1489,10 @@ class MarkerPlot:
         self.ax.set_xlabel(self.xlabel)
         self.ax.set_ylabel(self.ylabel)
         self.ax.set_ylim([-0.5, 0.5])
+        if self.blitter is not None and self.marker is not None:
+            self.blitter.remove_artist(self.marker)
         self.marker = None
-        self.widget.draw()
-        self.widget.flush_events()
+        self.mark_dirty()
 
     def mark(self, x, y, symbol='o'):
         """
@@ -876,10 +1507,11 @@ class MarkerPlot:
         self.marker_pos = (x, y)
 
         if self.marker is None:
-            self.marker = plt.plot([x], [y], marker=symbol)[0]
+            self.marker = self.ax.plot([x], [y], marker=symbol)[0]
+            if self.blitter is not None:
+                self.blitter.add_artist(self.marker)
         self.marker.set_data([x], [y])
-        self.widget.draw()
-        self.widget.flush_events()
+        self.mark_dirty(self.ax)
 
     def add_line(self, x, color='gray', label=None):
         """
@@ -891,8 +1523,7 @@ class MarkerPlot:
         self.ax.axvline(x=x, color=color)
         if label is not None:
             self.ax.text(x + 0.5, self.ax.get_ylim()[1] / 2, label)
-        self.widget.draw()
-        self.widget.flush_events()
+        self.mark_dirty()
 
     def grid(self, axis='both', color='gray', linestyle='-', linewidth=0.2):
         """
@@ -905,8 +1536,11 @@ class MarkerPlot:
         :return: None
         """
         self.ax.grid(axis=axis, color=color, linestyle=linestyle, linewidth=linewidth)
-        self.widget.draw()
-        self.widget.flush_events()
+        self.mark_dirty()
+
+
+LOD_LEVELS = ((64, 16), (32, 8), (16, 4), (8, 1))
+TRIANGLE_BUDGET = 200000
 
 
 def from_geometry(geom):
@@ -1143,80 +1777,434 @@ def lerp(v0, v1, t):
     return (1 - t) * v0 + t * v1
 
 
-class MultiPlot:
+def cylinder_triangles(segments, h_segments):
     """
-    Wrapper class for matplotlib.pyplot which supports multiple plots on one figure
+    Returns the number of triangles of a closed cylinder
+
+    :param segments: the number of segments around the cylinder
+    :param h_segments: the number of segments along the cylinder
+    :return: the number of triangles of the sides and both caps
     """
+    return 2 * segments * h_segments + 2 * segments
 
-    def __init__(self, width=3, height=3):
-        self.width = width
-        self.height = height
-        self.clear()
 
-    def add_plot(self, x, y, color='blue', xlim=None, ylim=None, xlabel=None, ylabel=None, title=None):
+def projected_size(radius, positions, camera=camera, viewport_height=600):
+    """
+    Estimates the on-screen radius of objects from their distance to a perspective camera
+
+    :param radius: the radius of the objects (scalar or array)
+    :param positions: the positions of the objects, array of shape (n, 3)
+    :param camera: the pythreejs PerspectiveCamera [Default: the shared camera of this module]
+    :param viewport_height: the height of the renderer [px, Default: 600]
+    :return: numpy array of the projected radii [px]
+    """
+    distance = np.linalg.norm(np.atleast_2d(positions) - np.asarray(camera.position, dtype=float), axis=-1)
+    focal = viewport_height / 2 / np.tan(np.radians(camera.fov) / 2)
+    return radius * focal / np.maximum(distance, camera.near)
+
+
+def select_levels(lods, pixels, budget=TRIANGLE_BUDGET):
+    """
+    Picks a level for every object of several LevelOfDetail groups, which share one triangle budget. Every object
+    starts at the level its projected size asks for, then all objects are coarsened by the same number of levels until
+    the scene fits into the budget. The totals of all coarsening steps are evaluated at once
+
+    :param lods: list of LevelOfDetail objects
+    :param pixels: list of arrays with the projected radii of the objects of each group [px]
+    :param budget: the maximum number of triangles of the scene [Default: TRIANGLE_BUDGET]
+    :return: list of integer arrays with the level of every object
+    """
+    depth = max(len(lod.levels) for lod in lods)
+    bias = np.arange(depth)[:, np.newaxis]
+    preferred = [lod.preferred(np.atleast_1d(p)) for lod, p in zip(lods, pixels)]
+    candidates = [np.minimum(level + bias, len(lod.levels) - 1) for lod, level in zip(lods, preferred)]
+    totals = sum(lod.triangles[levels].sum(axis=1) for lod, levels in zip(lods, candidates))
+    fits = np.flatnonzero(totals <= budget)
+    step = fits[0] if len(fits) > 0 else depth - 1
+    return [levels[step] for levels in candidates]
+
+
+class LevelOfDetail:
+    """
+    Several resolutions of one generated mesh, ordered from fine to coarse. The geometries are built lazily by a factory
+    and cached, so objects of the same level share one geometry on the client
+    """
+
+    def __init__(self, factory, levels=LOD_LEVELS, triangles=cylinder_triangles, pixels_per_segment=6):
         """
-        Adds a plot with range x and function y to the figure
+        Initializes the levels without building any geometry
 
-        :param x: the x-range of the plot
-        :param y: the function of the plot
-        :param color: the color of the line of the plot
-        :param xlim: the limits of the x-axis
-        :param ylim: the limits of the y-axis
-        :param xlabel: the label of the x-axis
-        :param ylabel: the label of the y-axis
-        :param title: the title of the plot
-        :return: the index of the added plot
+        :param factory: callable, which builds the mesh for the arguments of one level
+        :param levels: tuple of argument tuples for the factory, the first entry is the number of segments around the
+                       mesh [Default: LOD_LEVELS]
+        :param triangles: callable, which returns the number of triangles for the arguments of one level
+                          [Default: cylinder_triangles]
+        :param pixels_per_segment: the on-screen length of one segment, that is fine enough [px, Default: 6]
         """
-        self.axes[-1].plot(x, y, color=color)
-        self.marker.append(None)
-        self.mark(len(self.axes) - 1, x[0], y[0])
-        return self.add_ax(xlim, ylim, xlabel, ylabel, title)
+        self.factory = factory
+        self.levels = levels
+        self.triangles = np.array([triangles(*level) for level in levels])
+        self.segments = np.array([level[0] for level in levels])
+        self.pixels_per_segment = pixels_per_segment
+        self.cache = {}
 
-    def add_scatter(self, x, y, color='blue', xlim=None, ylim=None, xlabel=None, ylabel=None, title=None):
+    def get(self, level):
         """
-        Adds a scatter plot with range x and function y to the figure
-        See add_plot.params for detailed explanation of the params
+        Returns the mesh of the given level, it is built on first use
 
-        :return: the index of the added plot
+        :param level: the index of the level
+        :return: the result of the factory
         """
-        self.axes[-1].scatter(x, y, color=color)
-        self.marker.append(None)
-        self.mark(len(self.axes) - 1, x[0], y[0])
-        return self.add_ax(xlim, ylim, xlabel, ylabel, title, color=color)
+        level = int(level)
+        if level not in self.cache:
+            self.cache[level] = self.factory(*self.levels[level])
+        return self.cache[level]
 
-    def add_ax(self, xlim=None, ylim=None, xlabel=None, ylabel=None, title=None, color=None):
+    def preferred(self, pixels):
         """
-        Function that implements the common functionality for adding (scatter) plots to the figure
-        See add_plot.params for detailed explanation of the params
+        Returns the finest level, whose segments are not shorter than pixels_per_segment on screen
 
-        :return: the index of the added plot
+        :param pixels: the projected radii (scalar or array) [px]
+        :return: integer array of the levels
         """
-        self.ax_data[self.axes[-1]] = {'xlim': xlim, 'ylim': ylim, 'xlabel': xlabel, 'ylabel': ylabel, 'title': title,
-                                       'color': color}
-        self.axes[-1].set_xlabel(xlabel)
-        self.axes[-1].set_ylabel(ylabel)
-        self.axes[-1].set_title(title)
-        self.axes.append(plt.axes())
-        return len(self.axes) - 2
+        needed = 2 * np.pi * np.asarray(pixels, dtype=float) / self.pixels_per_segment
+        return np.minimum(np.searchsorted(-self.segments, -needed), len(self.levels) - 1)
 
-    def grid(self, i, axis='both', color='gray', linestyle='-', linewidth=0.2):
+    def dispose(self):
         """
-        Toggles the grid of the plot with index i
+        Frees the cached geometries on the client
 
-        :param i: index of the plot
-        :param axis: the axis of the grid [Default: 'both']
-        :param color: the color of the grid lines [Default: 'gray', can be hex]
-        :param linestyle: the style of the grid lines [Default: '-']
-        :param linewidth: the width of the grid lines [Default: 0.2]
         :return: None
         """
-        self.axes[i].grid(axis=axis, color=color, linestyle=linestyle, linewidth=linewidth)
-        self.widget.draw()
-        self.widget.flush_events()
+        for mesh in self.cache.values():
+            geometry = getattr(mesh, 'geometry', mesh)
+            if isinstance(geometry, widgets.Widget):
+                geometry.exec_three_obj_method("dispose")
+        self.cache.clear()
 
-    def set_visible(self, i):
+
+class SceneDetail:
+    """
+    The triangle budget of one pythreejs scene. Every model registers its LevelOfDetail groups and the triangles of its
+    meshes with a fixed resolution, the levels of all groups are then picked by one select_levels() call. The levels
+    are picked again, when the camera moves, e.g. by OrbitControls
+    """
+
+    def __init__(self, camera=camera, budget=TRIANGLE_BUDGET, viewport_height=600, interval=0.2):
         """
-        Sets the plot with index i to be visible and all other plots to be invisible
+        Initializes an empty scene and starts to follow the position of the camera
+
+        :param camera: the camera of the renderer [Default: the shared camera of this module]
+        :param budget: the maximum number of triangles of the whole scene [Default: TRIANGLE_BUDGET]
+        :param viewport_height: the height of the renderer [px, Default: 600]
+        :param interval: the minimum time between two selections caused by camera moves [s, Default: 0.2]
+        """
+        self.camera = camera
+        self.budget = budget
+        self.viewport_height = viewport_height
+        self.interval = interval
+        self.fixed = {}
+        self.groups = {}
+        self.levels = {}
+        self.timer = None
+        self.lock = threading.RLock()
+        camera.observe(self.camera_moved, 'position')
+
+    def add_fixed(self, key, triangles):
+        """
+        Counts meshes, which are always drawn in the same resolution, against the budget
+
+        :param key: the name of the meshes, adding the same key again replaces their count
+        :param triangles: the number of triangles of the meshes
+        :return: None
+        """
+        with self.lock:
+            self.fixed[key] = triangles
+
+    def set_group(self, key, lod, radius, positions, apply):
+        """
+        Registers or replaces a group of objects, which share one LevelOfDetail. The levels are not picked before the
+        next call of select()
+
+        :param key: the name of the group
+        :param lod: the LevelOfDetail object of the group
+        :param radius: the radius of the objects (scalar or array)
+        :param positions: the positions of the objects, array of shape (n, 3)
+        :param apply: callable, which receives the integer array of the chosen levels of the group
+        :return: None
+        """
+        with self.lock:
+            self.groups[key] = (lod, radius, np.asarray(positions, dtype=float), apply)
+            self.levels.pop(key, None)
+
+    def remove(self, key):
+        """
+        Removes a group or fixed meshes from the scene
+
+        :param key: the name of the group or meshes
+        :return: None
+        """
+        with self.lock:
+            self.groups.pop(key, None)
+            self.levels.pop(key, None)
+            self.fixed.pop(key, None)
+
+    def available(self):
+        """
+        Returns the number of triangles left for the LevelOfDetail groups
+
+        :return: the budget minus the triangles of all fixed meshes
+        """
+        return self.budget - sum(self.fixed.values())
+
+    def select(self):
+        """
+        Picks the levels of all groups at once, see select_levels(), and passes them to the apply callable of every
+        group, whose levels changed or which was replaced since the last selection
+
+        :return: None
+        """
+        with self.lock:
+            if not self.groups:
+                return
+            keys = list(self.groups)
+            lods = [self.groups[key][0] for key in keys]
+            pixels = [projected_size(radius, positions, self.camera, self.viewport_height)
+                      for _, radius, positions, _ in (self.groups[key] for key in keys)]
+            levels = select_levels(lods, pixels, self.available())
+            for key, level in zip(keys, levels):
+                if key not in self.levels or not np.array_equal(self.levels[key], level):
+                    self.levels[key] = level
+                    self.groups[key][3](level)
+
+    def camera_moved(self, change=None):
+        """
+        Picks the levels again after the camera moved. Moves are coalesced, so the levels are picked at most once per
+        self.interval
+
+        :param change: callback param needed for ipywidgets.Widget.observe()
+        :return: None
+        """
+        with self.lock:
+            if self.timer is None:
+                self.timer = threading.Timer(self.interval, self.select_after_move)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def select_after_move(self):
+        """
+        Runs the selection scheduled by camera_moved()
+
+        :return: None
+        """
+        with self.lock:
+            self.timer = None
+            self.select()
+
+    def close(self):
+        """
+        Stops following the camera
+
+        :return: None
+        """
+        self.camera.unobserve(self.camera_moved, 'position')
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+
+
+class CanvasTexture:
+    """
+    Persistent pythreejs DataTexture, which mirrors an ipycanvas Canvas. While the plane mesh is shown, the canvas sends
+    its image data to the kernel after drawing, the texture buffer is overwritten in place and only resent, when the
+    image actually changed
+    """
+
+    def __init__(self, canvas, width=4, position=(0, 0, -2)):
+        """
+        Initializes the texture buffer and the plane mesh, the canvas is not mirrored before show() is called
+
+        :param canvas: the ipycanvas Canvas to mirror
+        :param width: the width of the plane mesh, the height follows from the aspect ratio of the canvas [Default: 4]
+        :param position: the position of the plane mesh [Default: (0, 0, -2)]
+        """
+        self.canvas = canvas
+        self.buffer = np.zeros((canvas.height, canvas.width, 4), dtype=np.uint8)
+        self.texture = DataTexture(data=self.buffer, format='RGBAFormat', type='UnsignedByteType')
+        self.mesh = Mesh(PlaneGeometry(width, width * canvas.height / canvas.width),
+                         MeshBasicMaterial(map=self.texture, transparent=True, side='DoubleSide'), position=position)
+        self.image_data = None
+        self.refreshes = 0
+        self.scene = None
+
+    def show(self, scene):
+        """
+        Adds the plane mesh to the scene and starts to mirror the canvas. The canvas only sends its image data while
+        the mesh is shown, because every draw call of the canvas is followed by a whole PNG image
+
+        :param scene: the pythreejs scene
+        :return: None
+        """
+        if self.scene is scene:
+            return
+        self.hide()
+        self.scene = scene
+        scene.add(self.mesh)
+        self.canvas.observe(self.refresh, 'image_data')
+        self.canvas.sync_image_data = True
+        self.refresh()
+
+    def hide(self):
+        """
+        Removes the plane mesh from its scene and stops the canvas from sending its image data
+
+        :return: None
+        """
+        if self.scene is None:
+            return
+        self.canvas.sync_image_data = False
+        self.canvas.unobserve(self.refresh, 'image_data')
+        self.scene.remove(self.mesh)
+        self.scene = None
+
+    def refresh(self, change=None):
+        """
+        Copies the current image of the canvas into the texture buffer, if it differs from the last one. The rows are
+        flipped, because the texture starts at the bottom
+
+        :param change: callback param needed for ipywidgets.Widget.observe()
+        :return: whether the texture was updated
+        """
+        image_data = self.canvas.image_data
+        if image_data is None or image_data == self.image_data:
+            return False
+        self.image_data = image_data
+        data = self.canvas.get_image_data()
+        if data.shape != self.buffer.shape:
+            # the canvas was resized, the texture needs a new buffer once
+            self.buffer = np.empty(data.shape, dtype=np.uint8)
+            np.copyto(self.buffer, data[::-1], casting='unsafe')
+            self.texture.data = self.buffer
+        else:
+            np.copyto(self.buffer, data[::-1], casting='unsafe')
+            # the buffer is modified in place, so the trait does not notice the change by itself
+            self.texture.send_state('data')
+        self.refreshes += 1
+        return True
+
+    def close(self):
+        """
+        Stops mirroring the canvas and frees the texture on the client
+
+        :return: None
+        """
+        self.hide()
+        self.texture.exec_three_obj_method("dispose")
+
+
+class MultiPlot(DeferredRedraw):
+    """
+    Wrapper class for matplotlib.pyplot which supports multiple plots on one figure
+    """
+
+    def __init__(self, width=3, height=3, blit=False, decimation='lttb'):
+        """
+        Initializes an empty figure
+
+        :param width: the width of the figure [Default: 3]
+        :param height: the height of the figure [Default: 3]
+        :param blit: whether markers and curves should be updated by blitting instead of redrawing the figure
+                     [Default: False]
+        :param decimation: the downsampling method for long line plots, see decimate() [Default: 'lttb']
+        """
+        super().__init__()
+        self.width = width
+        self.height = height
+        self.blit = blit
+        self.decimation = decimation
+        self.clear()
+
+    def add_plot(self, x, y, color='blue', xlim=None, ylim=None, xlabel=None, ylabel=None, title=None):
+        """
+        Adds a plot with range x and function y to the figure
+
+        :param x: the x-range of the plot
+        :param y: the function of the plot
+        :param color: the color of the line of the plot
+        :param xlim: the limits of the x-axis
+        :param ylim: the limits of the y-axis
+        :param xlabel: the label of the x-axis
+        :param ylabel: the label of the y-axis
+        :param title: the title of the plot
+        :return: the index of the added plot
+        """
+        ax = self.axes[-1]
+        self.add_curve(ax.plot(*decimate(x, y, xlim, int(ax.bbox.width), self.decimation), color=color)[0])
+        self.marker.append(None)
+        self.mark(len(self.axes) - 1, x[0], y[0])
+        return self.add_ax(xlim, ylim, xlabel, ylabel, title)
+
+    def add_scatter(self, x, y, color='blue', xlim=None, ylim=None, xlabel=None, ylabel=None, title=None):
+        """
+        Adds a scatter plot with range x and function y to the figure
+        See add_plot.params for detailed explanation of the params
+
+        :return: the index of the added plot
+        """
+        self.add_curve(self.axes[-1].scatter(x, y, color=color))
+        self.marker.append(None)
+        self.mark(len(self.axes) - 1, x[0], y[0])
+        return self.add_ax(xlim, ylim, xlabel, ylabel, title, color=color)
+
+    def add_curve(self, curve, i=None):
+        """
+        Registers the persistent artist (Line2D or PathCollection) holding the data of a plot
+
+        :param curve: the artist of the plot
+        :param i: the index of the plot to replace the artist for [Default: None, appends a new plot]
+        :return: the artist
+        """
+        if i is None:
+            self.curves.append(curve)
+        else:
+            self.curves[i] = curve
+        if self.blitter is not None:
+            self.blitter.add_artist(curve)
+        return curve
+
+    def add_ax(self, xlim=None, ylim=None, xlabel=None, ylabel=None, title=None, color=None):
+        """
+        Function that implements the common functionality for adding (scatter) plots to the figure
+        See add_plot.params for detailed explanation of the params
+
+        :return: the index of the added plot
+        """
+        self.ax_data[self.axes[-1]] = {'xlim': xlim, 'ylim': ylim, 'xlabel': xlabel, 'ylabel': ylabel, 'title': title,
+                                       'color': color}
+        self.axes[-1].set_xlabel(xlabel)
+        self.axes[-1].set_ylabel(ylabel)
+        self.axes[-1].set_title(title)
+        self.axes.append(pyplot().axes())
+        return len(self.axes) - 2
+
+    def grid(self, i, axis='both', color='gray', linestyle='-', linewidth=0.2):
+        """
+        Toggles the grid of the plot with index i
+
+        :param i: index of the plot
+        :param axis: the axis of the grid [Default: 'both']
+        :param color: the color of the grid lines [Default: 'gray', can be hex]
+        :param linestyle: the style of the grid lines [Default: '-']
+        :param linewidth: the width of the grid lines [Default: 0.2]
+        :return: None
+        """
+        self.axes[i].grid(axis=axis, color=color, linestyle=linestyle, linewidth=linewidth)
+        self.mark_dirty()
+
+    def set_visible(self, i):
+        """
+        Sets the plot with index i to be visible and all other plots to be invisible
 
         :param i: the index of the plot to set visible
         :return: None
@@ -1231,12 +2219,12 @@ class MultiPlot:
 
         self.axes[i].set_xlim(xlim)
         self.axes[i].set_ylim(ylim)
-        self.widget.draw()
-        self.widget.flush_events()
+        self.mark_dirty()
 
     def set_data(self, i, x, y, scatter=False):
         """
-        Sets the data of the plot with index i to x and y
+        Sets the data of the plot with index i to x and y. The data of the existing line or scatter is updated in place,
+        so limits, labels, grid and marker of the plot are preserved
 
         :param i: the index of the plot
         :param x: the x-range of the plot
@@ -1244,26 +2232,58 @@ class MultiPlot:
         :param scatter: flag if the plot is a scatter plot
         :return: False, if the plot with index i does not exist, True otherwise
         """
-        if i < 0 or i >= len(self.axes):
+        if i < 0 or i >= len(self.curves):
             return False
+        curve = self.curves[i]
+        if scatter != hasattr(curve, 'set_offsets'):
+            self.replace_curve(i, x, y, scatter)
+            return True
+        if scatter:
+            curve.set_offsets(np.column_stack((x, y)))
+        else:
+            curve.set_data(*self.decimated(i, x, y))
+        self.mark_dirty(self.axes[i])
+        return True
+
+    def decimated(self, i, x, y):
+        """
+        Returns the data of a line plot decimated to the visible x-range and the pixel width of the plot with index i
+
+        :param i: the index of the plot
+        :param x: the x-range of the plot
+        :param y: the function of the plot
+        :return: tuple of the decimated x- and y-values
+        """
         ax = self.axes[i]
-        col = ax.get_lines()[0].get_color()
-        xlim, ylim, xlabel, ylabel, title = ax.get_xlim(), ax.get_ylim(), ax.get_xlabel(), ax.get_ylabel(), ax.get_title()
+        return decimate(x, y, self.ax_data[ax]['xlim'], int(ax.bbox.width), self.decimation)
+
+    def replace_curve(self, i, x, y, scatter=False):
+        """
+        Replaces the artist of the plot with index i by a new line or scatter with the same color
+
+        :param i: the index of the plot
+        :param x: the x-range of the plot
+        :param y: the function of the plot
+        :param scatter: flag if the new plot is a scatter plot
+        :return: the new artist
+        """
+        ax = self.axes[i]
+        curve = self.curves[i]
         color = self.ax_data[ax]['color']
-        if color is not None:
-            col = color
-        ax.clear()
-        if not scatter:
-            ax.plot(x, y, color=col)
+        if color is None:
+            color = curve.get_facecolor()[0] if hasattr(curve, 'set_offsets') else curve.get_color()
+        if self.blitter is not None:
+            self.blitter.remove_artist(curve)
+        curve.remove()
+        xlim, ylim = ax.get_xlim(), ax.get_ylim()
+        if scatter:
+            curve = ax.scatter(x, y, color=color)
         else:
-            ax.scatter(x, y, color=col)
+            curve = ax.plot(*self.decimated(i, x, y), color=color)[0]
         ax.set_xlim(xlim)
         ax.set_ylim(ylim)
-        ax.set_xlabel(xlabel)
-        ax.set_ylabel(ylabel)
-        ax.set_title(title)
-        self.marker[i] = None
-        return True
+        self.mark_dirty()
+        return self.add_curve(curve, i)
 
     def clear(self):
         """
@@ -1271,12 +2291,16 @@ class MultiPlot:
 
         :return: None
         """
-        self.fig, self.ax = plt.subplots(figsize=(self.width, self.height))
+        if getattr(self, 'fig', None) is not None:
+            pyplot().close(self.fig)
+        self.fig, self.ax = pyplot().subplots(figsize=(self.width, self.height))
         self.widget = self.fig.canvas
         self.widget.header_visible = False
         self.axes = [self.ax]
         self.ax_data = {self.ax: {'x': [], 'y': []}}
+        self.curves = []
         self.marker = []
+        self.blitter = BlitManager(self.widget) if self.blit else None
 
     def __len__(self):
         return len(self.axes) - 1
@@ -1299,9 +2323,10 @@ class MultiPlot:
         """
         if self.marker[i] is None:
             self.marker[i] = self.axes[i].plot([x], [y], marker=symbol)[0]
+            if self.blitter is not None:
+                self.blitter.add_artist(self.marker[i])
         self.marker[i].set_data([x], [y])
-        self.widget.draw()
-        self.widget.flush_events()
+        self.mark_dirty(self.axes[i])
 
 
 class ScatterPlot(Plot):
@@ -1332,7 +2357,8 @@ class ScatterPlot(Plot):
         self.title = title
         self.width = width
         self.height = height
-        self.fig, self.ax = plt.subplots(figsize=(self.width, self.height))
+        DeferredRedraw.__init__(self)
+        self.fig, self.ax = pyplot().subplots(figsize=(self.width, self.height))
         self.widget = self.fig.canvas
         self.ax.scatter(x, y)
         self.update_plot(self.x, self.y, self.title, self.xlabel, self.ylabel, self.xlim, self.ylim)
@@ -1353,6 +2379,618 @@ class ScatterPlot(Plot):
             self.ax.scatter(self.x, self.y)
 
 
+COLOR_CYCLE = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f']
+
+
+def nice_ticks(lo, hi, count=5):
+    """
+    Calculates evenly spaced tick positions with a 'nice' step size (1, 2 or 5 times a power of ten) inside [lo, hi]
+
+    :param lo: the lower limit of the axis
+    :param hi: the upper limit of the axis
+    :param count: the approximate number of ticks [Default: 5]
+    :return: numpy array of tick positions
+    """
+    if hi <= lo:
+        return np.array([lo])
+    raw = (hi - lo) / count
+    magnitude = 10 ** np.floor(np.log10(raw))
+    step = magnitude * min((m for m in (1, 2, 5, 10) if m * magnitude >= raw), default=10)
+    return np.arange(np.ceil(lo / step), np.floor(hi / step) + 1) * step
+
+
+class CanvasCurve:
+    """
+    Vector data of a single artist of the ipycanvas plot backend. Mirrors the parts of the matplotlib Line2D API that
+    are used by the plot wrappers
+    """
+
+    def __init__(self, x, y, color, kind='line', label=None):
+        """
+        Initializes the curve with the given data
+
+        :param x: the x-values of the curve
+        :param y: the y-values of the curve
+        :param color: the color of the curve (css color or hexcode)
+        :param kind: one of 'line', 'scatter', 'vline' or 'marker' [Default: 'line']
+        :param label: the label of a vertical line [Default: None]
+        """
+        self.color = color
+        self.kind = kind
+        self.label = label
+        self.decimation_key = None
+        self.decimation_cache = None
+        self.set_data(x, y)
+
+    def set_data(self, x, y):
+        """
+        Sets the data of the curve
+
+        :param x: the x-values
+        :param y: the y-values
+        :return: None
+        """
+        self.x = np.atleast_1d(np.asarray(x, dtype=float))
+        self.y = np.atleast_1d(np.asarray(y, dtype=float))
+        self.decimation_key = None
+
+    def set_xdata(self, x):
+        """
+        Sets the x-values of the curve (or the position of a vertical line)
+
+        :param x: the x-values
+        :return: None
+        """
+        self.x = np.atleast_1d(np.asarray(x, dtype=float))
+        self.decimation_key = None
+
+    def decimated(self, xlim, n, method):
+        """
+        Returns the curve decimated for the given view, see decimate(). The result is cached until the data or the view
+        changes, so redrawing the plot for a moved marker does not decimate again
+
+        :param xlim: the visible x-limits
+        :param n: the maximum number of points
+        :param method: the downsampling method
+        :return: tuple of the decimated x- and y-values
+        """
+        key = (tuple(xlim), n, method)
+        if key != self.decimation_key:
+            self.decimation_cache = decimate(self.x, self.y, xlim, n, method)
+            self.decimation_key = key
+        return self.decimation_cache
+
+    def get_color(self):
+        return self.color
+
+
+class CanvasAxes:
+    """
+    A single plot of the ipycanvas plot backend. Holds limits, labels and curves and draws them onto canvas layers
+    """
+
+    def __init__(self, width, height, title=None, xlabel=None, ylabel=None, xlim=None, ylim=None):
+        """
+        Initializes an empty plot
+
+        :param width: the width of the canvas in pixels
+        :param height: the height of the canvas in pixels
+        :param title: the title of the plot [Default: None]
+        :param xlabel: the label of the x-axis [Default: None]
+        :param ylabel: the label of the y-axis [Default: None]
+        :param xlim: the x-limits of the plot [Default: None, fits the data]
+        :param ylim: the y-limits of the plot [Default: None, fits the data]
+        """
+        self.width = width
+        self.height = height
+        self.left, self.right, self.top, self.bottom = 60, 15, 25, 45
+        self.title = title
+        self.xlabel = xlabel
+        self.ylabel = ylabel
+        self.xlim = xlim
+        self.ylim = ylim
+        self.curves = []
+        self.grid_style = None
+        self.visible = True
+        self.decimation = 'lttb'
+
+    def add(self, curve):
+        """
+        Adds a curve to the plot
+
+        :param curve: CanvasCurve object
+        :return: the curve
+        """
+        self.curves.append(curve)
+        return curve
+
+    def remove(self, curve):
+        """
+        Removes a curve from the plot
+
+        :param curve: CanvasCurve object
+        :return: None
+        """
+        if curve in self.curves:
+            self.curves.remove(curve)
+
+    def data_limits(self, axis):
+        """
+        Returns the limits of the data of all lines and scatters with a margin of 5%
+
+        :param axis: 0 for the x-axis, 1 for the y-axis
+        :return: tuple (lo, hi)
+        """
+        values = [(c.x if axis == 0 else c.y) for c in self.curves if c.kind in ('line', 'scatter') and len(c.x)]
+        if len(values) == 0:
+            return 0., 1.
+        lo = min(np.nanmin(v) for v in values)
+        hi = max(np.nanmax(v) for v in values)
+        if lo == hi:
+            lo, hi = lo - 0.5, hi + 0.5
+        margin = (hi - lo) * 0.05
+        return lo - margin, hi + margin
+
+    def limits(self):
+        """
+        Returns the current limits of the plot, falls back to the data limits for unset limits
+
+        :return: tuple ((x0, x1), (y0, y1))
+        """
+        xlim = tuple(self.xlim) if self.xlim is not None else self.data_limits(0)
+        ylim = tuple(self.ylim) if self.ylim is not None else self.data_limits(1)
+        return xlim, ylim
+
+    def to_pixels(self, x, y):
+        """
+        Transforms data coordinates to canvas pixels
+
+        :param x: the x-values (scalar or array)
+        :param y: the y-values (scalar or array)
+        :return: tuple of pixel coordinates (px, py)
+        """
+        (x0, x1), (y0, y1) = self.limits()
+        w = self.width - self.left - self.right
+        h = self.height - self.top - self.bottom
+        px = self.left + (np.asarray(x, dtype=float) - x0) / (x1 - x0) * w
+        py = self.height - self.bottom - (np.asarray(y, dtype=float) - y0) / (y1 - y0) * h
+        return px, py
+
+    def draw_static(self, c):
+        """
+        Draws frame, ticks, grid, labels and title of the plot
+
+        :param c: the canvas layer to draw on
+        :return: None
+        """
+        if not self.visible:
+            return
+        (x0, x1), (y0, y1) = self.limits()
+        xt = nice_ticks(x0, x1)
+        yt = nice_ticks(y0, y1)
+        pxt, _ = self.to_pixels(xt, y0)
+        _, pyt = self.to_pixels(x0, yt)
+        top, bottom = self.top, self.height - self.bottom
+        left, right = self.left, self.width - self.right
+
+        if self.grid_style is not None and len(xt) + len(yt) > 0:
+            c.stroke_style = self.grid_style['color']
+            c.line_width = self.grid_style['linewidth'] * 2
+            segments = []
+            if self.grid_style['axis'] in ('both', 'x'):
+                segments += [[(p, top), (p, bottom)] for p in pxt]
+            if self.grid_style['axis'] in ('both', 'y'):
+                segments += [[(left, p), (right, p)] for p in pyt]
+            if len(segments) > 0:
+                c.stroke_line_segments(np.array(segments))
+
+        c.stroke_style = 'black'
+        c.line_width = 1
+        c.stroke_rect(left, top, right - left, bottom - top)
+        ticks = [[(p, bottom), (p, bottom + 4)] for p in pxt] + [[(left - 4, p), (left, p)] for p in pyt]
+        if len(ticks) > 0:
+            c.stroke_line_segments(np.array(ticks))
+
+        c.fill_style = 'black'
+        c.font = '10px sans-serif'
+        c.text_align = 'center'
+        c.text_baseline = 'top'
+        for t, p in zip(xt, pxt):
+            c.fill_text(f'{t:.4g}', p, bottom + 6)
+        c.text_align = 'right'
+        c.text_baseline = 'middle'
+        for t, p in zip(yt, pyt):
+            c.fill_text(f'{t:.4g}', left - 6, p)
+
+        c.font = '12px sans-serif'
+        c.text_align = 'center'
+        if self.xlabel:
+            c.text_baseline = 'bottom'
+            c.fill_text(self.xlabel, (left + right) / 2, self.height - 4)
+        if self.title:
+            c.text_baseline = 'top'
+            c.fill_text(self.title, (left + right) / 2, 4)
+        if self.ylabel:
+            c.save()
+            c.translate(12, (top + bottom) / 2)
+            c.rotate(-np.pi / 2)
+            c.text_baseline = 'middle'
+            c.fill_text(self.ylabel, 0, 0)
+            c.restore()
+
+    def clear_data(self, c):
+        """
+        Clears the plot area, which is drawn by draw_data()
+
+        :param c: the canvas layer to clear
+        :return: None
+        """
+        c.clear_rect(self.left, self.top, self.width - self.left - self.right, self.height - self.top - self.bottom)
+
+    def draw_data(self, c):
+        """
+        Draws the curves, vertical lines and markers of the plot, clipped to the plot area
+
+        :param c: the canvas layer to draw on
+        :return: None
+        """
+        if not self.visible:
+            return
+        (x0, x1), (y0, y1) = self.limits()
+        c.save()
+        c.begin_path()
+        c.rect(self.left, self.top, self.width - self.left - self.right, self.height - self.top - self.bottom)
+        c.clip()
+        for curve in self.curves:
+            c.stroke_style = curve.color
+            c.fill_style = curve.color
+            c.line_width = 1.5
+            if curve.kind == 'line':
+                x, y = curve.decimated((x0, x1), self.width - self.left - self.right, self.decimation)
+                px, py = self.to_pixels(x, y)
+                if len(px) > 1:
+                    c.stroke_lines(np.column_stack((px, py)))
+            elif curve.kind == 'scatter':
+                px, py = self.to_pixels(curve.x, curve.y)
+                c.fill_circles(px, py, 3)
+            elif curve.kind == 'vline':
+                px, _ = self.to_pixels(curve.x[0], y0)
+                c.stroke_line(float(px), self.top, float(px), self.height - self.bottom)
+                if curve.label is not None:
+                    lx, ly = self.to_pixels(curve.x[0] + 0.5, y1 / 2)
+                    c.font = '10px sans-serif'
+                    c.text_align = 'left'
+                    c.fill_text(curve.label, float(lx), float(ly))
+            elif curve.kind == 'marker':
+                px, py = self.to_pixels(curve.x[0], curve.y[0])
+                c.fill_circle(float(px), float(py), 4)
+        c.restore()
+
+
+class CanvasPlot(DeferredRedraw):
+    """
+    Lightweight alternative to Plot, which draws the plot directly on an ipycanvas MultiCanvas.
+    Only vector data is sent to the client, the static axes and the data are drawn on separate layers, so data updates
+    do not redraw the axes
+    """
+
+    def __init__(self, x, y, width=5, height=3.5, title="Plot", xlabel="x", ylabel="y", xlim=None, ylim=None,
+                 blit=False, scroll=False, decimation='lttb', dpi=100, scatter=False):
+        """
+        Initializes the plot with given values, see Plot::__init__() for the shared parameters
+
+        :param dpi: pixels per inch, the canvas size is width * dpi x height * dpi [Default: 100]
+        :param scatter: whether the data is drawn as scatter instead of line [Default: False]
+        """
+        super().__init__()
+        self.x = x
+        self.y = y
+        self.title = title
+        self.xlabel = xlabel
+        self.ylabel = ylabel
+        self.xlim = xlim
+        self.ylim = ylim
+        self.widget = MultiCanvas(2, width=int(width * dpi), height=int(height * dpi))
+        self.ax = CanvasAxes(self.widget.width, self.widget.height, title, xlabel, ylabel, xlim, ylim)
+        self.ax.decimation = decimation
+        self.pl = self.ax.add(CanvasCurve(x, y, COLOR_CYCLE[0], kind='scatter' if scatter else 'line'))
+        self.marker = None
+        self.mark_dirty()
+
+    def partial_redraw(self):
+        return True
+
+    def draw_figure(self):
+        with hold_canvas():
+            self.widget[0].clear()
+            self.ax.draw_static(self.widget[0])
+            self.widget[1].clear()
+            self.ax.draw_data(self.widget[1])
+
+    def draw_animated(self, axes):
+        with hold_canvas():
+            self.widget[1].clear()
+            self.ax.draw_data(self.widget[1])
+
+    def use_blit(self, scroll=False):
+        """
+        Exists for compatibility with Plot. Data updates of a CanvasPlot only redraw the data layer anyway
+
+        :param scroll: not used
+        :return: None
+        """
+        pass
+
+    def update_plot(self, x=None, y=None, title=None, xlabel=None, ylabel=None, xlim=None, ylim=None):
+        """
+        Updates the plot with given values, see further descriptions at Plot::__init__()
+        """
+        if x is not None:
+            self.x = x
+        if y is not None:
+            self.y = y
+        self.title = self.ax.title = title if title is not None else self.title
+        self.xlabel = self.ax.xlabel = xlabel if xlabel is not None else self.xlabel
+        self.ylabel = self.ax.ylabel = ylabel if ylabel is not None else self.ylabel
+        self.xlim = self.ax.xlim = xlim if xlim is not None else self.xlim
+        self.ylim = self.ax.ylim = ylim if ylim is not None else self.ylim
+        self.pl.set_data(self.x, self.y)
+        static = title is not None or xlabel is not None or ylabel is not None or xlim is not None or ylim is not None
+        self.mark_dirty(None if static or self.xlim is None or self.ylim is None else self.ax)
+
+    def flush(self):
+        """
+        Renders all pending changes immediately
+
+        :return: None
+        """
+        with self.batch():
+            self.mark_dirty(self.ax)
+
+    def set_data(self, x, y):
+        """
+        Sets the x-range and function of the plot
+
+        :param x: the x-range of the plot
+        :param y: the function of the plot
+        :return: None
+        """
+        self.x = x
+        self.y = y
+        self.pl.set_data(x, y)
+        self.mark_dirty(self.ax if self.xlim is not None and self.ylim is not None else None)
+
+    def set_xlim(self, xlim):
+        """
+        Sets the x-limits of the plot
+
+        :param xlim: the x-limits of the plot
+        :return: None
+        """
+        self.xlim = self.ax.xlim = xlim
+        self.mark_dirty()
+
+    def grid(self, axis='both', color='gray', linestyle='-', linewidth=0.2):
+        """
+        Toggles the grid for the plot, see MarkerPlot::grid() for the parameters
+
+        :return: None
+        """
+        self.ax.grid_style = None if self.ax.grid_style is not None else \
+            {'axis': axis, 'color': color, 'linestyle': linestyle, 'linewidth': linewidth}
+        self.mark_dirty()
+
+    def add_line(self, x, color='gray', label=None):
+        """
+        Adds a vertical line to the plot
+
+        :param x: the x position for the line
+        :param color: the color of the line [Default: 'gray']
+        :param label: the label of the line [Default: None]
+        :return: the line
+        """
+        line = self.ax.add(CanvasCurve([x], [0], color, kind='vline', label=label))
+        self.mark_dirty(self.ax)
+        return line
+
+    def update_line(self, line, x):
+        """
+        Updates the x-position of a line
+
+        :param line: the line to update the position for
+        :param x: the new x-position
+        :return: None
+        """
+        line.set_xdata(x)
+        self.mark_dirty(self.ax)
+
+    def plot(self, x, y):
+        """
+        Removes the current plot and lines and plots a new function
+
+        :param x: the x-range of the plot
+        :param y: the function of the plot
+        :return: None
+        """
+        kind = self.pl.kind
+        self.ax.curves.clear()
+        self.marker = None
+        self.x = x
+        self.y = y
+        self.pl = self.ax.add(CanvasCurve(x, y, COLOR_CYCLE[0], kind=kind))
+        self.mark_dirty()
+
+    def mark(self, x, y, symbol='o'):
+        """
+        Moves the marker to position (x, y) on the plot, see MarkerPlot::mark()
+
+        :return: None
+        """
+        if self.marker is None:
+            self.marker = self.ax.add(CanvasCurve([x], [y], COLOR_CYCLE[1], kind='marker'))
+        self.marker.set_data([x], [y])
+        self.mark_dirty(self.ax)
+
+    def sleep(self, seconds):
+        """
+        Sleeps for the given amount of seconds
+
+        :param seconds: the amount of seconds
+        :return: None
+        """
+        time.sleep(seconds)
+
+
+class CanvasScatterPlot(CanvasPlot):
+    """
+    Implementation of CanvasPlot which draws a scatter plot, see ScatterPlot
+    """
+
+    def __init__(self, x, y, width=5, height=3.5, title="Plot", xlabel="x", ylabel="y", xlim=None, ylim=None):
+        super().__init__(x, y, width, height, title, xlabel, ylabel, xlim, ylim, scatter=True)
+
+
+class CanvasMultiPlot(DeferredRedraw):
+    """
+    Lightweight alternative to MultiPlot, which draws several plots on one ipycanvas MultiCanvas, see CanvasPlot
+    """
+
+    def __init__(self, width=3, height=3, blit=False, decimation='lttb', dpi=100):
+        """
+        Initializes an empty figure
+
+        :param width: the width of the figure in inches [Default: 3]
+        :param height: the height of the figure in inches [Default: 3]
+        :param blit: not used, exists for compatibility with MultiPlot
+        :param decimation: the downsampling method for long line plots, see decimate() [Default: 'lttb']
+        :param dpi: pixels per inch [Default: 100]
+        """
+        super().__init__()
+        self.width = width
+        self.height = height
+        self.decimation = decimation
+        self.dpi = dpi
+        self.widget = MultiCanvas(2, width=int(width * dpi), height=int(height * dpi))
+        self.clear()
+
+    def partial_redraw(self):
+        return True
+
+    def draw_figure(self):
+        with hold_canvas():
+            self.widget[0].clear()
+            self.widget[1].clear()
+            for ax in self.axes:
+                ax.draw_static(self.widget[0])
+                ax.draw_data(self.widget[1])
+
+    def draw_animated(self, axes):
+        # only the plots owning the changed data or markers are redrawn, hidden plots have nothing to redraw
+        with hold_canvas():
+            for ax in axes:
+                if ax.visible:
+                    ax.clear_data(self.widget[1])
+                    ax.draw_data(self.widget[1])
+
+    def add_plot(self, x, y, color='blue', xlim=None, ylim=None, xlabel=None, ylabel=None, title=None):
+        """
+        Adds a plot with range x and function y to the figure, see MultiPlot::add_plot()
+
+        :return: the index of the added plot
+        """
+        return self.add_ax(CanvasCurve(x, y, color), xlim, ylim, xlabel, ylabel, title)
+
+    def add_scatter(self, x, y, color='blue', xlim=None, ylim=None, xlabel=None, ylabel=None, title=None):
+        """
+        Adds a scatter plot with range x and function y to the figure, see MultiPlot::add_plot()
+
+        :return: the index of the added plot
+        """
+        return self.add_ax(CanvasCurve(x, y, color, kind='scatter'), xlim, ylim, xlabel, ylabel, title)
+
+    def add_ax(self, curve, xlim=None, ylim=None, xlabel=None, ylabel=None, title=None):
+        """
+        Function that implements the common functionality for adding (scatter) plots to the figure
+
+        :param curve: the CanvasCurve holding the data of the plot
+        :return: the index of the added plot
+        """
+        ax = CanvasAxes(self.widget.width, self.widget.height, title, xlabel, ylabel, xlim, ylim)
+        ax.decimation = self.decimation
+        ax.visible = len(self.axes) == 0
+        self.axes.append(ax)
+        self.curves.append(ax.add(curve))
+        self.marker.append(None)
+        self.mark(len(self.axes) - 1, curve.x[0], curve.y[0])
+        self.mark_dirty()
+        return len(self.axes) - 1
+
+    def grid(self, i, axis='both', color='gray', linestyle='-', linewidth=0.2):
+        """
+        Shows the grid of the plot with index i with the given style, see MultiPlot::grid()
+
+        :return: None
+        """
+        self.axes[i].grid_style = {'axis': axis, 'color': color, 'linestyle': linestyle, 'linewidth': linewidth}
+        self.mark_dirty()
+
+    def set_visible(self, i):
+        """
+        Sets the plot with index i to be visible and all other plots to be invisible
+
+        :param i: the index of the plot to set visible
+        :return: None
+        """
+        for j, ax in enumerate(self.axes):
+            ax.visible = i == j
+        self.mark_dirty()
+
+    def set_data(self, i, x, y, scatter=False):
+        """
+        Sets the data of the plot with index i to x and y, see MultiPlot::set_data()
+
+        :return: False, if the plot with index i does not exist, True otherwise
+        """
+        if i < 0 or i >= len(self.curves):
+            return False
+        self.curves[i].kind = 'scatter' if scatter else 'line'
+        self.curves[i].set_data(x, y)
+        ax = self.axes[i]
+        self.mark_dirty(ax if ax.xlim is not None and ax.ylim is not None else None)
+        return True
+
+    def clear(self):
+        """
+        Removes all added plots
+
+        :return: None
+        """
+        self.axes = []
+        self.curves = []
+        self.marker = []
+        self.mark_dirty()
+
+    def __len__(self):
+        return len(self.axes)
+
+    def canvas(self):
+        return self.widget
+
+    def show(self):
+        display(self.widget)
+
+    def mark(self, i, x, y, symbol='o'):
+        """
+        Marks the point (x, y) on the plot with index i, see MultiPlot::mark()
+
+        :return: None
+        """
+        if self.marker[i] is None:
+            self.marker[i] = self.axes[i].add(CanvasCurve([x], [y], COLOR_CYCLE[1], kind='marker'))
+        self.marker[i].set_data([x], [y])
+        self.mark_dirty(self.axes[i])
+
+
 def spaces(n=10):
     """
     Returns a string of n spaces